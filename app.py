@@ -1,8 +1,17 @@
 import os
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
-from config.db import mongodb_connection, check_mongodb_connection
+from config.compression import init_app as init_compression
+from config.db import init_app as init_db, get_db
+from config.indexes import bootstrap as bootstrap_indexes
+from config.json_provider import MongoJSONProvider
+from services.duel_service import DuelService
+from services.health import health_prober
+from services.leaderboard import leaderboard
+from services.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, METRICS_TOKEN, init_app as init_metrics, registry as metrics_registry,
+)
 
 from routes.auth import auth_bp
 from routes.quiz import quiz_bp
@@ -11,6 +20,8 @@ from routes.duel import duel_bp
 load_dotenv("key.env")
 
 app = Flask(__name__)
+# ObjectId / datetime / enums encodés nativement : les routes renvoient les documents Mongo tels quels
+app.json = MongoJSONProvider(app)
 
 CORS(app, supports_credentials=True, resources={
     r"/*": {
@@ -18,6 +29,39 @@ CORS(app, supports_credentials=True, resources={
     }
 })
 
+init_db(app)
+# Avant la compression : les hooks after_request s'exécutent en ordre inverse
+init_metrics(app)
+init_compression(app)
+
+# Index idempotents au démarrage (MONGODB_ENSURE_INDEXES=false si on passe par `python -m config.indexes`) ;
+# les migrations ne tournent ici qu'avec MONGODB_RUN_MIGRATIONS=true
+if os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes"):
+    try:
+        bootstrap_indexes(get_db())
+    except Exception as e:
+        print(f"Index bootstrap failed: {e}")
+
+# ELO des duels dont le finaliseur s'est arrêté avant de l'appliquer
+try:
+    DuelService(get_db()).apply_pending_ratings()
+except Exception as e:
+    print(f"Pending duel ratings failed: {e}")
+
+try:
+    leaderboard.load(get_db())
+except Exception as e:
+    print(f"Leaderboard preload failed: {e}")
+
+health_prober.ensure_started()
+
+metrics_registry.gauge_callback(
+    "mongodb_pool_connections", "MongoDB pool connections by client (sync/async) and state.", ("client", "state"),
+    lambda: {(client, state): pool[state]
+             for client, pool in health_prober.pools().items()
+             for state in ("open", "in_use", "available", "wait_queue")},
+)
+
 app.register_blueprint(auth_bp)
 app.register_blueprint(quiz_bp)
 app.register_blueprint(duel_bp)
@@ -26,10 +70,32 @@ app.register_blueprint(duel_bp)
 def index():
     return jsonify({"status": "ok"})
 
+# Les sondes ne font que lire le dernier résultat du prober : aucune requête Mongo/Clerk ici
 @app.route('/health')
 def health():
-    ok, msg = check_mongodb_connection()
-    return jsonify({"mongodb": ok, "message": msg}), 200 if ok else 503
+    ready, checks = health_prober.readiness()
+    mongodb = checks["mongodb"]
+    return jsonify({
+        "mongodb": bool(mongodb["ok"]),
+        "message": mongodb["message"],
+        "checks": checks,
+        "pools": health_prober.pools(),
+    }), 200 if ready else 503
+
+@app.route('/health/live')
+def health_live():
+    return jsonify({"status": "ok", **health_prober.liveness()}), 200
+
+@app.route('/health/ready')
+def health_ready():
+    ready, checks = health_prober.readiness()
+    return jsonify({"status": "ready" if ready else "not_ready", "checks": checks}), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(metrics_registry.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
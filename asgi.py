@@ -0,0 +1,82 @@
+"""
+Mode ASGI : `uvicorn asgi:application` (ou `hypercorn asgi:application`).
+
+Les routes de jeu (quiz et duel) tournent en coroutines sur Quart, avec
+AsyncMongoClient et httpx.AsyncClient ; tout le reste (auth, profil,
+leaderboard, admin des questions, /health) retombe sur l'app Flask via
+WsgiToAsgi, sans duplication de code.
+"""
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from dotenv import load_dotenv
+from quart import Quart
+from werkzeug.exceptions import HTTPException
+
+from app import app as flask_app
+from config.compression import init_async_app as init_async_compression
+from config.db import close_async_mongodb_connection
+from config.json_provider import MongoJSONProvider
+from routes.duel_async import duel_bp as async_duel_bp
+from routes.quiz_async import quiz_bp as async_quiz_bp
+from services.metrics import init_async_app as init_async_metrics
+
+load_dotenv("key.env")
+
+async_app = Quart(__name__)
+async_app.json = MongoJSONProvider(async_app)
+init_async_metrics(async_app)
+init_async_compression(async_app)
+
+try:
+    from quart_cors import cors
+    async_app = cors(
+        async_app,
+        allow_credentials=True,
+        allow_origin=os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(","),
+    )
+except ImportError:
+    print("quart-cors not installed: async routes are served without CORS headers")
+
+async_app.register_blueprint(async_quiz_bp)
+async_app.register_blueprint(async_duel_bp)
+
+
+@async_app.after_serving
+async def close_async_db():
+    await close_async_mongodb_connection()
+
+
+# Endpoints Flask servis par Quart ; les noms sont identiques dans les deux blueprints
+ASYNC_ENDPOINTS = {
+    rule.endpoint for rule in async_app.url_map.iter_rules() if rule.endpoint != "static"
+}
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+def _resolve_endpoint(path: str, method: str):
+    adapter = flask_app.url_map.bind("localhost")
+    try:
+        endpoint, _ = adapter.match(path, method=method)
+    except HTTPException:
+        return None
+    return endpoint
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await async_app(scope, receive, send)
+        return
+
+    if scope["type"] == "http":
+        # Le preflight CORS suit la route réelle (Flask-CORS ou quart-cors)
+        method = scope["method"]
+        if method == "OPTIONS":
+            method = "GET"
+        endpoint = _resolve_endpoint(scope["path"], method) or _resolve_endpoint(scope["path"], "POST")
+        if endpoint in ASYNC_ENDPOINTS:
+            await async_app(scope, receive, send)
+            return
+
+    await wsgi_app(scope, receive, send)
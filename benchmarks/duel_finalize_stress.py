@@ -0,0 +1,91 @@
+"""
+Stress check for duel finalization: both players of each duel submit at the
+same instant and ELO must be applied exactly once per duel.
+
+Runs against the MongoDB server from MONGODB_URI, in a scratch database that is
+dropped afterwards:
+    python -m benchmarks.duel_finalize_stress --duels 500 --threads 32
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config.db import mongodb_connection
+from services.duel_service import DuelService
+
+
+def submit(db, duel_id, is_player1, clerk_id, score, barrier):
+    service = DuelService(db)
+    barrier.wait()
+    duel = service.record_score(duel_id, is_player1, clerk_id, score)
+    if duel and duel.get('player1_done') and duel.get('player2_done'):
+        finalized, _, _, _ = service.finalize(duel)
+        return finalized
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duels", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--db", default=os.getenv("STRESS_DB_NAME", "hackathon_stress"))
+    args = parser.parse_args()
+
+    client = mongodb_connection()
+    client.drop_database(args.db)
+    db = client.get_database(args.db)
+
+    users, duels = [], []
+    for i in range(args.duels):
+        p1, p2 = f"stress_p1_{i}", f"stress_p2_{i}"
+        users += [{"clerk_id": p1, "elo": 1200, "wins": 0, "losses": 0, "total_duels": 0},
+                  {"clerk_id": p2, "elo": 1200, "wins": 0, "losses": 0, "total_duels": 0}]
+        duels.append({"room_code": f"S{i:05d}", "quiz_id": "stress", "player1_id": p1, "player2_id": p2,
+                      "status": "in_battle", "player1_score": 0, "player2_score": 0,
+                      "player1_done": False, "player2_done": False, "winner_id": None,
+                      "created_at": datetime.utcnow()})
+    db.users.insert_many(users)
+    duel_ids = db.duels.insert_many(duels).inserted_ids
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(2, args.threads)) as pool:
+        futures = []
+        for i, duel_id in enumerate(duel_ids):
+            # Les deux soumissions d'un même duel partent ensemble
+            barrier = threading.Barrier(2)
+            futures.append(pool.submit(submit, db, duel_id, True, f"stress_p1_{i}", i % 3, barrier))
+            futures.append(pool.submit(submit, db, duel_id, False, f"stress_p2_{i}", 1, barrier))
+        finalizations = sum(1 for f in futures if f.result())
+    elapsed = time.perf_counter() - start
+
+    errors = []
+    if finalizations != args.duels:
+        errors.append(f"{finalizations} finalizations for {args.duels} duels")
+    if db.duels.count_documents({"status": {"$ne": "finished"}}):
+        errors.append("some duels are not finished")
+    if db.duels.count_documents({"elo_applied": {"$ne": True}}):
+        errors.append("some duels are not marked elo_applied")
+    for user in db.users.find({}, {"_id": 0}):
+        if user["total_duels"] != 1:
+            errors.append(f"{user['clerk_id']} has total_duels={user['total_duels']}")
+    elo_sum = sum(u["elo"] for u in db.users.find({}, {"elo": 1}))
+    if elo_sum != 1200 * len(users):
+        errors.append(f"ELO is not conserved: {elo_sum} != {1200 * len(users)}")
+
+    client.drop_database(args.db)
+
+    print(f"{args.duels} duels, {2 * args.duels} concurrent submits in {elapsed:.2f}s "
+          f"({2 * args.duels / elapsed:.0f} submits/s)")
+    if errors:
+        for error in errors[:20]:
+            print(f"FAIL: {error}")
+        sys.exit(1)
+    print("OK: ELO applied exactly once per duel")
+
+
+if __name__ == "__main__":
+    main()
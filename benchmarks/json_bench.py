@@ -0,0 +1,129 @@
+"""
+Micro-benchmark of JSON responses: Flask's default provider after the
+copy-and-convert loops the handlers used to run (`_id` to str, sorted keys,
+stdlib json), against MongoJSONProvider serializing the Mongo documents as is.
+
+    python -m benchmarks.json_bench --repeat 200
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from config.json_provider import ISO_DATETIMES, MongoJSONProvider, orjson
+from models.quiz_model import DuelStatus
+
+
+def make_quiz(n_questions):
+    return {
+        "_id": ObjectId(),
+        "title": "Benchmark quiz",
+        "category": "Général",
+        "difficulty": "medium",
+        "created_at": datetime.utcnow(),
+        "questions": [{
+            "_id": ObjectId(),
+            "text": f"Question numéro {i} : quelle est la bonne réponse ?",
+            "options": [f"Réponse {i}-{j}" for j in range(4)],
+            "correct_answer": f"Réponse {i}-0",
+            "points": 10,
+            "category": "Général",
+        } for i in range(n_questions)],
+    }
+
+
+def make_leaderboard(n_users):
+    return [{
+        "clerk_id": f"user_{i:06d}",
+        "username": f"joueur{i}",
+        "first_name": "Prénom",
+        "last_name": "Nom",
+        "promotion": "2026",
+        "elo": 2400 - i,
+        "wins": 100 - i % 100,
+        "losses": i % 50,
+        "total_duels": 150,
+        "rank": i + 1,
+    } for i in range(n_users)]
+
+
+def make_duels(n_duels):
+    start = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "room_code": f"{i:06d}",
+        "quiz_id": str(ObjectId()),
+        "status": DuelStatus.FINISHED,
+        "player1_id": "user_a",
+        "player2_id": "user_b",
+        "player1_score": 70,
+        "player2_score": 50,
+        "winner_id": "user_a",
+        "created_at": start - timedelta(minutes=i),
+        "finished_at": start - timedelta(minutes=i - 5),
+        "elo_delta": {"player1": 16, "player2": -16},
+    } for i in range(n_duels)]
+
+
+def convert_quiz(quiz):
+    quiz = dict(quiz)
+    quiz["_id"] = str(quiz["_id"])
+    quiz["questions"] = [{**q, "_id": str(q["_id"])} for q in quiz["questions"]]
+    return {"success": True, "quiz": quiz}
+
+
+def convert_duels(duels):
+    converted = []
+    for d in duels:
+        d = dict(d)
+        d["_id"] = str(d["_id"])
+        converted.append(d)
+    return {"success": True, "duels": converted}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--duels", type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = MongoJSONProvider(app)
+
+    quiz = make_quiz(args.questions)
+    users = make_leaderboard(args.users)
+    duels = make_duels(args.duels)
+    cases = [
+        (f"quiz ({args.questions} questions)",
+         lambda: default.response(convert_quiz(quiz)), lambda: fast.response({"success": True, "quiz": quiz})),
+        (f"leaderboard ({args.users} users)",
+         lambda: default.response({"success": True, "leaderboard": users, "total": len(users)}),
+         lambda: fast.response({"success": True, "leaderboard": users, "total": len(users)})),
+        (f"my-duels ({args.duels} duels)",
+         lambda: default.response(convert_duels(duels)), lambda: fast.response({"success": True, "duels": duels})),
+    ]
+
+    print(f"backend: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'payload':<26} {'KiB':>6} {'default us':>11} {'fast us':>9} {'speedup':>8}")
+    with app.app_context():
+        for name, old_call, new_call in cases:
+            old_body, new_body = old_call().get_data(), new_call().get_data()
+            if ISO_DATETIMES:
+                # Même contenu, aux dates près (RFC 822 pour Flask, ISO 8601 ici)
+                assert json.loads(old_body).keys() == json.loads(new_body).keys()
+            else:
+                assert json.loads(old_body) == json.loads(new_body)
+            old = min(timeit.repeat(old_call, number=args.repeat, repeat=3)) / args.repeat * 1e6
+            new = min(timeit.repeat(new_call, number=args.repeat, repeat=3)) / args.repeat * 1e6
+            print(f"{name:<26} {len(new_body) / 1024:>6.1f} {old:>11.1f} {new:>9.1f} {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
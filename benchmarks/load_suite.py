@@ -0,0 +1,299 @@
+"""
+End-to-end load benchmark of the solo and duel flows, run in-process against
+the Flask app with a local MongoDB stand-in and a stubbed Clerk verifier
+(session JWTs signed with a throwaway key whose JWKS is preloaded).
+
+Traffic is a fixed amount of work, so two runs with the same seed and options
+send the same requests:
+- each student, for each iteration: GET /quiz/get-all-quizzes, POST
+  /quiz/soloquiz/<id>, GET /quiz/<id>, POST /quiz/submit-solo
+- each pair, for each iteration: POST /duel/create, POST /duel/join/<code>,
+  GET /duel/<id> polled by both players, POST /duel/<id>/submit by both
+
+Reports throughput and p50/p95/p99 per endpoint, saves a JSON baseline and
+compares a run with a saved baseline (exit code 1 on regression):
+
+    python -m benchmarks.load_suite --students 50 --pairs 10 --save baseline.json
+    python -m benchmarks.load_suite --students 50 --pairs 10 --compare baseline.json
+    python -m benchmarks.load_suite --mongo-uri mongodb://localhost:27017   # real mongod instead of mongomock
+
+With --mongo-uri the benchmark database (--db-name, default load_bench) is
+dropped at the start of the run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.serving_modes import percentile
+from tests.helpers import StubClerk, patch_mongomock_bulk_write
+
+FRONTEND_URL = "http://localhost:5173"
+
+
+def configure_environment(args):
+    """Must run before the app is imported: config modules read the environment at import time."""
+    os.environ["MONGODB_DB_NAME"] = args.db_name
+    os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_load_suite")
+    os.environ["FRONTEND_URL"] = FRONTEND_URL
+    if args.mongo_uri:
+        os.environ["MONGODB_URI"] = args.mongo_uri
+
+
+def install_mongo_stand_in(args):
+    import config.db as db_config
+
+    if args.mongo_uri:
+        client = db_config.mongodb_connection()
+        client.drop_database(args.db_name)
+        return "mongodb"
+
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("mongomock is not installed: pip install mongomock, or pass --mongo-uri")
+
+    patch_mongomock_bulk_write(mongomock)
+    db_config._client = mongomock.MongoClient()
+    db_config._client_pid = os.getpid()
+    return f"mongomock {mongomock.__version__}"
+
+
+def seed(db, args, rng):
+    """Quizzes (question ids are their index, as the API serves them) and one profile per virtual user."""
+    quizzes = []
+    for q in range(args.quizzes):
+        quizzes.append({
+            "title": f"Quiz {q}",
+            "category": rng.choice(["maths", "physique", "histoire", "informatique"]),
+            "difficulty": rng.choice(["easy", "medium", "hard"]),
+            "questions": [{
+                "text": f"Question {i} du quiz {q} : quelle est la bonne réponse ?",
+                "options": [f"Réponse {j}" for j in range(4)],
+                "correct_answer": f"Réponse {rng.randrange(4)}",
+                "points": 10,
+                "category": "bench",
+            } for i in range(args.questions)],
+        })
+    db.quizzes.insert_many(quizzes)
+
+    # Profils créés d'avance : sinon le middleware irait chercher le profil chez Clerk
+    users = [f"bench_student_{i}" for i in range(args.students)]
+    users += [f"bench_duelist_{i}_{side}" for i in range(args.pairs) for side in ("a", "b")]
+    db.users.insert_many([{
+        "clerk_id": clerk_id, "first_name": clerk_id, "last_name": "Bench", "email": f"{clerk_id}@bench.local",
+        "promotion": "Bench", "mention": "Bench", "elo": 1200, "total_duels": 0, "wins": 0, "losses": 0,
+    } for clerk_id in users])
+    return [str(quiz["_id"]) for quiz in quizzes]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def call(self, client, name, method, path, token, expected, **kwargs):
+        start = time.perf_counter()
+        response = client.open(path, method=method, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if response.status_code not in expected:
+                self.errors[name] = self.errors.get(name, 0) + 1
+        return response
+
+
+def answers_for(quiz_payload, rng):
+    return [{"question_id": q["id"], "selected_option": rng.choice(q["options"]), "is_correct": False}
+            for q in quiz_payload["questions"]]
+
+
+def student(app, recorder, stub, quiz_ids, index, args):
+    rng = random.Random(args.seed * 1000 + index)
+    client = app.test_client()
+    token = stub.token(f"bench_student_{index}")
+    # Un quiz solo ne se joue qu'une fois par utilisateur : quiz distincts par itération
+    for quiz_id in rng.sample(quiz_ids, args.iterations):
+        recorder.call(client, "GET /quiz/get-all-quizzes", "GET", "/quiz/get-all-quizzes", token, {200})
+        started = recorder.call(client, "POST /quiz/soloquiz/<id>", "POST", f"/quiz/soloquiz/{quiz_id}", token, {200, 201})
+        quiz = recorder.call(client, "GET /quiz/<id>", "GET", f"/quiz/{quiz_id}", token, {200})
+        if quiz.status_code != 200:
+            continue
+        session_id = (started.get_json() or {}).get("session_id")
+        recorder.call(client, "POST /quiz/submit-solo", "POST", "/quiz/submit-solo", token, {200}, json={
+            "quiz_id": quiz_id, "session_id": session_id, "answers": answers_for(quiz.get_json()["quiz"], rng),
+        })
+
+
+def duel_pair(app, recorder, stub, quiz_ids, index, args):
+    rng = random.Random(args.seed * 1000 + 500 + index)
+    client = app.test_client()
+    tokens = (stub.token(f"bench_duelist_{index}_a"), stub.token(f"bench_duelist_{index}_b"))
+    for _ in range(args.iterations):
+        quiz_id = rng.choice(quiz_ids)
+        created = recorder.call(client, "POST /duel/create", "POST", "/duel/create", tokens[0], {201},
+                                json={"quiz_id": quiz_id})
+        if created.status_code != 201:
+            continue
+        duel = created.get_json()
+        recorder.call(client, "POST /duel/join/<code>", "POST", f"/duel/join/{duel['room_code']}", tokens[1], {200})
+        quiz = recorder.call(client, "GET /quiz/<id>", "GET", f"/quiz/{quiz_id}", tokens[0], {200}).get_json()["quiz"]
+        for _ in range(args.polls):
+            for token in tokens:
+                recorder.call(client, "GET /duel/<id>", "GET", f"/duel/{duel['duel_id']}", token, {200})
+        for token in tokens:
+            recorder.call(client, "POST /duel/<id>/submit", "POST", f"/duel/{duel['duel_id']}/submit", token, {200},
+                          json={"answers": answers_for(quiz, rng)})
+
+
+def summarize(recorder, wall):
+    endpoints = {}
+    for name in sorted(recorder.samples):
+        samples = recorder.samples[name]
+        endpoints[name] = {
+            "requests": len(samples),
+            "errors": recorder.errors.get(name, 0),
+            "rps": round(len(samples) / wall, 1),
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3),
+            "p99_ms": round(percentile(samples, 99), 3),
+        }
+    every = [s for samples in recorder.samples.values() for s in samples]
+    total = {
+        "requests": len(every),
+        "errors": sum(recorder.errors.values()),
+        "rps": round(len(every) / wall, 1),
+        "p50_ms": round(percentile(every, 50), 3),
+        "p95_ms": round(percentile(every, 95), 3),
+        "p99_ms": round(percentile(every, 99), 3),
+        "wall_s": round(wall, 3),
+    }
+    return endpoints, total
+
+
+def print_report(endpoints, total):
+    print(f"{'endpoint':<28} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, s in list(endpoints.items()) + [("total", total)]:
+        print(f"{name:<28} {s['requests']:>9} {s['errors']:>7} {s['rps']:>9.1f} "
+              f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}")
+
+
+def compare(baseline, endpoints, tolerance, min_delta_ms, min_samples):
+    """
+    An endpoint regresses when its p95 grows by more than `tolerance` (and by
+    at least `min_delta_ms`, below which it is noise), when its throughput
+    drops by more than `tolerance`, or when it starts returning errors.
+    Latency and throughput are only judged with `min_samples` requests on both sides.
+    """
+    regressions = []
+    print(f"\n{'endpoint':<28} {'base p95':>9} {'p95':>9} {'delta':>8} {'base rps':>9} {'rps':>9} {'delta':>8}")
+    for name, base in sorted(baseline["endpoints"].items()):
+        current = endpoints.get(name)
+        if current is None:
+            regressions.append(f"{name}: missing from this run")
+            continue
+        p95_delta = (current["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        rps_delta = (current["rps"] - base["rps"]) / base["rps"] if base["rps"] else 0.0
+        print(f"{name:<28} {base['p95_ms']:>9.2f} {current['p95_ms']:>9.2f} {p95_delta:>+7.0%} "
+              f"{base['rps']:>9.1f} {current['rps']:>9.1f} {rps_delta:>+7.0%}")
+        if min(base["requests"], current["requests"]) >= min_samples:
+            if p95_delta > tolerance and current["p95_ms"] - base["p95_ms"] >= min_delta_ms:
+                regressions.append(f"{name}: p95 {base['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+            if rps_delta < -tolerance:
+                regressions.append(f"{name}: throughput {base['rps']:.1f} -> {current['rps']:.1f} rps")
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors (baseline {base.get('errors', 0)})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--pairs", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=5, help="solo quizzes per student / duels per pair")
+    parser.add_argument("--polls", type=int, default=3, help="GET /duel/<id> per player and duel")
+    parser.add_argument("--quizzes", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8, help="worker threads (0: one per virtual user)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-uri", help="real MongoDB instead of mongomock")
+    parser.add_argument("--db-name", default="load_bench")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95/throughput change")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="p95 changes below this are noise")
+    parser.add_argument("--min-samples", type=int, default=50, help="fewer requests than this are not judged")
+    args = parser.parse_args()
+    if args.iterations > args.quizzes:
+        parser.error("--iterations cannot exceed --quizzes (a solo quiz is played once per student)")
+
+    configure_environment(args)
+    backend = install_mongo_stand_in(args)
+
+    from app import app
+    from config.db import get_db
+
+    stub = StubClerk(azp=FRONTEND_URL)
+    quiz_ids = seed(get_db(), args, random.Random(args.seed))
+
+    # Échauffement hors mesure : caches de quiz et chemins de code chargés
+    warmup = app.test_client()
+    warmup_token = stub.token("bench_student_0")
+    for quiz_id in quiz_ids:
+        warmup.get(f"/quiz/{quiz_id}", headers={"Authorization": f"Bearer {warmup_token}"})
+
+    recorder = Recorder()
+    users = [(student, i) for i in range(args.students)] + [(duel_pair, i) for i in range(args.pairs)]
+    # Ordre mélangé mais fixe : élèves et duels se chevauchent de la même façon d'un run à l'autre
+    random.Random(args.seed).shuffle(users)
+    workers = args.concurrency or len(users)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = [pool.submit(flow, app, recorder, stub, quiz_ids, i, args) for flow, i in users]
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - start
+
+    endpoints, total = summarize(recorder, wall)
+    print(f"backend: {backend}, {args.students} students, {args.pairs} duel pairs, "
+          f"{args.iterations} iterations, {workers} threads")
+    print_report(endpoints, total)
+
+    results = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "backend": backend,
+            "python": platform.python_version(),
+            "options": {k: v for k, v in vars(args).items() if k not in ("save", "compare", "mongo_uri", "tolerance", "min_delta_ms", "min_samples")},
+        },
+        "endpoints": endpoints,
+        "total": total,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("options") != results["meta"]["options"]:
+            print("\nWarning: the baseline was recorded with different options")
+        regressions = compare(baseline, endpoints, args.tolerance, args.min_delta_ms, args.min_samples)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regression against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Load generator comparing the WSGI (Flask) and ASGI (asgi.py) serving modes on
+the gameplay endpoints: fixed concurrency, fixed duration, RPS and latency
+percentiles per endpoint.
+
+Start both servers against the same database, then:
+    python -m benchmarks.serving_modes --token <session JWT> --quiz-id <id> \
+        --sync-url http://localhost:5000 --async-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def worker(client, path, deadline, latencies, errors):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_endpoint(base_url, path, token, concurrency, duration):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(worker(client, path, deadline, latencies, errors) for _ in range(concurrency)))
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / duration,
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def main_async(args):
+    paths = ["/quiz/get-all-quizzes", "/duel/my-duels"]
+    if args.quiz_id:
+        paths.insert(1, f"/quiz/{args.quiz_id}")
+
+    modes = [("wsgi", args.sync_url), ("asgi", args.async_url)]
+    print(f"{'mode':<6} {'endpoint':<40} {'rps':>9} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode, base_url in modes:
+        if not base_url:
+            continue
+        for path in paths:
+            stats = await run_endpoint(base_url, path, args.token, args.concurrency, args.duration)
+            print(f"{mode:<6} {path:<40} {stats['rps']:>9.1f} {stats['mean_ms']:>9.2f} "
+                  f"{stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync-url", default=os.getenv("BENCH_SYNC_URL", "http://localhost:5000"))
+    parser.add_argument("--async-url", default=os.getenv("BENCH_ASYNC_URL", "http://localhost:8000"))
+    parser.add_argument("--token", default=os.getenv("BENCH_TOKEN"), required=os.getenv("BENCH_TOKEN") is None)
+    parser.add_argument("--quiz-id", default=os.getenv("BENCH_QUIZ_ID"))
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+End-of-round submit storm: many solo submissions at once, written directly
+(one insert + one update + one stats upsert per request) and then through the
+write-behind queue (results and stats in a few bulk_write batches; the session
+update stays in the request).
+
+Runs against the MongoDB server from MONGODB_URI, in a scratch database that is
+dropped afterwards:
+    python -m benchmarks.submit_storm --submits 2000 --threads 32
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.db import mongodb_connection
+from models.quiz_model import QuizResult
+from services.quiz_service import QuizService
+from services.write_behind import WriteBehindQueue
+import services.quiz_service as quiz_service_module
+import services.quiz_stats as quiz_stats_module
+
+
+def submit(db, i):
+    service = QuizService(db)
+    result = QuizResult(clerk_id=f"storm_{i}", quiz_id="storm", score=i % 50, answers=[
+        {"question_id": str(q), "selected_option": "a", "is_correct": (i + q) % 2 == 0} for q in range(10)
+    ])
+    service.save_quiz_result(result)
+    service.finish_solo_session(str(db.session_ids[i]), result.score)
+
+
+class StormDB:
+    """The scratch database plus the pre-created session ids."""
+
+    def __init__(self, db, session_ids):
+        self._db = db
+        self.session_ids = session_ids
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        return self._db[name]
+
+
+def run(db, pipeline, submits, threads):
+    # Le service et les stats utilisent le singleton du module : on le remplace le temps du run
+    quiz_service_module.write_behind = pipeline
+    quiz_stats_module.write_behind = pipeline
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda i: submit(db, i), range(submits)))
+    acknowledged = time.perf_counter() - start
+    pipeline.close()
+    durable = time.perf_counter() - start
+    return acknowledged, durable
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submits", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--db", default=os.getenv("STRESS_DB_NAME", "hackathon_stress"))
+    args = parser.parse_args()
+
+    client = mongodb_connection()
+    errors = []
+    for label, pipeline in (("direct", WriteBehindQueue(enabled=False)),
+                            ("write-behind", WriteBehindQueue(enabled=True, batch_size=args.batch_size))):
+        client.drop_database(args.db)
+        raw_db = client.get_database(args.db)
+        session_ids = raw_db.solo_sessions.insert_many([
+            {"quiz_id": "storm", "clerk_id": f"storm_{i}", "status": "in_progress"} for i in range(args.submits)
+        ]).inserted_ids
+        db = StormDB(raw_db, session_ids)
+
+        acknowledged, durable = run(db, pipeline, args.submits, args.threads)
+
+        results = raw_db.results.count_documents({})
+        finished = raw_db.solo_sessions.count_documents({"status": "finished"})
+        attempts = (raw_db.quiz_stats.find_one({"_id": "storm"}) or {}).get("attempts", 0)
+        if not (results == finished == attempts == args.submits):
+            errors.append(f"{label}: results={results} finished={finished} stats={attempts}, expected {args.submits}")
+
+        print(f"{label:<13} {args.submits} submits: acknowledged in {acknowledged:.2f}s "
+              f"({args.submits / acknowledged:.0f}/s), persisted in {durable:.2f}s, "
+              f"batches={pipeline.stats['batches']} sync_fallback={pipeline.stats['sync_fallback']}")
+
+    client.drop_database(args.db)
+    if errors:
+        for error in errors:
+            print(f"FAIL: {error}")
+        sys.exit(1)
+    print("OK: every write persisted in both modes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark of the submit-path validation: one UserAnswerModel per answer
+plus a QuizResult re-validating the graded answers as dicts (previous code),
+against one TypeAdapter call whose instances are passed to QuizResult as is.
+
+    python -m benchmarks.validation_bench --repeat 20000
+"""
+import argparse
+import timeit
+
+from models.quiz_model import QuizResult, UserAnswerModel
+from services.validation import validate_answers
+
+
+def make_payload(n):
+    return [{"question_id": str(i), "selected_option": f"option {i % 4}", "is_correct": False} for i in range(n)]
+
+
+def per_item(payload):
+    answers = [UserAnswerModel(**ans) for ans in payload]
+    detailed = [{"question_id": a.question_id, "selected_option": a.selected_option, "is_correct": True} for a in answers]
+    return QuizResult(clerk_id="", quiz_id="q", score=0, answers=detailed)
+
+
+def batched(payload):
+    answers = validate_answers(payload)
+    for a in answers:
+        a.is_correct = True
+    return QuizResult(clerk_id="", quiz_id="q", score=0, answers=answers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100])
+    args = parser.parse_args()
+
+    print(f"{'answers':>8} {'per-item us':>12} {'batched us':>11} {'speedup':>8}")
+    for size in args.sizes:
+        payload = make_payload(size)
+        assert per_item(payload).model_dump() == batched(payload).model_dump()
+        repeat = max(1, args.repeat * 10 // size)
+        old = min(timeit.repeat(lambda: per_item(payload), number=repeat, repeat=3)) / repeat * 1e6
+        new = min(timeit.repeat(lambda: batched(payload), number=repeat, repeat=3)) / repeat * 1e6
+        print(f"{size:>8} {old:>12.1f} {new:>11.1f} {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
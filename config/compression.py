@@ -0,0 +1,160 @@
+"""
+Response compression negotiated through Accept-Encoding.
+
+gzip is always available; brotli (`brotli` or `brotlicffi`) and zstd
+(`zstandard`) are used when installed. Only complete JSON/text bodies above
+COMPRESSION_MIN_SIZE are compressed: streamed responses (SSE, exports) are
+left alone.
+
+Responses that carry a strong ETag (the pre-rendered /quiz/<id> payload) are
+content-addressed: they are compressed once per encoding at the highest level
+and served from a cache keyed by (ETag, encoding). Everything else is
+compressed on the fly at a cheaper level.
+"""
+import gzip
+import os
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from flask import request
+
+from services.cache import TTLCache
+from services.metrics import timed_phase
+
+load_dotenv("key.env")
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "1024"))
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/x-ndjson", "text/plain", "text/html", "text/csv",
+}
+
+# (niveau à la volée, niveau maximal pour les corps mis en cache)
+_GZIP_LEVELS = (int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")), 9)
+_BROTLI_LEVELS = (int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5")), 11)
+_ZSTD_LEVELS = (int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")), 19)
+
+
+def _gzip(body: bytes, best: bool) -> bytes:
+    # mtime=0 : même entrée, mêmes octets (en-tête gzip sans horodatage)
+    return gzip.compress(body, compresslevel=_GZIP_LEVELS[best], mtime=0)
+
+
+def _brotli(body: bytes, best: bool) -> bytes:
+    return brotli.compress(body, quality=_BROTLI_LEVELS[best])
+
+
+def _zstd(body: bytes, best: bool) -> bytes:
+    # Un compresseur par appel : ZstdCompressor n'est pas thread-safe
+    return zstandard.ZstdCompressor(level=_ZSTD_LEVELS[best]).compress(body)
+
+
+CODECS: Dict[str, Callable[[bytes, bool], bytes]] = {"gzip": _gzip}
+if brotli is not None:
+    CODECS["br"] = _brotli
+if zstandard is not None:
+    CODECS["zstd"] = _zstd
+
+# Préférence du serveur à qualité égale côté client : meilleur ratio d'abord
+ENCODINGS = [e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip").split(",")
+             if e.strip() in CODECS]
+
+# Corps compressés des réponses à ETag fort : (etag, encoding) -> bytes
+compressed_cache = TTLCache(maxsize=COMPRESSION_CACHE_SIZE, ttl=None)
+
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    """Best encoding for the request's parsed Accept-Encoding, or None for identity."""
+    if not ENCODINGS:
+        return None
+    return accept_encodings.best_match(ENCODINGS)
+
+
+def compress(body: bytes, encoding: str, etag: Optional[str] = None) -> bytes:
+    if etag is None:
+        return CODECS[encoding](body, False)
+    key = (etag, encoding)
+    compressed = compressed_cache.get(key)
+    if compressed is None:
+        compressed = CODECS[encoding](body, True)
+        compressed_cache.set(key, compressed)
+    return compressed
+
+
+def _negotiate(response, accept_encodings) -> Optional[str]:
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or "Content-Encoding" in response.headers:
+        return None
+    status = response.status_code
+    if status != 304 and (not 200 <= status < 300 or status in (204, 206)):
+        return None
+    # Le choix dépend d'Accept-Encoding, même quand on ne compresse pas cette fois-ci
+    response.vary.add("Accept-Encoding")
+    return choose_encoding(accept_encodings)
+
+
+def _weaken_etag(response) -> Optional[str]:
+    """
+    A compressed body is not byte-identical to the original: its ETag becomes
+    weak (as nginx does), If-None-Match still matches it. Returns the strong ETag.
+    """
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+        return etag
+    return None
+
+
+def _encode(response, body: bytes, encoding: str) -> None:
+    if response.status_code == 304:
+        _weaken_etag(response)
+    elif len(body) >= COMPRESSION_MIN_SIZE:
+        with timed_phase("compression"):
+            response.set_data(compress(body, encoding, _weaken_etag(response)))
+        response.content_encoding = encoding
+
+
+def compress_response(response):
+    """Flask after_request hook."""
+    if response.is_streamed or response.direct_passthrough:
+        return response
+    encoding = _negotiate(response, request.accept_encodings)
+    if encoding is not None:
+        _encode(response, response.get_data(), encoding)
+    return response
+
+
+async def compress_response_async(response):
+    """Quart after_request hook."""
+    from quart import request as async_request
+    from quart.wrappers.response import DataBody
+
+    if not isinstance(response.response, DataBody):
+        return response
+    encoding = _negotiate(response, async_request.accept_encodings)
+    if encoding is not None:
+        _encode(response, await response.get_data(), encoding)
+    return response
+
+
+def init_app(app):
+    if COMPRESSION_ENABLED:
+        app.after_request(compress_response)
+
+
+def init_async_app(app):
+    if COMPRESSION_ENABLED:
+        app.after_request(compress_response_async)
@@ -1,28 +1,189 @@
 
+import atexit
+import os
+import threading
+
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
+from pymongo.monitoring import ConnectionPoolListener
 
-import os
 from dotenv import load_dotenv
 
+from services.metrics import command_metrics
+
 load_dotenv("key.env")
 
 
 uri = os.getenv("MONGODB_URI")
+db_name = os.getenv("MONGODB_DB_NAME", "hackathon_db")
+
+# Un seul MongoClient par processus worker : le client gère lui-même son pool
+# de connexions et ses threads de monitoring, il ne doit pas être recréé par requête.
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+class PoolStatsListener(ConnectionPoolListener):
+    """
+    Connection pool counters maintained from the driver's CMAP events, so that
+    reading them costs nothing and opens no connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _pool(self, address):
+        return self._pools.setdefault(address, {"open": 0, "in_use": 0, "wait_queue": 0, "checkout_failures": 0})
+
+    def _add(self, address, **deltas):
+        with self._lock:
+            pool = self._pool(address)
+            for key, delta in deltas.items():
+                pool[key] += delta
+
+    def pool_created(self, event):
+        self._add(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(event.address, None)
+
+    def connection_created(self, event):
+        self._add(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._add(event.address, wait_queue=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(event.address, wait_queue=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._add(event.address, wait_queue=-1, in_use=1)
+
+    def connection_checked_in(self, event):
+        self._add(event.address, in_use=-1)
+
+    def reset(self):
+        with self._lock:
+            self._pools.clear()
+
+    def snapshot(self):
+        with self._lock:
+            servers = {f"{host}:{port}": dict(pool) for (host, port), pool in self._pools.items()}
+        for pool in servers.values():
+            pool["available"] = pool["open"] - pool["in_use"]
+        totals = {key: sum(pool[key] for pool in servers.values())
+                  for key in ("open", "in_use", "available", "wait_queue", "checkout_failures")}
+        return {**totals, "max_pool_size": _client_options()["maxPoolSize"], "servers": servers}
+
+
+# Un listener par client : les compteurs du mode ASGI restent séparés de ceux du client WSGI
+pool_stats = PoolStatsListener()
+async_pool_stats = PoolStatsListener()
+
+
+def _client_options():
+    return {
+        "tlsAllowInvalidCertificates": True,
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "10000")),
+    }
+
 
 def mongodb_connection():
+    """
+    Return the process-wide MongoClient, creating it on first use.
+    A forked worker gets its own client since MongoClient is not fork-safe.
+    """
+    global _client, _client_pid
+
+    client = _client
+    if client is not None and _client_pid == os.getpid():
+        return client
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            # Un enfant forké hérite des compteurs du parent, pas de ses connexions
+            pool_stats.reset()
+            _client = MongoClient(uri, event_listeners=[pool_stats, command_metrics], **_client_options())
+            _client_pid = os.getpid()
+        return _client
+
+
+def get_db():
+    return mongodb_connection().get_database(db_name)
+
+
+def close_mongodb_connection():
+    global _client, _client_pid
+
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def init_app(app):
+    """
+    Close the shared client when the worker shuts down.
+    The client itself is created lazily on the first get_db() call.
+    """
+    atexit.register(close_mongodb_connection)
+
+
+# Client asynchrone du mode ASGI (asgi.py) : un par processus, lié à la boucle du serveur
+_async_client = None
+
+
+def async_mongodb_connection():
+    global _async_client
+
+    if _async_client is None:
+        from pymongo import AsyncMongoClient
+
+        _async_client = AsyncMongoClient(uri, event_listeners=[async_pool_stats, command_metrics], **_client_options())
+    return _async_client
+
+
+def get_async_db():
+    return async_mongodb_connection().get_database(db_name)
+
+
+async def close_async_mongodb_connection():
+    global _async_client
+
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
 
-    client = MongoClient(uri, tlsAllowInvalidCertificates=True)
-    return client
 
 def check_mongodb_connection():
 
     try:
         client = mongodb_connection()
-        client.admin.command('ismaster')
+        client.admin.command('ping')
         return True, "Successfully connected to MongoDB"
     except ConnectionFailure as e:
         return False, f"Connection failed: {str(e)}"
     except Exception as e:
         return False, f"Unexpected error: {str(e)}"
-
@@ -0,0 +1,247 @@
+"""
+Declared MongoDB indexes and one-off data migrations.
+
+Usage:
+    python -m config.indexes            # run pending migrations, then create missing indexes
+    python -m config.indexes --report   # list missing / unused indexes and explain() the hot queries
+
+At application startup only the indexes are created; migrations (which may
+delete or rewrite documents) run there only with MONGODB_RUN_MIGRATIONS=true.
+"""
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from config.db import get_db
+from models.quiz_model import DuelStatus
+
+load_dotenv("key.env")
+
+RUN_MIGRATIONS_AT_STARTUP = os.getenv("MONGODB_RUN_MIGRATIONS", "false").lower() in ("1", "true", "yes")
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # Chaque requête authentifiée ; unique pour éviter les doublons au premier login
+        IndexModel([("clerk_id", ASCENDING)], name="clerk_id_unique", unique=True),
+        # Tri du leaderboard
+        IndexModel([("elo", DESCENDING)], name="elo_desc"),
+    ],
+    "duels": [
+        # Allocation et join des rooms : un code est unique parmi les duels en attente,
+        # et peut être réutilisé une fois le duel commencé
+        IndexModel([("room_code", ASCENDING)], name="room_code_waiting_unique", unique=True,
+                   partialFilterExpression={"status": "waiting"}),
+        # my_duels : chaque branche du $or + tri sur created_at
+        IndexModel([("player1_id", ASCENDING), ("created_at", DESCENDING)], name="player1_created_at"),
+        IndexModel([("player2_id", ASCENDING), ("created_at", DESCENDING)], name="player2_created_at"),
+        # Historique des duels terminés dans l'ordre, pour services/elo_replay.py
+        IndexModel([("status", ASCENDING), ("finished_at", ASCENDING), ("_id", ASCENDING)],
+                   name="status_finished_at"),
+        # Duels dont l'ELO reste à appliquer (DuelService.apply_pending_ratings) : presque toujours vide
+        IndexModel([("finished_at", ASCENDING)], name="elo_pending",
+                   partialFilterExpression={"elo_applied": False}),
+    ],
+    # Listings paginés (keyset sur _id) filtrés par catégorie / difficulté
+    "quizzes": [
+        IndexModel([("category", ASCENDING), ("difficulty", ASCENDING), ("_id", ASCENDING)],
+                   name="category_difficulty_id"),
+    ],
+    "questions": [
+        IndexModel([("category", ASCENDING), ("_id", ASCENDING)], name="category_id"),
+    ],
+    "solo_sessions": [
+        IndexModel([("quiz_id", ASCENDING), ("clerk_id", ASCENDING), ("status", ASCENDING)],
+                   name="quiz_clerk_status"),
+    ],
+    "results": [
+        IndexModel([("clerk_id", ASCENDING), ("quiz_id", ASCENDING)], name="clerk_quiz"),
+        IndexModel([("quiz_id", ASCENDING)], name="quiz_id"),
+    ],
+}
+
+# Requêtes chaudes vérifiées par explain() : (collection, filtre, tri)
+HOT_QUERIES = [
+    ("users", {"clerk_id": "probe"}, None),
+    ("users", {}, [("elo", DESCENDING)]),
+    ("duels", {"room_code": "PROBE0", "status": "waiting"}, None),
+    ("duels", {"$or": [{"player1_id": "probe"}, {"player2_id": "probe"}]}, [("created_at", DESCENDING)]),
+    ("quizzes", {"category": "probe"}, [("_id", ASCENDING)]),
+    ("questions", {"category": "probe"}, [("_id", ASCENDING)]),
+    ("solo_sessions", {"quiz_id": "probe", "clerk_id": "probe", "status": "finished"}, None),
+    ("results", {"clerk_id": "probe", "quiz_id": "probe"}, None),
+]
+
+
+def _dedupe_users_clerk_id(db: Database):
+    """Keep the oldest profile per clerk_id so the unique index can be built."""
+    duplicates = db.users.aggregate([
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": "$clerk_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+    removed = 0
+    for group in duplicates:
+        result = db.users.delete_many({"_id": {"$in": group["ids"][1:]}})
+        removed += result.deleted_count
+    print(f"Removed {removed} duplicate user profiles")
+
+
+def _unique_waiting_room_codes(db: Database):
+    """Cancel all but the newest waiting duel per room code, then drop the old non-unique index."""
+    duplicates = db.duels.aggregate([
+        {"$match": {"status": "waiting"}},
+        {"$sort": {"_id": -1}},
+        {"$group": {"_id": "$room_code", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+    cancelled = 0
+    for group in duplicates:
+        result = db.duels.update_many({"_id": {"$in": group["ids"][1:]}}, {"$set": {"status": DuelStatus.CANCELLED.value}})
+        cancelled += result.modified_count
+    print(f"Cancelled {cancelled} duplicate waiting duels")
+
+    if "room_code_status" in {ix["name"] for ix in db.duels.list_indexes()}:
+        db.duels.drop_index("room_code_status")
+
+
+# Migrations de données, exécutées une seule fois dans l'ordre (nom, fonction)
+MIGRATIONS = [
+    ("0001_dedupe_users_clerk_id", _dedupe_users_clerk_id),
+    ("0002_unique_waiting_room_codes", _unique_waiting_room_codes),
+]
+
+
+def run_migrations(db: Database) -> List[str]:
+    """
+    Each migration is claimed by inserting its marker before it runs: with
+    several workers or deploy jobs, only the one whose insert succeeds runs it,
+    the others skip it. A failed migration releases its claim and stops the
+    run; a process killed mid-migration leaves a "running" marker to delete by hand.
+    """
+    ran = []
+    for name, migration in MIGRATIONS:
+        try:
+            db.schema_migrations.insert_one({"_id": name, "state": "running", "started_at": datetime.utcnow()})
+        except DuplicateKeyError:
+            marker = db.schema_migrations.find_one({"_id": name}) or {}
+            if marker.get("state") == "running":
+                print(f"Migration {name} is running elsewhere, skipped")
+            continue
+        print(f"Running migration {name}")
+        try:
+            migration(db)
+        except Exception:
+            db.schema_migrations.delete_one({"_id": name, "state": "running"})
+            raise
+        db.schema_migrations.update_one(
+            {"_id": name}, {"$set": {"state": "applied", "applied_at": datetime.utcnow()}}
+        )
+        ran.append(name)
+    return ran
+
+
+def ensure_indexes(db: Database) -> Dict[str, List[str]]:
+    """
+    Create every declared index. Existing identical indexes are a no-op, so this
+    is safe to run at each startup; conflicting definitions are reported, not fatal.
+    """
+    created: Dict[str, List[str]] = {}
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                created.setdefault(collection, []).extend(db[collection].create_indexes([index]))
+            except OperationFailure as e:
+                print(f"Could not create index {collection}.{index.document['name']}: {e}")
+    return created
+
+
+def missing_unique_indexes(db: Database) -> List[str]:
+    """
+    Declared unique indexes that do not exist, e.g. because their build failed
+    on duplicate documents: the code relies on them for correctness.
+    """
+    missing = []
+    for collection, indexes in INDEXES.items():
+        unique = [index.document["name"] for index in indexes if index.document.get("unique")]
+        if unique:
+            existing = db[collection].index_information()
+            missing += [f"{collection}.{name}" for name in unique if name not in existing]
+    return missing
+
+
+def check_unique_indexes(db: Database) -> Tuple[bool, str]:
+    """Readiness check: (ok, message), like check_mongodb_connection()."""
+    missing = missing_unique_indexes(db)
+    if missing:
+        return False, f"Missing unique indexes: {', '.join(missing)} (run python -m config.indexes --report)"
+    return True, "All unique indexes present"
+
+
+def bootstrap(db: Database, migrate: bool = RUN_MIGRATIONS_AT_STARTUP) -> None:
+    """Startup hook: indexes are ensured even when a migration fails."""
+    if migrate:
+        try:
+            run_migrations(db)
+        except Exception as e:
+            print(f"Migrations failed: {e}")
+    ensure_indexes(db)
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage", "")]
+    for child in plan.get("inputStages", []) + [plan.get("inputStage", {})]:
+        if child:
+            stages.extend(_plan_stages(child))
+    return stages
+
+
+def index_report(db: Database) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"missing": [], "unused": [], "collection_scans": []}
+
+    for collection, indexes in INDEXES.items():
+        existing = {ix["name"] for ix in db[collection].list_indexes()}
+        for index in indexes:
+            if index.document["name"] not in existing:
+                report["missing"].append(f"{collection}.{index.document['name']}")
+
+        try:
+            for stats in db[collection].aggregate([{"$indexStats": {}}]):
+                if stats["name"] != "_id_" and stats["accesses"]["ops"] == 0:
+                    report["unused"].append(f"{collection}.{stats['name']}")
+        except OperationFailure as e:
+            print(f"$indexStats unavailable on {collection}: {e}")
+
+    for collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        # Les versions récentes enveloppent le plan dans queryPlan
+        stages = _plan_stages(plan.get("queryPlan", plan))
+        if "COLLSCAN" in stages:
+            report["collection_scans"].append({"collection": collection, "filter": query, "sort": sort})
+
+    return report
+
+
+if __name__ == "__main__":
+    database = get_db()
+    if "--report" in sys.argv:
+        result = index_report(database)
+        for key in ("missing", "unused", "collection_scans"):
+            print(f"{key}: {len(result[key])}")
+            for item in result[key]:
+                print(f"  - {item}")
+        sys.exit(1 if result["missing"] or result["collection_scans"] else 0)
+    else:
+        ran = run_migrations(database)
+        created = ensure_indexes(database)
+        print(f"Migrations applied: {ran or 'none'}")
+        for collection, names in created.items():
+            print(f"{collection}: {', '.join(names)}")
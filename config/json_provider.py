@@ -0,0 +1,119 @@
+import json
+import os
+from datetime import date, datetime, timezone
+from enum import Enum
+from typing import Any
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+from services.metrics import timed_phase
+
+load_dotenv("key.env")
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
+
+# Format de Flask par défaut (RFC 822, clés triées) ; JSON_DATETIME_FORMAT=iso et
+# JSON_SORT_KEYS=false changent le format des réponses : à coordonner avec le front
+ISO_DATETIMES = os.getenv("JSON_DATETIME_FORMAT", "http").lower() == "iso"
+SORT_KEYS = os.getenv("JSON_SORT_KEYS", "true").lower() in ("1", "true", "yes")
+
+
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _http_datetime(o: datetime) -> str:
+    """Same output as werkzeug's http_date, without going through email.utils."""
+    if o.tzinfo is not None:
+        o = o.astimezone(timezone.utc)
+    return (f"{_DAYS[o.weekday()]}, {o.day:02d} {_MONTHS[o.month - 1]} {o.year:04d} "
+            f"{o.hour:02d}:{o.minute:02d}:{o.second:02d} GMT")
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, datetime):
+        # Dates Mongo naïves = UTC (http_date fait de même)
+        if ISO_DATETIMES:
+            return (o if o.tzinfo else o.replace(tzinfo=timezone.utc)).isoformat()
+        return _http_datetime(o)
+    if isinstance(o, date):
+        return o.isoformat() if ISO_DATETIMES else http_date(o)
+    if isinstance(o, Enum):
+        return o.value
+    return DefaultJSONProvider.default(o)
+
+
+def _orjson_options(sort_keys: bool = SORT_KEYS, indent: bool = False) -> int:
+    # Clés non-str autorisées : l'histogramme des stats est indexé par entier
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+    if not ISO_DATETIMES:
+        # orjson encode lui-même les dates en ISO : on les fait passer par _default
+        option |= orjson.OPT_PASSTHROUGH_DATETIME
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return option
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Compact UTF-8 JSON with the provider's encoding rules, for pre-rendered bodies."""
+    with timed_phase("serialization"):
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=_orjson_options())
+        return json.dumps(obj, default=_default, ensure_ascii=False, sort_keys=SORT_KEYS,
+                          separators=(",", ":")).encode("utf-8")
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes Mongo documents as they come out of the driver:
+    ObjectId as its hex string, enums as their value. Backed by orjson when
+    installed, with the same output as the stdlib fallback.
+
+    The wire format stays Flask's: datetimes as RFC 822 dates (naive = UTC) and
+    sorted keys. JSON_DATETIME_FORMAT=iso (ISO 8601) and JSON_SORT_KEYS=false
+    are opt-in, for clients that accept them.
+    """
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = SORT_KEYS
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        return _orjson_options(self.sort_keys, indent)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode("utf-8")
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+
+        with timed_phase("serialization"):
+            if orjson is not None:
+                # Corps en bytes directement, sans passer par une str intermédiaire
+                body = orjson.dumps(obj, default=self.default, option=self._orjson_options(indent)) + b"\n"
+            elif indent:
+                body = self.dumps(obj, indent=2) + "\n"
+            else:
+                body = self.dumps(obj, separators=(",", ":")) + "\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
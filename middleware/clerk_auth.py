@@ -1,12 +1,21 @@
 import os
+import time
 import httpx
 from functools import wraps
 from flask import request, jsonify
 from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
 from clerk_backend_api import Clerk
 from clerk_backend_api.security.types import AuthenticateRequestOptions
-from config.db import mongodb_connection
+from config.db import get_db
 from models.user_model import UserBase
+from services.user_cache import get_user, invalidate_user
+from services.leaderboard import leaderboard
+from services.metrics import add_phase_time
+from services.clerk_jwt import (
+    ClerkJWTVerifier, JWKSCache, SessionTokenError,
+    fetch_clerk_jwks, get_session_token, is_machine_token,
+)
 
 load_dotenv("key.env")
 
@@ -17,6 +26,103 @@ if not clerk_secret_key:
 
 clerk_client = Clerk(bearer_auth=clerk_secret_key)
 
+AUTHORIZED_PARTIES = [
+    os.getenv("FRONTEND_URL", "http://localhost:5173"),
+    os.getenv("FRONTEND_URL", "http://localhost:5173").rstrip("/") + "/"
+]
+
+# Vérification locale des JWT de session : pas d'appel Clerk ni de copie de la requête
+LOCAL_JWT_VERIFY = os.getenv("CLERK_LOCAL_JWT_VERIFY", "true").lower() in ("1", "true", "yes")
+
+jwt_verifier = ClerkJWTVerifier(
+    JWKSCache(
+        lambda: fetch_clerk_jwks(clerk_secret_key),
+        ttl=float(os.getenv("CLERK_JWKS_TTL", "3600")),
+    ),
+    authorized_parties=AUTHORIZED_PARTIES,
+)
+
+
+def authenticate_clerk_request():
+    """
+    Returns (clerk_user_id, None) when signed in, (None, reason) otherwise.
+    Session JWTs are verified in-process; machine tokens (or a disabled fast
+    path) go through clerk_client.authenticate_request with headers only.
+    """
+    token = get_session_token(request.headers)
+    if token is None:
+        return None, "session-token-missing"
+
+    if LOCAL_JWT_VERIFY and not is_machine_token(token):
+        try:
+            payload = jwt_verifier.verify(token)
+        except SessionTokenError as e:
+            return None, str(e)
+        return payload.get("sub"), None
+
+    # authenticate_request ne lit que les en-têtes : inutile de copier le corps
+    httpx_req = httpx.Request(
+        method=request.method,
+        url=request.url,
+        headers=dict(request.headers),
+    )
+    request_state = clerk_client.authenticate_request(
+        httpx_req,
+        AuthenticateRequestOptions(authorized_parties=AUTHORIZED_PARTIES)
+    )
+
+    if not request_state.is_signed_in:
+        return None, str(request_state.reason)
+
+    return request_state.payload.get("sub"), None
+
+
+def build_user_document(clerk_user_id, clerk_user_profile):
+    """
+    First-login users document from the Clerk profile (None if Clerk could not be reached).
+    """
+    if clerk_user_profile is not None:
+        first_name = clerk_user_profile.first_name or ""
+        last_name = clerk_user_profile.last_name or ""
+
+        email = ""
+        if clerk_user_profile.email_addresses:
+            email = clerk_user_profile.email_addresses[0].email_address
+    else:
+        first_name = "Unknown"
+        last_name = ""
+        email = ""
+
+    user_data = {
+        "clerk_id": clerk_user_id,
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "promotion": "Unknown",
+        "mention": "Unknown",
+        "elo": 1200,
+        "total_duels": 0,
+        "wins": 0,
+        "losses": 0
+    }
+
+    try:
+        validated_user = UserBase(**user_data)
+        return validated_user.model_dump()
+    except Exception as e:
+        print(f"Pydantic validation error: {e}")
+
+        return {
+            "clerk_id": clerk_user_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": email,
+            "elo": 1200,
+            "total_duels": 0,
+            "wins": 0,
+            "losses": 0
+        }
+
 
 def clerk_auth_middleware(f):
     @wraps(f)
@@ -25,88 +131,41 @@ def clerk_auth_middleware(f):
         if request.method == "OPTIONS":
             return f(*args, **kwargs)
 
-        httpx_req = httpx.Request(
-            method=request.method,
-            url=request.url,
-            headers=dict(request.headers),
-            cookies=request.cookies,
-            content=request.get_data()
-        )
-
+        started = time.perf_counter()
         try:
-            request_state = clerk_client.authenticate_request(
-                httpx_req,
-                AuthenticateRequestOptions(
-                    authorized_parties=[
-                        os.getenv("FRONTEND_URL", "http://localhost:5173"),
-                        os.getenv("FRONTEND_URL", "http://localhost:5173").rstrip("/") + "/"
-                    ]
-                )
-            )
-
-            if not request_state.is_signed_in:
-                return jsonify({"error": "Unauthorized", "reason": str(request_state.reason)}), 401
+            clerk_user_id, reason = authenticate_clerk_request()
 
-            clerk_user_id = request_state.payload.get("sub")
+            if reason:
+                return jsonify({"error": "Unauthorized", "reason": reason}), 401
 
             if not clerk_user_id:
                 return jsonify({"error": "Invalid token payload"}), 401
 
-            db = mongodb_connection().get_database("hackathon_db")
-            user = db["users"].find_one({"clerk_id": clerk_user_id})
+            db = get_db()
+            user = get_user(db, clerk_user_id)
 
             if not user:
                 print(f"New user detected! Fetching details for {clerk_user_id}")
 
                 try:
                     clerk_user_profile = clerk_client.users.get(user_id=clerk_user_id)
-                    first_name = clerk_user_profile.first_name or ""
-                    last_name = clerk_user_profile.last_name or ""
-
-                    email = ""
-                    if clerk_user_profile.email_addresses:
-                        email = clerk_user_profile.email_addresses[0].email_address
-
                 except Exception as e:
                     print(f"Failed to fetch user profile from Clerk: {e}")
-                    first_name = "Unknown"
-                    last_name = ""
-                    email = ""
-
-                user_data = {
-                    "clerk_id": clerk_user_id,
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "email": email,
-                    "promotion": "Unknown",
-                    "mention": "Unknown",
-                    "elo": 1200,
-                    "total_duels": 0,
-                    "wins": 0,
-                    "losses": 0
-                }
+                    clerk_user_profile = None
+
+                user_dict = build_user_document(clerk_user_id, clerk_user_profile)
 
                 try:
-                    validated_user = UserBase(**user_data)
-                    user_dict = validated_user.model_dump()
-                    db["users"].insert_one(user_dict)
-                except Exception as e:
-                    print(f"Pydantic validation error: {e}")
-
-                    user_dict = {
-                        "clerk_id": clerk_user_id,
-                        "first_name": first_name,
-                        "last_name": last_name,
-                        "email": email,
-                        "elo": 1200,
-                        "total_duels": 0,
-                        "wins": 0,
-                        "losses": 0
-                    }
                     db["users"].insert_one(user_dict)
-                print(f"Successfully created DB profile for {first_name} {last_name}")
+                    print(f"Successfully created DB profile for {user_dict['first_name']} {user_dict['last_name']}")
+                except DuplicateKeyError:
+                    # Profil créé en parallèle par une autre requête (index unique sur clerk_id)
+                    pass
 
-                user = db["users"].find_one({"clerk_id": clerk_user_id})
+                invalidate_user(clerk_user_id)
+                user = get_user(db, clerk_user_id)
+                if user:
+                    leaderboard.upsert(user)
 
             request.clerk_user_id = clerk_user_id
             request.clerk_user = user
@@ -116,6 +175,8 @@ def clerk_auth_middleware(f):
             import traceback
             traceback.print_exc()
             return jsonify({"error": "Authentication processing failed", "details": str(e)}), 500
+        finally:
+            add_phase_time("auth", time.perf_counter() - started)
 
         return f(*args, **kwargs)
 
@@ -0,0 +1,126 @@
+import time
+from functools import wraps
+
+import httpx
+from pymongo.errors import DuplicateKeyError
+from quart import request, jsonify
+from clerk_backend_api.security.types import AuthenticateRequestOptions
+
+from config.db import get_async_db
+from middleware.clerk_auth import (
+    AUTHORIZED_PARTIES, LOCAL_JWT_VERIFY, build_user_document, clerk_client, clerk_secret_key, jwt_verifier,
+)
+from services.clerk_jwt import SessionTokenError, fetch_clerk_jwks_async, get_session_token, is_machine_token
+from services.leaderboard import leaderboard
+from services.metrics import add_phase_time
+from services.user_cache import get_user_async, invalidate_user
+
+
+async def authenticate_clerk_request_async():
+    """
+    Async twin of authenticate_clerk_request(): the JWKS refresh and the Clerk
+    fallback go through async HTTP clients, and the local verification runs
+    with allow_fetch=False so the sync JWKS fetch never runs on the event loop.
+    """
+    token = get_session_token(request.headers)
+    if token is None:
+        return None, "session-token-missing"
+
+    if LOCAL_JWT_VERIFY and not is_machine_token(token):
+        jwks_cache = jwt_verifier.jwks_cache
+        if jwks_cache.needs_refresh(jwt_verifier.token_kid(token)):
+            # Les requêtes concurrentes voient la tentative et n'en lancent pas d'autre
+            jwks_cache.note_refresh_attempt()
+            try:
+                jwks_cache.load_jwks(await fetch_clerk_jwks_async(clerk_secret_key))
+            except Exception as e:
+                # get_key() gardera les anciennes clés ou renverra jwks-unavailable
+                print(f"Failed to refresh Clerk JWKS: {e}")
+        try:
+            payload = jwt_verifier.verify(token, allow_fetch=False)
+        except SessionTokenError as e:
+            return None, str(e)
+        return payload.get("sub"), None
+
+    httpx_req = httpx.Request(
+        method=request.method,
+        url=request.url,
+        headers=dict(request.headers),
+    )
+    request_state = await clerk_client.authenticate_request_async(
+        httpx_req,
+        AuthenticateRequestOptions(authorized_parties=AUTHORIZED_PARTIES)
+    )
+
+    if not request_state.is_signed_in:
+        return None, str(request_state.reason)
+
+    return request_state.payload.get("sub"), None
+
+
+def async_clerk_auth_middleware(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        # Laisser passer les requêtes OPTIONS (preflight CORS) sans authentification
+        if request.method == "OPTIONS":
+            return await f(*args, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            clerk_user_id, reason = await authenticate_clerk_request_async()
+
+            if reason:
+                return jsonify({"error": "Unauthorized", "reason": reason}), 401
+
+            if not clerk_user_id:
+                return jsonify({"error": "Invalid token payload"}), 401
+
+            db = get_async_db()
+            user = await get_user_async(db, clerk_user_id)
+
+            if not user:
+                print(f"New user detected! Fetching details for {clerk_user_id}")
+
+                try:
+                    clerk_user_profile = await clerk_client.users.get_async(user_id=clerk_user_id)
+                except Exception as e:
+                    print(f"Failed to fetch user profile from Clerk: {e}")
+                    clerk_user_profile = None
+
+                user_dict = build_user_document(clerk_user_id, clerk_user_profile)
+
+                try:
+                    await db["users"].insert_one(user_dict)
+                    print(f"Successfully created DB profile for {user_dict['first_name']} {user_dict['last_name']}")
+                except DuplicateKeyError:
+                    # Profil créé en parallèle par une autre requête (index unique sur clerk_id)
+                    pass
+
+                invalidate_user(clerk_user_id)
+                user = await get_user_async(db, clerk_user_id)
+                if user:
+                    leaderboard.upsert(user)
+
+            request.clerk_user_id = clerk_user_id
+            request.clerk_user = user
+
+        except Exception as e:
+            print(f"Unexpected Auth error: {e}")
+            import traceback
+            traceback.print_exc()
+            return jsonify({"error": "Authentication processing failed", "details": str(e)}), 500
+        finally:
+            add_phase_time("auth", time.perf_counter() - started)
+
+        return await f(*args, **kwargs)
+
+    return decorated
+
+
+def get_current_user():
+    """
+    Helper function to get current user from request.
+    """
+    if not hasattr(request, 'clerk_user'):
+        return None
+    return request.clerk_user
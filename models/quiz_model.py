@@ -7,6 +7,7 @@ class DuelStatus(str, Enum):
     WAITING = "waiting"
     INBATTLE = "in_battle"
     FINISHED = "finished"
+    CANCELLED = "cancelled"
 
 class SoloSessionStatus(str, Enum):
     IN_PROGRESS = "in_progress"
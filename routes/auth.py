@@ -3,7 +3,10 @@ from flask import Blueprint, request, jsonify
 from services.clerk_auth import ClerkAuthService
 from middleware.clerk_auth import clerk_auth_middleware
 from models.user_model import UserBase, UserUpdate
-from config.db import mongodb_connection
+from config.db import get_db
+from pymongo import ReturnDocument
+from services.user_cache import cache_user, invalidate_user
+from services.leaderboard import leaderboard
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -15,14 +18,13 @@ clerk_auth_service = ClerkAuthService()
 def get_my_info():
     """
     Get current authenticated user information from MongoDB.
-    The middleware validates the Clerk session and populates request.clerk_user_id.
+    The middleware validates the Clerk session and populates request.clerk_user
+    from the user cache, so no extra query is needed here.
     MongoDB is the source of truth — it already holds first_name, last_name, email
     (synced from Clerk on first login) plus all game-specific fields.
     """
     try:
-        clerk_id = request.clerk_user_id
-        db = mongodb_connection().get_database("hackathon_db")
-        user = db["users"].find_one({"clerk_id": clerk_id})
+        user = request.clerk_user
 
         if not user:
             return jsonify({
@@ -75,15 +77,19 @@ def update_profile():
             return jsonify({"success": False, "error": "No valid fields to update"}), 400
 
         # Update the user in MongoDB
-        db = mongodb_connection().get_database("hackathon_db")
-        current_user = request.clerk_user
-        result = db["users"].update_one(
+        db = get_db()
+        invalidate_user(current_user.get("clerk_id"))
+        updated_user = db["users"].find_one_and_update(
             {"clerk_id": current_user.get("clerk_id")},
-            {"$set": update_fields}
+            {"$set": update_fields},
+            return_document=ReturnDocument.AFTER
         )
 
-        updated_user = db["users"].find_one({"clerk_id": current_user.get("clerk_id")})
+        if not updated_user:
+            return jsonify({"success": False, "error": "User not found in database"}), 404
 
+        cache_user(updated_user)
+        leaderboard.upsert(updated_user)
 
         return jsonify({
             "success": True,
@@ -112,21 +118,29 @@ def update_profile():
 @clerk_auth_middleware
 def get_leaderboard():
     try:
-        db = mongodb_connection().get_database("hackathon_db")
-        users = list(db["users"].find({}, {
-            "_id": 0,
-            "clerk_id": 1,
-            "first_name": 1,
-            "last_name": 1,
-            "promotion": 1,
-            "mention": 1,
-            "elo": 1,
-            "wins": 1,
-            "losses": 1,
-            "total_duels": 1
-        }).sort("elo", -1).limit(50))
-
-        return jsonify({"success": True, "leaderboard": users}), 200
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+
+        leaderboard.ensure_loaded(get_db())
+        users = leaderboard.top(limit=limit, offset=offset)
+
+        return jsonify({"success": True, "leaderboard": users, "total": len(leaderboard)}), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@auth_bp.route('/leaderboard/me', methods=['GET'])
+@auth_bp.route('/leaderboard/rank/<clerk_id>', methods=['GET'])
+@clerk_auth_middleware
+def get_leaderboard_rank(clerk_id=None):
+    try:
+        leaderboard.ensure_loaded(get_db())
+        entry = leaderboard.rank_of(clerk_id or request.clerk_user_id)
+        if not entry:
+            return jsonify({"success": False, "error": "User not found in leaderboard"}), 404
+
+        return jsonify({"success": True, "entry": entry, "total": len(leaderboard)}), 200
 
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"success": False, "error": str(e)}), 500
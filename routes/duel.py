@@ -1,20 +1,23 @@
-import random
-import string
-from flask import Blueprint, request, jsonify
+import os
+from flask import Blueprint, Response, request, jsonify
 from middleware.clerk_auth import clerk_auth_middleware, get_current_user
-from config.db import mongodb_connection
+from config.db import get_db
 from bson import ObjectId
-from datetime import datetime
-from models.quiz_model import UserAnswerModel
+from pydantic import ValidationError
 from services.quiz_service import QuizService
+from services.duel_service import DuelService, apply_duel_outcome, join_event, submission_event, submission_view
+from services.validation import PayloadError, validate_answers, validation_error_body
+from services.quiz_stats import record_quiz_stats
+from services.duel_events import broker, duel_channel, publish_duel_event, stream_duel_events
 
 duel_bp = Blueprint('duel', __name__)
 
-def generate_room_code():
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-
-def get_db():
-    return mongodb_connection().get_database("hackathon_db")
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# Sous WSGI, un flux ouvert occupe un thread du worker : flux courts, le navigateur
+# se reconnecte tout seul (retry) et reçoit un nouveau snapshot
+SSE_MAX_DURATION_SECONDS = float(os.getenv("SSE_MAX_DURATION_SECONDS", "60"))
+# Sous ASGI, l'attente ne coûte qu'une coroutine
+SSE_ASYNC_MAX_DURATION_SECONDS = float(os.getenv("SSE_ASYNC_MAX_DURATION_SECONDS", "900"))
 
 
 @duel_bp.route('/duel/<duel_id>/debug', methods=['GET'])
@@ -25,8 +28,9 @@ def debug_duel_quiz(duel_id):
         duel = db.duels.find_one({"_id": ObjectId(duel_id)})
         if not duel:
             return jsonify({"error": "Duel not found"}), 404
-        quiz = db.quizzes.find_one({"_id": ObjectId(duel['quiz_id'])})
-        if not quiz:
+        try:
+            quiz = QuizService(db).get_quiz_document(duel['quiz_id'])
+        except ValueError:
             return jsonify({"error": "Quiz not found"}), 404
         return jsonify({
             "quiz_title": quiz.get('title'),
@@ -46,10 +50,6 @@ def debug_duel_quiz(duel_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def serialize_duel(duel):
-    duel['_id'] = str(duel['_id'])
-    return duel
-
 
 
 @duel_bp.route('/duel/create', methods=['POST'])
@@ -74,27 +74,7 @@ def create_duel():
         if not quiz:
             return jsonify({"success": False, "error": "Quiz not found"}), 404
 
-        room_code = generate_room_code()
-        # Ensure unique code
-        while db.duels.find_one({"room_code": room_code, "status": "waiting"}):
-            room_code = generate_room_code()
-
-        duel_doc = {
-            "room_code": room_code,
-            "quiz_id": quiz_id,
-            "player1_id": clerk_id,
-            "player2_id": None,
-            "status": "waiting",
-            "player1_score": 0,
-            "player2_score": 0,
-            "player1_done": False,
-            "player2_done": False,
-            "winner_id": None,
-            "created_at": datetime.utcnow()
-        }
-
-        result = db.duels.insert_one(duel_doc)
-        duel_id = str(result.inserted_id)
+        duel_id, room_code = DuelService(db).create_room(quiz_id, clerk_id)
 
         return jsonify({
             "success": True,
@@ -115,21 +95,18 @@ def join_duel(room_code):
         current_user = get_current_user()
         clerk_id = current_user.get('clerk_id')
 
-        db = get_db()
-        duel = db.duels.find_one({"room_code": room_code.upper(), "status": "waiting"})
+        duel_service = DuelService(get_db())
+        # Un seul find_one_and_update : seul le premier joueur à rejoindre passe de waiting à in_battle
+        duel = duel_service.join_room(room_code, clerk_id)
 
         if not duel:
+            if duel_service.is_room_host(room_code, clerk_id):
+                return jsonify({"success": False, "error": "Vous ne pouvez pas rejoindre votre propre duel"}), 400
             return jsonify({"success": False, "error": "Duel introuvable ou déjà commencé"}), 404
 
-        if duel['player1_id'] == clerk_id:
-            return jsonify({"success": False, "error": "Vous ne pouvez pas rejoindre votre propre duel"}), 400
-
         duel_id = str(duel['_id'])
 
-        db.duels.update_one(
-            {"_id": duel['_id']},
-            {"$set": {"player2_id": clerk_id, "status": "in_battle"}}
-        )
+        publish_duel_event(duel_id, "joined", join_event(current_user))
 
         return jsonify({
             "success": True,
@@ -148,42 +125,60 @@ def join_duel(room_code):
 def get_duel(duel_id):
     try:
         db = get_db()
+        duel_service = DuelService(db)
         duel = db.duels.find_one({"_id": ObjectId(duel_id)})
         if not duel:
             return jsonify({"success": False, "error": "Duel not found"}), 404
 
-        # Get player names
-        def get_name(clerk_id):
-            if not clerk_id:
-                return None
-            user = db.users.find_one({"clerk_id": clerk_id})
-            if user:
-                return f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
-            return clerk_id
-
         return jsonify({
             "success": True,
-            "duel": {
-                "_id": str(duel['_id']),
-                "room_code": duel.get('room_code'),
-                "quiz_id": duel.get('quiz_id'),
-                "status": duel.get('status'),
-                "player1_id": duel.get('player1_id'),
-                "player2_id": duel.get('player2_id'),
-                "player1_name": get_name(duel.get('player1_id')),
-                "player2_name": get_name(duel.get('player2_id')),
-                "player1_score": duel.get('player1_score', 0),
-                "player2_score": duel.get('player2_score', 0),
-                "player1_done": duel.get('player1_done', False),
-                "player2_done": duel.get('player2_done', False),
-                "winner_id": duel.get('winner_id'),
-            }
+            "duel": duel_service.describe(duel)
         }), 200
 
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@duel_bp.route('/duel/<duel_id>/events', methods=['GET'])
+@clerk_auth_middleware
+def duel_events(duel_id):
+    """
+    Server-Sent Events stream replacing GET /duel/<id> polling: a `snapshot`
+    event with the current state, then `joined`, `submitted` and `finished`.
+    The stream ends after SSE_MAX_DURATION_SECONDS and EventSource reconnects.
+    """
+    subscription = None
+    try:
+        db = get_db()
+        duel_service = DuelService(db)
+
+        # Abonnement avant la lecture du snapshot pour ne rater aucun événement
+        subscription = broker.subscribe(duel_channel(duel_id))
+        duel = duel_service.find_duel(duel_id)
+        if not duel:
+            subscription.close()
+            return jsonify({"success": False, "error": "Duel not found"}), 404
+
+        stream = stream_duel_events(
+            subscription,
+            {"duel_id": duel_id, "duel": duel_service.describe(duel)},
+            heartbeat=SSE_HEARTBEAT_SECONDS,
+            max_duration=SSE_MAX_DURATION_SECONDS
+        )
+        response = Response(stream, mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+        # Un générateur jamais itéré (client parti avant le premier octet) n'exécute pas son finally
+        response.call_on_close(subscription.close)
+        return response
+
+    except Exception as e:
+        if subscription is not None:
+            subscription.close()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 
 
 @duel_bp.route('/duel/<duel_id>/submit', methods=['POST'])
@@ -197,7 +192,8 @@ def submit_duel(duel_id):
         clerk_id = current_user.get('clerk_id')
 
         db = get_db()
-        duel = db.duels.find_one({"_id": ObjectId(duel_id)})
+        duel_service = DuelService(db)
+        duel = duel_service.duel_header(duel_id)
         if not duel:
             return jsonify({"success": False, "error": "Duel not found"}), 404
 
@@ -209,72 +205,36 @@ def submit_duel(duel_id):
 
 
         quiz_service = QuizService(db)
-        user_answers = [UserAnswerModel(**ans) for ans in answers]
+        user_answers = validate_answers(answers)
         quiz_result = quiz_service.calculate_quiz_score(duel['quiz_id'], user_answers)
         total_score = quiz_result.score
         print(f"[DUEL SCORE] player={'p1' if is_player1 else 'p2'} score={total_score}")
 
-        # Update the duel
-        score_field = 'player1_score' if is_player1 else 'player2_score'
-        done_field = 'player1_done' if is_player1 else 'player2_done'
-
-        update = {"$set": {score_field: total_score, done_field: True}}
-        db.duels.update_one({"_id": ObjectId(duel_id)}, update)
+        # Score enregistré une seule fois par joueur, duel renvoyé après mise à jour
+        duel = duel_service.record_score(duel['_id'], is_player1, clerk_id, total_score)
+        if not duel:
+            return jsonify({"success": False, "error": "Answers already submitted for this duel"}), 409
 
+        record_quiz_stats(db, quiz_result, "duel")
 
-        duel = db.duels.find_one({"_id": ObjectId(duel_id)})
         both_done = duel.get('player1_done') and duel.get('player2_done')
+        publish_duel_event(duel_id, "submitted", submission_event(duel, is_player1, clerk_id))
 
         winner_id = None
         elo_change = 0
 
         if both_done:
-            p1_score = duel.get('player1_score', 0)
-            p2_score = duel.get('player2_score', 0)
-
-            if p1_score > p2_score:
-                winner_id = duel['player1_id']
-            elif p2_score > p1_score:
-                winner_id = duel.get('player2_id')
-            # else: draw — no winner
-
-            db.duels.update_one(
-                {"_id": ObjectId(duel_id)},
-                {"$set": {"status": "finished", "winner_id": winner_id}}
-            )
-
-            # Update ELO and stats
-            ELO_CHANGE = 20
-            p1_id = duel['player1_id']
-            p2_id = duel.get('player2_id')
-
-            if p2_id:
-                if winner_id == p1_id:
-                    db.users.update_one({"clerk_id": p1_id}, {"$inc": {"elo": ELO_CHANGE, "wins": 1, "total_duels": 1}})
-                    db.users.update_one({"clerk_id": p2_id}, {"$inc": {"elo": -ELO_CHANGE, "losses": 1, "total_duels": 1}})
-                elif winner_id == p2_id:
-                    db.users.update_one({"clerk_id": p2_id}, {"$inc": {"elo": ELO_CHANGE, "wins": 1, "total_duels": 1}})
-                    db.users.update_one({"clerk_id": p1_id}, {"$inc": {"elo": -ELO_CHANGE, "losses": 1, "total_duels": 1}})
-                else:
-                    # Draw
-                    db.users.update_one({"clerk_id": p1_id}, {"$inc": {"total_duels": 1}})
-                    db.users.update_one({"clerk_id": p2_id}, {"$inc": {"total_duels": 1}})
-
-            if winner_id == clerk_id:
-                elo_change = ELO_CHANGE
-            elif winner_id and winner_id != clerk_id:
-                elo_change = -ELO_CHANGE
+            finalized, winner_id, p1_inc, p2_inc = duel_service.finalize(duel)
+            finished = apply_duel_outcome(duel, finalized, winner_id, p1_inc, p2_inc)
+            if finished:
+                publish_duel_event(duel_id, "finished", finished)
 
-        return jsonify({
-            "success": True,
-            "score": total_score,
-            "both_done": both_done,
-            "winner_id": winner_id,
-            "elo_change": elo_change,
-            "player1_score": duel.get('player1_score', 0) if is_player1 else None,
-            "player2_score": duel.get('player2_score', 0) if is_player2 else None,
-        }), 200
+            elo_change = (p1_inc if is_player1 else p2_inc).get("elo", 0)
+
+        return jsonify(submission_view(duel, is_player1, total_score, both_done, winner_id, elo_change)), 200
 
+    except (ValidationError, PayloadError) as e:
+        return jsonify(validation_error_body(e)), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -293,8 +253,8 @@ def my_duels():
             "$or": [{"player1_id": clerk_id}, {"player2_id": clerk_id}]
         }).sort("created_at", -1).limit(20))
 
-        for d in duels:
-            d['_id'] = str(d['_id'])
+        # Noms des joueurs inclus directement : plus besoin d'un GET /duel/<id> par ligne
+        DuelService(db).with_player_names(duels)
 
         return jsonify({"success": True, "duels": duels}), 200
 
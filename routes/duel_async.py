@@ -0,0 +1,203 @@
+from bson import ObjectId
+from pydantic import ValidationError
+from quart import Blueprint, Response, request, jsonify
+
+from config.db import get_async_db
+from middleware.clerk_auth_async import async_clerk_auth_middleware, get_current_user
+from routes.duel import SSE_ASYNC_MAX_DURATION_SECONDS, SSE_HEARTBEAT_SECONDS
+from services.duel_events import broker, duel_channel, publish_duel_event_async, stream_duel_events_async
+from services.duel_service import apply_duel_outcome, join_event, submission_event, submission_view
+from services.duel_service_async import AsyncDuelService
+from services.quiz_service_async import AsyncQuizService
+from services.quiz_stats import record_quiz_stats_async
+from services.validation import PayloadError, validate_answers, validation_error_body
+
+# Mêmes routes et mêmes réponses JSON que routes/duel.py, pour le mode ASGI (asgi.py)
+duel_bp = Blueprint('duel', __name__)
+
+
+@duel_bp.route('/duel/create', methods=['POST'])
+@async_clerk_auth_middleware
+async def create_duel():
+    try:
+        data = await request.get_json()
+        quiz_id = data.get('quiz_id')
+        if not quiz_id:
+            return jsonify({"success": False, "error": "quiz_id is required"}), 400
+
+        current_user = get_current_user()
+        clerk_id = current_user.get('clerk_id')
+
+        db = get_async_db()
+
+        quiz = None
+        if ObjectId.is_valid(quiz_id):
+            quiz = await db.quizzes.find_one({"_id": ObjectId(quiz_id)}, {"_id": 1})
+        if not quiz:
+            return jsonify({"success": False, "error": "Quiz not found"}), 404
+
+        duel_id, room_code = await AsyncDuelService(db).create_room(quiz_id, clerk_id)
+
+        return jsonify({
+            "success": True,
+            "duel_id": duel_id,
+            "room_code": room_code
+        }), 201
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@duel_bp.route('/duel/join/<room_code>', methods=['POST'])
+@async_clerk_auth_middleware
+async def join_duel(room_code):
+    try:
+        current_user = get_current_user()
+        clerk_id = current_user.get('clerk_id')
+
+        duel_service = AsyncDuelService(get_async_db())
+        # Un seul find_one_and_update : seul le premier joueur à rejoindre passe de waiting à in_battle
+        duel = await duel_service.join_room(room_code, clerk_id)
+
+        if not duel:
+            if await duel_service.is_room_host(room_code, clerk_id):
+                return jsonify({"success": False, "error": "Vous ne pouvez pas rejoindre votre propre duel"}), 400
+            return jsonify({"success": False, "error": "Duel introuvable ou déjà commencé"}), 404
+
+        duel_id = str(duel['_id'])
+
+        await publish_duel_event_async(duel_id, "joined", join_event(current_user))
+
+        return jsonify({
+            "success": True,
+            "duel_id": duel_id,
+            "quiz_id": duel['quiz_id']
+        }), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@duel_bp.route('/duel/<duel_id>', methods=['GET'])
+@async_clerk_auth_middleware
+async def get_duel(duel_id):
+    try:
+        duel_service = AsyncDuelService(get_async_db())
+        duel = await duel_service.db.duels.find_one({"_id": ObjectId(duel_id)})
+        if not duel:
+            return jsonify({"success": False, "error": "Duel not found"}), 404
+
+        return jsonify({
+            "success": True,
+            "duel": await duel_service.describe(duel)
+        }), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@duel_bp.route('/duel/<duel_id>/events', methods=['GET'])
+@async_clerk_auth_middleware
+async def duel_events(duel_id):
+    subscription = None
+    try:
+        duel_service = AsyncDuelService(get_async_db())
+
+        # Abonnement avant la lecture du snapshot pour ne rater aucun événement
+        subscription = broker.subscribe_async(duel_channel(duel_id))
+        duel = await duel_service.find_duel(duel_id)
+        if not duel:
+            subscription.close()
+            return jsonify({"success": False, "error": "Duel not found"}), 404
+
+        stream = stream_duel_events_async(
+            subscription,
+            {"duel_id": duel_id, "duel": await duel_service.describe(duel)},
+            heartbeat=SSE_HEARTBEAT_SECONDS,
+            max_duration=SSE_ASYNC_MAX_DURATION_SECONDS
+        )
+        response = Response(stream, mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+        response.timeout = None
+        return response
+
+    except Exception as e:
+        if subscription is not None:
+            subscription.close()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@duel_bp.route('/duel/<duel_id>/submit', methods=['POST'])
+@async_clerk_auth_middleware
+async def submit_duel(duel_id):
+    try:
+        data = await request.get_json()
+        answers = data.get('answers', [])
+
+        current_user = get_current_user()
+        clerk_id = current_user.get('clerk_id')
+
+        db = get_async_db()
+        duel_service = AsyncDuelService(db)
+        duel = await duel_service.duel_header(duel_id)
+        if not duel:
+            return jsonify({"success": False, "error": "Duel not found"}), 404
+
+        is_player1 = (duel['player1_id'] == clerk_id)
+        is_player2 = (duel.get('player2_id') == clerk_id)
+
+        if not is_player1 and not is_player2:
+            return jsonify({"success": False, "error": "You are not part of this duel"}), 403
+
+        user_answers = validate_answers(answers)
+        quiz_result = await AsyncQuizService(db).calculate_quiz_score(duel['quiz_id'], user_answers)
+        total_score = quiz_result.score
+
+        duel = await duel_service.record_score(duel['_id'], is_player1, clerk_id, total_score)
+        if not duel:
+            return jsonify({"success": False, "error": "Answers already submitted for this duel"}), 409
+
+        await record_quiz_stats_async(db, quiz_result, "duel")
+
+        both_done = duel.get('player1_done') and duel.get('player2_done')
+        await publish_duel_event_async(duel_id, "submitted", submission_event(duel, is_player1, clerk_id))
+
+        winner_id = None
+        elo_change = 0
+
+        if both_done:
+            finalized, winner_id, p1_inc, p2_inc = await duel_service.finalize(duel)
+            finished = apply_duel_outcome(duel, finalized, winner_id, p1_inc, p2_inc)
+            if finished:
+                await publish_duel_event_async(duel_id, "finished", finished)
+
+            elo_change = (p1_inc if is_player1 else p2_inc).get("elo", 0)
+
+        return jsonify(submission_view(duel, is_player1, total_score, both_done, winner_id, elo_change)), 200
+
+    except (ValidationError, PayloadError) as e:
+        return jsonify(validation_error_body(e)), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@duel_bp.route('/duel/my-duels', methods=['GET'])
+@async_clerk_auth_middleware
+async def my_duels():
+    try:
+        current_user = get_current_user()
+        clerk_id = current_user.get('clerk_id')
+        duel_service = AsyncDuelService(get_async_db())
+
+        duels = await duel_service.db.duels.find({
+            "$or": [{"player1_id": clerk_id}, {"player2_id": clerk_id}]
+        }).sort("created_at", -1).limit(20).to_list(None)
+
+        await duel_service.with_player_names(duels)
+
+        return jsonify({"success": True, "duels": duels}), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
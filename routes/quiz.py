@@ -1,51 +1,67 @@
 
 import httpx
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from pydantic import ValidationError
 from models.quiz_model import QuizResult, UserAnswerModel, QuestionModel, QuizModel
-from services.quiz_service import QuizService
-from config.db import mongodb_connection
+from services.quiz_service import (
+    ANSWER_KEY_ALLOWED_CLERK_IDS, QuestionLookupError, QuizService,
+    new_solo_session_view, solo_session_view, solo_submission_view,
+)
+from config.db import get_db
 from middleware.clerk_auth import clerk_auth_middleware, get_current_user
-import csv
-import io
+from services.question_import import IMPORT_FORMATS, detect_format, import_questions
+from services.pagination import DEFAULT_PAGE_SIZE, InvalidCursorError
+from services.quiz_stats import get_quiz_stats
+from services.validation import PayloadError, validate_answers, validate_quiz, validation_error_body
+from services.results_export import (
+    EXPORT_ALLOWED_CLERK_IDS, EXPORT_FORMATS, EXPORT_MIMETYPES, export_results, parse_date, results_query,
+)
 quiz_bp = Blueprint('quiz', __name__)
 
 @quiz_bp.route('/quiz/get-all-quizzes', methods=['GET'])
 @clerk_auth_middleware
 def get_all_quizzes():
-    mongo_client = mongodb_connection()
-    db = mongo_client.get_database("hackathon_db")
+    db = get_db()
     quiz_service = QuizService(db)
 
     quizzes = quiz_service.get_all_quizzes()
     return jsonify(quizzes), 200
 
 
+@quiz_bp.route('/quiz/quizzes', methods=['GET'])
+@clerk_auth_middleware
+def list_quizzes():
+    """
+    Paginated listing: ?limit=&cursor=&category=&difficulty=&fields=title,category
+    Pass back `next_cursor` as `cursor` to get the next page (null on the last one).
+    """
+    try:
+        quizzes, next_cursor = QuizService(get_db()).list_quizzes(
+            category=request.args.get('category'),
+            difficulty=request.args.get('difficulty'),
+            fields=request.args.get('fields'),
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+            cursor=request.args.get('cursor'),
+        )
+        return jsonify({"success": True, "quizzes": quizzes, "next_cursor": next_cursor}), 200
+    except InvalidCursorError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @quiz_bp.route('/quiz/page/<quiz_id>', methods=['GET'])
 @clerk_auth_middleware
 def get_page_quiz_by_id(quiz_id):
-    from bson import ObjectId
-
-    mongo_client = mongodb_connection()
-    db = mongo_client.get_database("hackathon_db")
+    db = get_db()
 
     try:
-        # Try to find by MongoDB ObjectId first (sent from frontend as quiz._id)
-        quiz_data = None
+        # ObjectId (sent from frontend as quiz._id) or custom string id, via the quiz cache
         try:
-            quiz_data = db.quizzes.find_one({"_id": ObjectId(quiz_id)})
-        except Exception:
-            pass
-
-        # Fallback: try by custom string id field
-        if not quiz_data:
-            quiz_data = db.quizzes.find_one({"id": quiz_id})
-
-        if not quiz_data:
+            quiz_data = QuizService(db).get_quiz_document(quiz_id)
+        except ValueError:
             return jsonify({"success": False, "message": "Quiz not found"}), 404
 
-        quiz_data['_id'] = str(quiz_data['_id'])
-
         return jsonify({"success": True, "quiz": quiz_data}), 200
 
     except Exception as e:
@@ -55,12 +71,15 @@ def get_page_quiz_by_id(quiz_id):
 @quiz_bp.route('/quiz/<quiz_id>', methods=['GET'])
 @clerk_auth_middleware
 def get_quiz_by_id(quiz_id):
-    mongo_client = mongodb_connection()
-    db = mongo_client.get_database("hackathon_db")
+    db = get_db()
     try:
         quiz_service = QuizService(db)
-        quiz_data = quiz_service.get_quiz_by_id(quiz_id)
-        return jsonify({"success": True, "quiz": quiz_data}), 200
+        body, etag = quiz_service.get_quiz_payload(quiz_id)
+        response = Response(body, status=200, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        # Renvoie 304 si le client a déjà cette version (If-None-Match)
+        return response.make_conditional(request)
     except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 404
     except Exception as e:
@@ -71,8 +90,7 @@ def get_quiz_by_id(quiz_id):
 def create_question():
     try:
         data = request.get_json()
-        mongo_client = mongodb_connection()
-        db = mongo_client.get_database("hackathon_db")
+        db = get_db()
         quiz_service = QuizService(db)
         question_id = quiz_service.create_question(data)
         return jsonify({
@@ -85,34 +103,83 @@ def create_question():
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to create question: {str(e)}"}), 500
 
+@quiz_bp.route('/quiz/import-questions', methods=['POST'])
+@clerk_auth_middleware
+def import_questions_route():
+    """
+    Bulk import: multipart `file` upload (.csv / .jsonl) or a raw CSV / NDJSON body.
+    The upload is streamed and inserted in batches; invalid rows are reported, not fatal.
+    """
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            stream = upload.stream
+            fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+        else:
+            stream = request.stream
+            fmt = request.args.get('format') or detect_format(None, request.mimetype)
+
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({"success": False, "error": f"Unsupported format, expected one of {', '.join(IMPORT_FORMATS)}"}), 400
+
+        summary = import_questions(get_db(), stream, fmt)
+        return jsonify({"success": summary["failed"] == 0, **summary}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to import questions: {str(e)}"}), 500
+
+def _question_page():
+    return QuizService(get_db()).list_questions(
+        category=request.args.get('category'),
+        fields=request.args.get('fields'),
+        limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+        cursor=request.args.get('cursor'),
+        include_answers=request.clerk_user_id in ANSWER_KEY_ALLOWED_CLERK_IDS,
+    )
+
 @quiz_bp.route('/quiz/get-all-questions', methods=['GET'])
 @clerk_auth_middleware
 def get_all_questions():
+    """
+    Former unbounded dump of the question bank, now one page of /quiz/questions:
+    same parameters, same rules for correct_answer, plus `count`.
+    """
     try:
-        mongo_client = mongodb_connection()
-        db = mongo_client.get_database("hackathon_db")
-        quiz_service = QuizService(db)
-
-        questions = quiz_service.get_all_questions()
-        
+        questions, next_cursor = _question_page()
         return jsonify({
             "success": True,
             "questions": questions,
-            "count": len(questions)
+            "count": len(questions),
+            "next_cursor": next_cursor
         }), 200
-        
+    except InvalidCursorError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "success": False,
             "error": f"Failed to retrieve questions: {str(e)}"
         }), 500
 
+@quiz_bp.route('/quiz/questions', methods=['GET'])
+@clerk_auth_middleware
+def list_questions():
+    """
+    Paginated question bank: ?limit=&cursor=&category=&fields=text,options,correct_answer
+    correct_answer is only returned when listed in `fields`, and only to the
+    accounts allowed to see answer keys (ANSWER_KEY_CLERK_IDS).
+    """
+    try:
+        questions, next_cursor = _question_page()
+        return jsonify({"success": True, "questions": questions, "next_cursor": next_cursor}), 200
+    except InvalidCursorError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to retrieve questions: {str(e)}"}), 500
+
 @quiz_bp.route('/quiz/get-question/<int:question_id>', methods=['GET'])
 @clerk_auth_middleware
 def get_question_by_id(question_id):
     try:
-        mongo_client = mongodb_connection()
-        db = mongo_client.get_database("hackathon_db")
+        db = get_db()
         quiz_service = QuizService(db)
 
         question = quiz_service.get_question_by_id(question_id)
@@ -140,13 +207,13 @@ def create_quiz():
         data = request.get_json()
 
         if 'questions' in data:
+            # Corps validé avant insertion : champs manquants ou mal typés -> 400 détaillé
+            quiz = validate_quiz(data)
 
-            mongo_client = mongodb_connection()
-            db = mongo_client.get_database("hackathon_db")
+            db = get_db()
             quiz_service = QuizService(db)
-            
 
-            quiz_id = quiz_service.create_quiz(data)
+            quiz_id = quiz_service.create_quiz(quiz.model_dump(exclude_none=True))
             
             return jsonify({
                 "success": True,
@@ -155,19 +222,19 @@ def create_quiz():
             }), 201
         elif 'question_ids' in data:
             # Cas pour créer un quiz depuis des IDs de questions existants
-            mongo_client = mongodb_connection()
-            db = mongo_client.get_database("hackathon_db")
+            db = get_db()
             quiz_service = QuizService(db)
 
-            # Récupérer les questions complètes depuis MongoDB (avec correct_answer)
-            questions = []
-            for question_id in data['question_ids']:
-                from bson import ObjectId
-                q = db.questions.find_one({"_id": ObjectId(question_id)})
-                if q:
-                    q.pop("_id", None)
-                    # S'assurer que tous les champs requis par QuestionModel sont présents
-                    questions.append(q)
+            # Récupérer les questions complètes depuis MongoDB (avec correct_answer), en une requête
+            try:
+                questions = quiz_service.get_questions_by_ids([str(qid) for qid in data['question_ids']])
+            except QuestionLookupError as e:
+                return jsonify({
+                    "success": False,
+                    "error": str(e),
+                    "invalid_ids": e.invalid_ids,
+                    "missing_ids": e.missing_ids
+                }), 400
 
             # Créer un objet quiz complet avec le bon mapping de champs
             quiz_data = {
@@ -186,7 +253,7 @@ def create_quiz():
             }), 201
         else:
 
-            user_answers = [UserAnswerModel(**answer) for answer in data.get('answers', [])]
+            user_answers = validate_answers(data.get('answers', []))
             
             quiz_result_data = {
                 'clerk_id': data.get('clerk_id'),
@@ -196,8 +263,7 @@ def create_quiz():
             }
             quiz_result = QuizResult(**quiz_result_data)
             
-            mongo_client = mongodb_connection()
-            db = mongo_client.get_database("hackathon_db")
+            db = get_db()
             
             current_user = get_current_user()
             if current_user:
@@ -221,18 +287,60 @@ def create_quiz():
                 "result_id": result_id
             }), 200
             
-    except ValidationError as e:
-        return jsonify({
-            "success": False,
-            "error": "Validation failed",
-            "details": e.errors()
-        }), 400
+    except (ValidationError, PayloadError) as e:
+        return jsonify(validation_error_body(e)), 400
     except Exception as e:
         return jsonify({
             "success": False,
             "error": f"Failed to process quiz: {str(e)}"
         }), 500
 
+@quiz_bp.route('/quiz/results/export', methods=['GET'])
+@clerk_auth_middleware
+def export_quiz_results():
+    """
+    Streamed results export: ?format=ndjson|csv&quiz_id=&clerk_id=&since=&until= (ISO dates).
+    Accounts outside RESULTS_EXPORT_CLERK_IDS only get their own results.
+    """
+    try:
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({"success": False, "error": f"Unsupported format, expected one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+        try:
+            since = parse_date(request.args.get('since'))
+            until = parse_date(request.args.get('until'))
+        except ValueError:
+            return jsonify({"success": False, "error": "since/until must be ISO dates"}), 400
+
+        clerk_id = request.args.get('clerk_id')
+        if request.clerk_user_id not in EXPORT_ALLOWED_CLERK_IDS:
+            clerk_id = request.clerk_user_id
+
+        query = results_query(request.args.get('quiz_id'), clerk_id, since, until)
+        filename = f"results.{fmt}"
+        return Response(
+            export_results(get_db(), fmt, query),
+            mimetype=EXPORT_MIMETYPES[fmt],
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to export results: {str(e)}"}), 500
+
+
+@quiz_bp.route('/quiz/<quiz_id>/stats', methods=['GET'])
+@clerk_auth_middleware
+def get_quiz_stats_route(quiz_id):
+    """
+    Live per-quiz / per-question counters, maintained with $inc on each submission:
+    a single document read, whatever the number of results.
+    """
+    try:
+        return jsonify({"success": True, "stats": get_quiz_stats(get_db(), quiz_id)}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @quiz_bp.route('/quiz/soloquiz/<quiz_id>', methods=['POST', 'GET'])
 @clerk_auth_middleware
 def start_solo_quiz(quiz_id):
@@ -240,36 +348,20 @@ def start_solo_quiz(quiz_id):
         current_user = get_current_user()
         clerk_id = current_user.get('clerk_id')
 
-        mongo_client = mongodb_connection()
-        db = mongo_client.get_database("hackathon_db")
+        db = get_db()
         quiz_service = QuizService(db)
 
         # Check existing session for this user+quiz
         session_check = quiz_service.check_solo_session(quiz_id, clerk_id)
 
-        if session_check['status'] == 'finished':
-            return jsonify({
-                "success": False,
-                "status": "finished",
-                "error": "Vous avez déjà complété ce quiz."
-            }), 409
-
-        if session_check['status'] == 'in_progress':
-            return jsonify({
-                "success": True,
-                "status": "in_progress",
-                "session_id": session_check['session_id'],
-                "message": "Session en cours récupérée."
-            }), 200
+        existing = solo_session_view(session_check)
+        if existing is not None:
+            body, status_code = existing
+            return jsonify(body), status_code
 
         # Create a fresh session
         session_id = quiz_service.create_solo_session(quiz_id, clerk_id)
-        return jsonify({
-            "success": True,
-            "status": "new",
-            "session_id": session_id,
-            "message": "Session solo créée."
-        }), 201
+        return jsonify(new_solo_session_view(session_id)), 201
 
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to create solo session: {str(e)}"}), 500
@@ -284,34 +376,24 @@ def submit_solo_quiz():
         quiz_id = data.get('quiz_id')
         answers = data.get('answers', [])
 
-        mongo_client = mongodb_connection()
-        db = mongo_client.get_database("hackathon_db")
+        db = get_db()
         quiz_service = QuizService(db)
 
         current_user = get_current_user()
         clerk_id = current_user.get('clerk_id')
 
-        user_answers = [UserAnswerModel(**ans) for ans in answers]
+        user_answers = validate_answers(answers)
         quiz_result = quiz_service.calculate_quiz_score(quiz_id, user_answers)
         quiz_result.clerk_id = clerk_id
 
         result_id = quiz_service.save_quiz_result(quiz_result)
 
         if session_id:
-            from bson import ObjectId
-            db.solo_sessions.update_one(
-                {"_id": ObjectId(session_id)},
-                {"$set": {"status": "finished", "score": quiz_result.score}}
-            )
+            quiz_service.finish_solo_session(session_id, quiz_result.score)
 
-        return jsonify({
-            "success": True,
-            "score": quiz_result.score,
-            "details": [a.model_dump() if hasattr(a, 'model_dump') else a for a in quiz_result.answers],
-            "result_id": result_id
-        }), 200
+        return jsonify(solo_submission_view(quiz_result, result_id)), 200
 
-    except ValidationError as e:
-        return jsonify({"success": False, "error": "Validation failed", "details": e.errors()}), 400
+    except (ValidationError, PayloadError) as e:
+        return jsonify(validation_error_body(e)), 400
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to submit solo quiz: {str(e)}"}), 500
@@ -0,0 +1,107 @@
+from pydantic import ValidationError
+from quart import Blueprint, Response, request, jsonify
+
+from config.db import get_async_db
+from middleware.clerk_auth_async import async_clerk_auth_middleware, get_current_user
+from services.quiz_service import new_solo_session_view, solo_session_view, solo_submission_view
+from services.quiz_service_async import AsyncQuizService
+from services.validation import PayloadError, validate_answers, validation_error_body
+
+# Mêmes routes et mêmes réponses JSON que routes/quiz.py, pour le mode ASGI (asgi.py)
+quiz_bp = Blueprint('quiz', __name__)
+
+
+@quiz_bp.route('/quiz/get-all-quizzes', methods=['GET'])
+@async_clerk_auth_middleware
+async def get_all_quizzes():
+    quiz_service = AsyncQuizService(get_async_db())
+
+    quizzes = await quiz_service.get_all_quizzes()
+    return jsonify(quizzes), 200
+
+
+@quiz_bp.route('/quiz/page/<quiz_id>', methods=['GET'])
+@async_clerk_auth_middleware
+async def get_page_quiz_by_id(quiz_id):
+    try:
+        try:
+            quiz_data = await AsyncQuizService(get_async_db()).get_quiz_document(quiz_id)
+        except ValueError:
+            return jsonify({"success": False, "message": "Quiz not found"}), 404
+
+        return jsonify({"success": True, "quiz": quiz_data}), 200
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@quiz_bp.route('/quiz/<quiz_id>', methods=['GET'])
+@async_clerk_auth_middleware
+async def get_quiz_by_id(quiz_id):
+    try:
+        quiz_service = AsyncQuizService(get_async_db())
+        body, etag = await quiz_service.get_quiz_payload(quiz_id)
+        response = Response(body, status=200, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        await response.make_conditional(request)
+        return response
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": "Une erreur est survenue"}), 500
+
+
+@quiz_bp.route('/quiz/soloquiz/<quiz_id>', methods=['POST', 'GET'])
+@async_clerk_auth_middleware
+async def start_solo_quiz(quiz_id):
+    try:
+        current_user = get_current_user()
+        clerk_id = current_user.get('clerk_id')
+
+        quiz_service = AsyncQuizService(get_async_db())
+
+        session_check = await quiz_service.check_solo_session(quiz_id, clerk_id)
+
+        existing = solo_session_view(session_check)
+        if existing is not None:
+            body, status_code = existing
+            return jsonify(body), status_code
+
+        session_id = await quiz_service.create_solo_session(quiz_id, clerk_id)
+        return jsonify(new_solo_session_view(session_id)), 201
+
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to create solo session: {str(e)}"}), 500
+
+
+@quiz_bp.route('/quiz/submit-solo', methods=['POST'])
+@async_clerk_auth_middleware
+async def submit_solo_quiz():
+    try:
+        data = await request.get_json()
+        session_id = data.get('session_id')
+        quiz_id = data.get('quiz_id')
+        answers = data.get('answers', [])
+
+        db = get_async_db()
+        quiz_service = AsyncQuizService(db)
+
+        current_user = get_current_user()
+        clerk_id = current_user.get('clerk_id')
+
+        user_answers = validate_answers(answers)
+        quiz_result = await quiz_service.calculate_quiz_score(quiz_id, user_answers)
+        quiz_result.clerk_id = clerk_id
+
+        result_id = await quiz_service.save_quiz_result(quiz_result)
+
+        if session_id:
+            await quiz_service.finish_solo_session(session_id, quiz_result.score)
+
+        return jsonify(solo_submission_view(quiz_result, result_id)), 200
+
+    except (ValidationError, PayloadError) as e:
+        return jsonify(validation_error_body(e)), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Failed to submit solo quiz: {str(e)}"}), 500
@@ -7,7 +7,6 @@ from functools import wraps
 from flask import request, jsonify
 from clerk_backend_api import Clerk
 from clerk_backend_api.security.types import AuthenticateRequestOptions
-from config.db import mongodb_connection
 import httpx
 from clerk_backend_api.security.types import AuthenticateRequestOptions
 load_dotenv("key.env")
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import jwt
+from dotenv import load_dotenv
+
+load_dotenv("key.env")
+
+CLERK_API_URL = os.getenv("CLERK_API_URL", "https://api.clerk.com")
+
+# Préfixes des tokens machine Clerk (m2m, OAuth, API keys) : ils ne sont pas
+# des JWT de session et doivent passer par l'API Clerk.
+MACHINE_TOKEN_PREFIXES = ("mt_", "m2m_", "oat_", "ak_")
+
+
+class SessionTokenError(ValueError):
+    """Raised when a session token cannot be verified; the message is the reason."""
+
+
+def get_session_token(headers) -> Optional[str]:
+    """
+    Same lookup order as Clerk: Authorization bearer first, then the __session cookie.
+    """
+    bearer_token = headers.get("Authorization")
+    if bearer_token is not None:
+        return bearer_token.replace("Bearer ", "")
+
+    cookie_header = headers.get("Cookie")
+    if cookie_header:
+        cookies = SimpleCookie(cookie_header)
+        for key, morsel in cookies.items():
+            if key.startswith("__session"):
+                return morsel.value
+
+    return None
+
+
+def is_machine_token(token: str) -> bool:
+    return token.startswith(MACHINE_TOKEN_PREFIXES)
+
+
+def fetch_clerk_jwks(secret_key: str, api_url: str = CLERK_API_URL, timeout: float = 5.0) -> Dict[str, Any]:
+    response = httpx.get(
+        f"{api_url.rstrip('/')}/v1/jwks",
+        headers={"Authorization": f"Bearer {secret_key}"},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_clerk_jwks_async(secret_key: str, api_url: str = CLERK_API_URL, timeout: float = 5.0) -> Dict[str, Any]:
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        response = await client.get(
+            f"{api_url.rstrip('/')}/v1/jwks",
+            headers={"Authorization": f"Bearer {secret_key}"},
+        )
+    response.raise_for_status()
+    return response.json()
+
+
+class JWKSCache:
+    """
+    Signing keys indexed by kid, refreshed every `ttl` seconds.
+    An unknown kid triggers an early refresh (key rotation). Every refresh
+    attempt, failed or not, is rate-limited by `min_refresh_interval`: garbage
+    tokens cannot hammer the JWKS endpoint, and while Clerk is down the old
+    keys keep being served instead of blocking each request on a timeout.
+    """
+
+    def __init__(self, fetch_jwks: Callable[[], Dict[str, Any]], ttl: float = 3600, min_refresh_interval: float = 30):
+        self.fetch_jwks = fetch_jwks
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._attempted_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load_jwks(self, jwks: Dict[str, Any]) -> None:
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            if jwk.get("kty") != "RSA" or not jwk.get("kid"):
+                continue
+            keys[jwk["kid"]] = jwt.PyJWK(jwk, algorithm="RS256").key
+        self._keys = keys
+        self._fetched_at = self._attempted_at = time.monotonic()
+
+    def note_refresh_attempt(self) -> None:
+        """
+        Starts the backoff window; called before fetching, so a failed fetch
+        is not retried before `min_refresh_interval` has elapsed.
+        """
+        self._attempted_at = time.monotonic()
+
+    def _refresh(self):
+        self.note_refresh_attempt()
+        self.load_jwks(self.fetch_jwks())
+
+    def needs_refresh(self, kid: Optional[str]) -> bool:
+        """
+        True when get_key(kid) would fetch the JWKS: the keys are expired or
+        the kid is unknown, and no attempt was made in the last `min_refresh_interval`.
+        """
+        now = time.monotonic()
+        if self._attempted_at is not None and now - self._attempted_at < self.min_refresh_interval:
+            return False
+        return now - self._fetched_at >= self.ttl or kid not in self._keys
+
+    def get_key(self, kid: Optional[str], fetch: bool = True):
+        """
+        With fetch=False the JWKS endpoint is never called (async callers
+        fetch it themselves with fetch_clerk_jwks_async + load_jwks).
+        """
+        key = self._keys.get(kid)
+        if key is not None and time.monotonic() - self._fetched_at < self.ttl:
+            return key
+
+        if fetch and self.needs_refresh(kid):
+            with self._lock:
+                # Un autre thread a peut-être déjà rafraîchi pendant l'attente du verrou
+                if self.needs_refresh(kid):
+                    try:
+                        self._refresh()
+                    except Exception as e:
+                        # On garde les anciennes clés si Clerk est injoignable
+                        print(f"Failed to refresh Clerk JWKS: {e}")
+
+        # Clés expirées mais refresh en échec ou en attente : on sert les anciennes
+        key = self._keys.get(kid)
+        if key is None:
+            raise SessionTokenError("jwk-kid-mismatch" if self._keys else "jwks-unavailable")
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._fetched_at = 0.0
+            self._attempted_at = None
+
+
+class ClerkJWTVerifier:
+    """
+    Networkless verification of Clerk session JWTs (RS256) against a cached JWKS.
+    """
+
+    def __init__(self, jwks_cache: JWKSCache, authorized_parties: Optional[List[str]] = None,
+                 leeway: float = 5.0):
+        self.jwks_cache = jwks_cache
+        self.authorized_parties = authorized_parties
+        self.leeway = leeway
+
+    @staticmethod
+    def token_kid(token: str) -> Optional[str]:
+        try:
+            return jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError:
+            return None
+
+    def verify(self, token: str, allow_fetch: bool = True) -> Dict[str, Any]:
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError:
+            raise SessionTokenError("token-invalid")
+
+        if header.get("alg") != "RS256":
+            raise SessionTokenError("token-invalid-algorithm")
+
+        key = self.jwks_cache.get_key(header.get("kid"), fetch=allow_fetch)
+
+        try:
+            payload = jwt.decode(
+                token,
+                key,
+                algorithms=["RS256"],
+                leeway=self.leeway,
+                options={"verify_aud": False, "require": ["exp", "iat", "sub"]},
+            )
+        except jwt.ExpiredSignatureError:
+            raise SessionTokenError("token-expired")
+        except jwt.ImmatureSignatureError:
+            raise SessionTokenError("token-not-active-yet")
+        except jwt.InvalidSignatureError:
+            raise SessionTokenError("token-invalid-signature")
+        except jwt.InvalidTokenError:
+            raise SessionTokenError("token-invalid")
+
+        # Comme Clerk : azp n'est comparé que s'il est présent dans le token
+        azp = payload.get("azp")
+        if self.authorized_parties and azp and azp not in self.authorized_parties:
+            raise SessionTokenError("token-invalid-authorized-parties")
+
+        return payload
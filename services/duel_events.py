@@ -0,0 +1,223 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv("key.env")
+
+
+class Subscription:
+    """Events received on one channel, read with get() until close()."""
+
+    def __init__(self, broker, channel: str, maxsize: int = 100):
+        self.broker = broker
+        self.channel = channel
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=maxsize)
+
+    def put(self, event: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Client trop lent : on jette l'événement le plus ancien
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(event)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """
+    Subscription read from an asyncio event loop (ASGI mode): publishers may run
+    in any thread, events are handed over to the loop with call_soon_threadsafe.
+    """
+
+    def __init__(self, broker, channel: str, maxsize: int = 100):
+        super().__init__(broker, channel, maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.async_queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=maxsize)
+
+    def _put_in_loop(self, event: Dict[str, Any]) -> None:
+        if self.async_queue.full():
+            self.async_queue.get_nowait()
+        self.async_queue.put_nowait(event)
+
+    def put(self, event: Dict[str, Any]) -> None:
+        self.loop.call_soon_threadsafe(self._put_in_loop, event)
+
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.async_queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """
+    In-process pub/sub. Enough for a single worker and for tests; with several
+    workers, publishers and subscribers must share a broker such as RedisBroker.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str, subscription_class=Subscription) -> Subscription:
+        subscription = subscription_class(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def subscribe_async(self, channel: str) -> AsyncSubscription:
+        """Must be called from the event loop that will read the subscription."""
+        return self.subscribe(channel, AsyncSubscription)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    async def publish_async(self, channel: str, event: Dict[str, Any]) -> None:
+        # Rien de bloquant ici : les abonnés ne font que remplir une file en mémoire
+        self.publish(channel, event)
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+class RedisBroker(LocalBroker):
+    """
+    Fans events out across workers through Redis pub/sub: publish() goes to Redis,
+    and one listener thread per process relays Redis messages to the local subscribers.
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "duel-events:"):
+        super().__init__()
+        import redis
+
+        self.prefix = prefix
+        self.redis = redis.Redis.from_url(url)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.psubscribe(**{f"{prefix}*": self._relay})
+        self._thread = self.pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        self.redis.publish(self.prefix + channel, json.dumps(event, default=str))
+
+    async def publish_async(self, channel: str, event: Dict[str, Any]) -> None:
+        # Client redis synchrone : l'appel réseau part dans le pool de threads, pas sur la boucle
+        await asyncio.get_running_loop().run_in_executor(None, self.publish, channel, event)
+
+    def _relay(self, message) -> None:
+        channel = message["channel"].decode()[len(self.prefix):]
+        super().publish(channel, json.loads(message["data"]))
+
+
+def create_broker():
+    backend = os.getenv("DUEL_EVENTS_BROKER", "local").lower()
+    if backend == "redis":
+        return RedisBroker(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return LocalBroker()
+
+
+broker = create_broker()
+
+
+def duel_channel(duel_id: str) -> str:
+    return f"duel:{duel_id}"
+
+
+def publish_duel_event(duel_id: str, event_type: str, data: Optional[Dict[str, Any]] = None) -> None:
+    """Best effort: a broker failure must never fail the request that changed the duel."""
+    try:
+        broker.publish(duel_channel(duel_id), {"type": event_type, "duel_id": duel_id, **(data or {})})
+    except Exception as e:
+        print(f"Failed to publish duel event {event_type} for {duel_id}: {e}")
+
+
+async def publish_duel_event_async(duel_id: str, event_type: str, data: Optional[Dict[str, Any]] = None) -> None:
+    """publish_duel_event() for the async routes: the broker call does not block the event loop."""
+    try:
+        await broker.publish_async(duel_channel(duel_id), {"type": event_type, "duel_id": duel_id, **(data or {})})
+    except Exception as e:
+        print(f"Failed to publish duel event {event_type} for {duel_id}: {e}")
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def _should_stop(snapshot: Dict[str, Any]) -> bool:
+    return snapshot.get("duel", {}).get("status") == "finished"
+
+
+def stream_duel_events(subscription: Subscription, snapshot: Dict[str, Any],
+                       heartbeat: float = 15, max_duration: float = 900) -> Iterator[str]:
+    """
+    SSE stream: the current duel state first, then every event published on the
+    duel's channel until it is finished. Comments keep proxies from timing out.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        yield format_sse({"type": "snapshot", **snapshot})
+        if _should_stop(snapshot):
+            return
+
+        deadline = time.monotonic() + max_duration
+        while time.monotonic() < deadline:
+            event = subscription.get(timeout=heartbeat)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+            if event["type"] == "finished":
+                return
+    finally:
+        subscription.close()
+
+
+async def stream_duel_events_async(subscription: AsyncSubscription, snapshot: Dict[str, Any],
+                                   heartbeat: float = 15, max_duration: float = 900):
+    """stream_duel_events() for the ASGI mode: waiting for events does not hold a thread."""
+    try:
+        yield "retry: 3000\n\n"
+        yield format_sse({"type": "snapshot", **snapshot})
+        if _should_stop(snapshot):
+            return
+
+        deadline = time.monotonic() + max_duration
+        while time.monotonic() < deadline:
+            event = await subscription.get_async(timeout=heartbeat)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+            if event["type"] == "finished":
+                return
+    finally:
+        subscription.close()
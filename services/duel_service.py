@@ -0,0 +1,360 @@
+import random
+import string
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+from services.cache import TTLCache
+from services.elo import elo_engine
+from services.leaderboard import leaderboard
+from services.user_cache import get_display_names, invalidate_user
+
+
+ROOM_CODE_ALPHABET = string.ascii_uppercase + string.digits
+ROOM_CODE_LENGTH = 6
+# 36^6 codes : une collision est déjà rare, plusieurs d'affilée n'arrivent pas en pratique
+ROOM_CODE_ATTEMPTS = 8
+
+# quiz_id et joueurs d'un duel commencé ne changent plus : submit_duel n'a pas à relire le duel
+DUEL_HEADER_FIELDS = {"quiz_id": 1, "player1_id": 1, "player2_id": 1}
+duel_header_cache = TTLCache(maxsize=10000, ttl=3600)
+
+# Derniers duels appliqués à chaque joueur : garde du $inc d'ELO en cas de reprise
+RATED_DUELS_KEPT = 20
+# Un finaliseur encore en vie a eu largement le temps de poser elo_applied
+PENDING_RATINGS_GRACE_SECONDS = 60
+
+
+def generate_room_code() -> str:
+    return ''.join(random.choices(ROOM_CODE_ALPHABET, k=ROOM_CODE_LENGTH))
+
+
+def new_duel_document(quiz_id: str, clerk_id: str, room_code: str) -> Dict[str, Any]:
+    return {
+        "room_code": room_code,
+        "quiz_id": quiz_id,
+        "player1_id": clerk_id,
+        "player2_id": None,
+        "status": "waiting",
+        "player1_score": 0,
+        "player2_score": 0,
+        "player1_done": False,
+        "player2_done": False,
+        "winner_id": None,
+        "created_at": datetime.utcnow()
+    }
+
+
+def remember_duel_header(duel: Dict[str, Any]) -> None:
+    """Cache quiz_id and player ids once both seats are taken; they are immutable from then on."""
+    if duel.get('player2_id'):
+        duel_header_cache.set(str(duel['_id']), {k: duel.get(k) for k in ("_id", *DUEL_HEADER_FIELDS)})
+
+
+def rating_update(duel_id: ObjectId, clerk_id: str, inc: Dict[str, int]) -> UpdateOne:
+    """
+    $inc of one player's ratings for one duel, applied at most once: the duel id
+    is pushed to the player's recent `rated_duels` in the same update.
+    """
+    return UpdateOne(
+        {"clerk_id": clerk_id, "rated_duels": {"$ne": duel_id}},
+        {"$inc": inc, "$push": {"rated_duels": {"$each": [duel_id], "$slice": -RATED_DUELS_KEPT}}}
+    )
+
+
+def join_event(player: Dict[str, Any]) -> Dict[str, Any]:
+    clerk_id = player.get('clerk_id')
+    return {
+        "player2_id": clerk_id,
+        "player2_name": f"{player.get('first_name', '')} {player.get('last_name', '')}".strip() or clerk_id,
+        "status": "in_battle"
+    }
+
+
+def submission_event(duel: Dict[str, Any], is_player1: bool, clerk_id: str) -> Dict[str, Any]:
+    return {
+        "player": 1 if is_player1 else 2,
+        "clerk_id": clerk_id,
+        "player1_done": duel.get('player1_done', False),
+        "player2_done": duel.get('player2_done', False)
+    }
+
+
+def submission_view(duel: Dict[str, Any], is_player1: bool, score: int, both_done: bool,
+                    winner_id: Optional[str], elo_change: int) -> Dict[str, Any]:
+    """Body of POST /duel/<id>/submit: each player only sees their own stored score."""
+    return {
+        "success": True,
+        "score": score,
+        "both_done": both_done,
+        "winner_id": winner_id,
+        "elo_change": elo_change,
+        "player1_score": duel.get('player1_score', 0) if is_player1 else None,
+        "player2_score": duel.get('player2_score', 0) if not is_player1 else None,
+    }
+
+
+def apply_duel_outcome(duel: Dict[str, Any], finalized: bool, winner_id: Optional[str],
+                       p1_inc: Dict[str, int], p2_inc: Dict[str, int]) -> Optional[Dict[str, Any]]:
+    """
+    In-process side effects of a finished duel. Only the request that finalized
+    the duel mirrors ELO in the local leaderboard; it also gets the data of the
+    `finished` event to publish (None for everyone else).
+    """
+    p1_id = duel['player1_id']
+    p2_id = duel.get('player2_id')
+    invalidate_user(p1_id, p2_id)
+    if not finalized:
+        return None
+
+    if p2_id:
+        leaderboard.apply_inc(p1_id, p1_inc)
+        leaderboard.apply_inc(p2_id, p2_inc)
+    return {
+        "status": "finished",
+        "winner_id": winner_id,
+        "player1_score": duel.get('player1_score', 0),
+        "player2_score": duel.get('player2_score', 0),
+        "player1_elo_change": p1_inc.get("elo", 0),
+        "player2_elo_change": p2_inc.get("elo", 0)
+    }
+
+
+def duel_view(duel: Dict[str, Any], names: Dict[str, str]) -> Dict[str, Any]:
+    return {
+        "_id": duel['_id'],
+        "room_code": duel.get('room_code'),
+        "quiz_id": duel.get('quiz_id'),
+        "status": duel.get('status'),
+        "player1_id": duel.get('player1_id'),
+        "player2_id": duel.get('player2_id'),
+        "player1_name": names.get(duel.get('player1_id')),
+        "player2_name": names.get(duel.get('player2_id')),
+        "player1_score": duel.get('player1_score', 0),
+        "player2_score": duel.get('player2_score', 0),
+        "player1_done": duel.get('player1_done', False),
+        "player2_done": duel.get('player2_done', False),
+        "winner_id": duel.get('winner_id'),
+        "elo_delta": duel.get('elo_delta'),
+    }
+
+
+class DuelService:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def find_duel(self, duel_id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        if not ObjectId.is_valid(duel_id):
+            return None
+        return self.db.duels.find_one({"_id": ObjectId(duel_id)}, projection)
+
+    def duel_header(self, duel_id: str) -> Optional[Dict[str, Any]]:
+        """_id, quiz_id and player ids of a duel, from the cache once it has started."""
+        header = duel_header_cache.get(duel_id)
+        if header is None:
+            header = self.find_duel(duel_id, DUEL_HEADER_FIELDS)
+            if header:
+                remember_duel_header(header)
+        return header
+
+    def create_room(self, quiz_id: str, clerk_id: str) -> Tuple[str, str]:
+        """
+        Insert a waiting duel under a fresh room code and return (duel_id, room_code).
+        Uniqueness is enforced by the room_code_waiting_unique index: a collision
+        fails the insert and we retry with another code, so the common case is
+        a single round trip.
+        """
+        for _ in range(ROOM_CODE_ATTEMPTS):
+            room_code = generate_room_code()
+            try:
+                result = self.db.duels.insert_one(new_duel_document(quiz_id, clerk_id, room_code))
+            except DuplicateKeyError:
+                continue
+            return str(result.inserted_id), room_code
+        raise RuntimeError("Could not allocate a room code")
+
+    def join_room(self, room_code: str, clerk_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Take the second seat of a waiting duel. Only one caller can win the
+        waiting -> in_battle transition; returns None for everyone else.
+        """
+        duel = self.db.duels.find_one_and_update(
+            {"room_code": room_code.upper(), "status": "waiting", "player1_id": {"$ne": clerk_id}},
+            {"$set": {"player2_id": clerk_id, "status": "in_battle"}},
+            projection={"quiz_id": 1, "player1_id": 1}
+        )
+        if duel:
+            remember_duel_header({**duel, "player2_id": clerk_id})
+        return duel
+
+    def is_room_host(self, room_code: str, clerk_id: str) -> bool:
+        return self.db.duels.find_one(
+            {"room_code": room_code.upper(), "status": "waiting", "player1_id": clerk_id}, {"_id": 1}
+        ) is not None
+
+    def describe(self, duel: Dict[str, Any], names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Public view of a duel, as returned by GET /duel/<id> and pushed to SSE clients.
+        `names` can be passed when the caller already resolved them for several duels.
+        """
+        if names is None:
+            names = get_display_names(self.db, [duel.get('player1_id'), duel.get('player2_id')])
+        return duel_view(duel, names)
+
+    def with_player_names(self, duels: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add player1_name / player2_name to each duel, resolved with one query."""
+        names = get_display_names(
+            self.db,
+            [d.get('player1_id') for d in duels] + [d.get('player2_id') for d in duels]
+        )
+        for d in duels:
+            d['player1_name'] = names.get(d.get('player1_id'))
+            d['player2_name'] = names.get(d.get('player2_id'))
+        return duels
+
+    def record_score(self, duel_id: ObjectId, is_player1: bool, clerk_id: str, score: int) -> Optional[Dict[str, Any]]:
+        """
+        Store a player's score, once. Returns the duel as it is after the update,
+        or None if this player had already submitted.
+        """
+        player_field = 'player1_id' if is_player1 else 'player2_id'
+        score_field = 'player1_score' if is_player1 else 'player2_score'
+        done_field = 'player1_done' if is_player1 else 'player2_done'
+
+        return self.db.duels.find_one_and_update(
+            {"_id": duel_id, player_field: clerk_id, done_field: {"$ne": True}},
+            {"$set": {score_field: score, done_field: True}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def decide_winner(duel: Dict[str, Any]) -> Optional[str]:
+        p1_score = duel.get('player1_score', 0)
+        p2_score = duel.get('player2_score', 0)
+
+        if p1_score > p2_score:
+            return duel['player1_id']
+        if p2_score > p1_score:
+            return duel.get('player2_id')
+        # Draw — no winner
+        return None
+
+    @staticmethod
+    def stat_increments(duel: Dict[str, Any], winner_id: Optional[str],
+                        p1_delta: int, p2_delta: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """$inc documents for both players, given the outcome and their rating deltas."""
+        if winner_id == duel['player1_id']:
+            p1_inc, p2_inc = {"wins": 1}, {"losses": 1}
+        elif winner_id is not None and winner_id == duel.get('player2_id'):
+            p1_inc, p2_inc = {"losses": 1}, {"wins": 1}
+        else:
+            p1_inc, p2_inc = {}, {}
+        p1_inc.update({"elo": p1_delta, "total_duels": 1})
+        p2_inc.update({"elo": p2_delta, "total_duels": 1})
+        return p1_inc, p2_inc
+
+    @staticmethod
+    def elo_increments(duel: Dict[str, Any], winner_id: Optional[str],
+                       ratings: Dict[str, Tuple[int, int]]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        $inc documents for both players. `ratings` maps clerk_id to (elo, total_duels)
+        as read before the duel is closed; unknown players start at the initial rating.
+        """
+        p1_id, p2_id = duel['player1_id'], duel.get('player2_id')
+        if not p2_id:
+            return {"total_duels": 1}, {"total_duels": 1}
+
+        p1_elo, p1_games = ratings.get(p1_id, (elo_engine.initial_rating, 0))
+        p2_elo, p2_games = ratings.get(p2_id, (elo_engine.initial_rating, 0))
+        score = 1.0 if winner_id == p1_id else 0.0 if winner_id == p2_id else 0.5
+
+        p1_delta, p2_delta = elo_engine.rate(p1_elo, p2_elo, score, p1_games, p2_games)
+        return DuelService.stat_increments(duel, winner_id, p1_delta, p2_delta)
+
+    @staticmethod
+    def rating_record(duel: Dict[str, Any], ratings: Dict[str, Tuple[int, int]],
+                      p1_inc: Dict[str, int], p2_inc: Dict[str, int]) -> Dict[str, Any]:
+        """
+        Fields stored on the finished duel: the rating history used by the replay
+        tool, and elo_applied=False until both users have been updated.
+        """
+        return {
+            "finished_at": datetime.utcnow(),
+            "ratings_before": {
+                "player1": ratings.get(duel['player1_id'], (elo_engine.initial_rating, 0))[0],
+                "player2": ratings.get(duel.get('player2_id'), (elo_engine.initial_rating, 0))[0],
+            },
+            "elo_delta": {"player1": p1_inc.get("elo", 0), "player2": p2_inc.get("elo", 0)},
+            "elo_applied": False,
+        }
+
+    @staticmethod
+    def rating_updates(duel: Dict[str, Any], p1_inc: Dict[str, int], p2_inc: Dict[str, int]) -> List[UpdateOne]:
+        if not duel.get('player2_id'):
+            return []
+        return [
+            rating_update(duel['_id'], duel['player1_id'], p1_inc),
+            rating_update(duel['_id'], duel['player2_id'], p2_inc),
+        ]
+
+    def player_ratings(self, duel: Dict[str, Any]) -> Dict[str, Tuple[int, int]]:
+        players = [p for p in (duel['player1_id'], duel.get('player2_id')) if p]
+        return {
+            u['clerk_id']: (u.get('elo', elo_engine.initial_rating), u.get('total_duels', 0))
+            for u in self.db.users.find({"clerk_id": {"$in": players}}, {"clerk_id": 1, "elo": 1, "total_duels": 1})
+        }
+
+    def apply_ratings(self, duel: Dict[str, Any], p1_inc: Dict[str, int], p2_inc: Dict[str, int]) -> None:
+        updates = self.rating_updates(duel, p1_inc, p2_inc)
+        if updates:
+            self.db.users.bulk_write(updates, ordered=False)
+        self.db.duels.update_one({"_id": duel['_id']}, {"$set": {"elo_applied": True}})
+
+    def finalize(self, duel: Dict[str, Any]) -> Tuple[bool, Optional[str], Dict[str, int], Dict[str, int]]:
+        """
+        Close a duel whose two players are done and apply the ELO/stat changes.
+        The status transition is a compare-and-set, so when both players submit
+        at the same instant exactly one request finalizes; the other gets
+        finalized=False with the same winner. The rating deltas are stored on the
+        duel in that same update with elo_applied=False, then applied to the users
+        with guarded $inc: if the process dies in between, apply_pending_ratings()
+        finishes the job and no player is rated twice for the same duel.
+        """
+        winner_id = self.decide_winner(duel)
+        ratings = self.player_ratings(duel)
+        p1_inc, p2_inc = self.elo_increments(duel, winner_id, ratings)
+
+        closed = self.db.duels.find_one_and_update(
+            {"_id": duel['_id'], "status": {"$ne": "finished"},
+             "player1_done": True, "player2_done": True},
+            {"$set": {"status": "finished", "winner_id": winner_id,
+                      **self.rating_record(duel, ratings, p1_inc, p2_inc)}},
+            projection={"_id": 1}
+        )
+        if not closed:
+            return False, winner_id, p1_inc, p2_inc
+
+        self.apply_ratings(duel, p1_inc, p2_inc)
+        return True, winner_id, p1_inc, p2_inc
+
+    def apply_pending_ratings(self, grace_seconds: float = PENDING_RATINGS_GRACE_SECONDS) -> int:
+        """
+        Re-apply the stored deltas of duels finished more than `grace_seconds` ago
+        whose finalizer died before setting elo_applied. Returns the number of duels.
+        """
+        pending = self.db.duels.find(
+            {"elo_applied": False, "finished_at": {"$lt": datetime.utcnow() - timedelta(seconds=grace_seconds)}},
+            {"player1_id": 1, "player2_id": 1, "winner_id": 1, "elo_delta": 1}
+        )
+        count = 0
+        for duel in pending:
+            delta = duel.get('elo_delta') or {}
+            p1_inc, p2_inc = self.stat_increments(duel, duel.get('winner_id'),
+                                                  delta.get('player1', 0), delta.get('player2', 0))
+            self.apply_ratings(duel, p1_inc, p2_inc)
+            count += 1
+        return count
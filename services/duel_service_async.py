@@ -0,0 +1,122 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from services.duel_service import (
+    DUEL_HEADER_FIELDS, ROOM_CODE_ATTEMPTS, DuelService, duel_header_cache, duel_view, generate_room_code,
+    new_duel_document, remember_duel_header,
+)
+from services.elo import elo_engine
+from services.user_cache import get_display_names_async
+
+
+class AsyncDuelService:
+    """
+    DuelService for the ASGI mode, on an AsyncMongoClient database.
+    Winner and ELO rules are DuelService's; only the I/O is async.
+    """
+
+    decide_winner = staticmethod(DuelService.decide_winner)
+    elo_increments = staticmethod(DuelService.elo_increments)
+    rating_record = staticmethod(DuelService.rating_record)
+    rating_updates = staticmethod(DuelService.rating_updates)
+
+    def __init__(self, db):
+        self.db = db
+
+    async def find_duel(self, duel_id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        if not ObjectId.is_valid(duel_id):
+            return None
+        return await self.db.duels.find_one({"_id": ObjectId(duel_id)}, projection)
+
+    async def duel_header(self, duel_id: str) -> Optional[Dict[str, Any]]:
+        header = duel_header_cache.get(duel_id)
+        if header is None:
+            header = await self.find_duel(duel_id, DUEL_HEADER_FIELDS)
+            if header:
+                remember_duel_header(header)
+        return header
+
+    async def create_room(self, quiz_id: str, clerk_id: str) -> Tuple[str, str]:
+        for _ in range(ROOM_CODE_ATTEMPTS):
+            room_code = generate_room_code()
+            try:
+                result = await self.db.duels.insert_one(new_duel_document(quiz_id, clerk_id, room_code))
+            except DuplicateKeyError:
+                continue
+            return str(result.inserted_id), room_code
+        raise RuntimeError("Could not allocate a room code")
+
+    async def join_room(self, room_code: str, clerk_id: str) -> Optional[Dict[str, Any]]:
+        duel = await self.db.duels.find_one_and_update(
+            {"room_code": room_code.upper(), "status": "waiting", "player1_id": {"$ne": clerk_id}},
+            {"$set": {"player2_id": clerk_id, "status": "in_battle"}},
+            projection={"quiz_id": 1, "player1_id": 1}
+        )
+        if duel:
+            remember_duel_header({**duel, "player2_id": clerk_id})
+        return duel
+
+    async def is_room_host(self, room_code: str, clerk_id: str) -> bool:
+        return await self.db.duels.find_one(
+            {"room_code": room_code.upper(), "status": "waiting", "player1_id": clerk_id}, {"_id": 1}
+        ) is not None
+
+    async def describe(self, duel: Dict[str, Any], names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        if names is None:
+            names = await get_display_names_async(self.db, [duel.get('player1_id'), duel.get('player2_id')])
+        return duel_view(duel, names)
+
+    async def with_player_names(self, duels: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        names = await get_display_names_async(
+            self.db,
+            [d.get('player1_id') for d in duels] + [d.get('player2_id') for d in duels]
+        )
+        for d in duels:
+            d['player1_name'] = names.get(d.get('player1_id'))
+            d['player2_name'] = names.get(d.get('player2_id'))
+        return duels
+
+    async def record_score(self, duel_id: ObjectId, is_player1: bool, clerk_id: str, score: int) -> Optional[Dict[str, Any]]:
+        player_field = 'player1_id' if is_player1 else 'player2_id'
+        score_field = 'player1_score' if is_player1 else 'player2_score'
+        done_field = 'player1_done' if is_player1 else 'player2_done'
+
+        return await self.db.duels.find_one_and_update(
+            {"_id": duel_id, player_field: clerk_id, done_field: {"$ne": True}},
+            {"$set": {score_field: score, done_field: True}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def player_ratings(self, duel: Dict[str, Any]) -> Dict[str, Tuple[int, int]]:
+        players = [p for p in (duel['player1_id'], duel.get('player2_id')) if p]
+        users = await self.db.users.find(
+            {"clerk_id": {"$in": players}}, {"clerk_id": 1, "elo": 1, "total_duels": 1}
+        ).to_list(None)
+        return {u['clerk_id']: (u.get('elo', elo_engine.initial_rating), u.get('total_duels', 0)) for u in users}
+
+    async def apply_ratings(self, duel: Dict[str, Any], p1_inc: Dict[str, int], p2_inc: Dict[str, int]) -> None:
+        updates = self.rating_updates(duel, p1_inc, p2_inc)
+        if updates:
+            await self.db.users.bulk_write(updates, ordered=False)
+        await self.db.duels.update_one({"_id": duel['_id']}, {"$set": {"elo_applied": True}})
+
+    async def finalize(self, duel: Dict[str, Any]) -> Tuple[bool, Optional[str], Dict[str, int], Dict[str, int]]:
+        winner_id = self.decide_winner(duel)
+        ratings = await self.player_ratings(duel)
+        p1_inc, p2_inc = self.elo_increments(duel, winner_id, ratings)
+
+        closed = await self.db.duels.find_one_and_update(
+            {"_id": duel['_id'], "status": {"$ne": "finished"},
+             "player1_done": True, "player2_done": True},
+            {"$set": {"status": "finished", "winner_id": winner_id,
+                      **self.rating_record(duel, ratings, p1_inc, p2_inc)}},
+            projection={"_id": 1}
+        )
+        if not closed:
+            return False, winner_id, p1_inc, p2_inc
+
+        await self.apply_ratings(duel, p1_inc, p2_inc)
+        return True, winner_id, p1_inc, p2_inc
@@ -0,0 +1,46 @@
+import os
+from typing import Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv("key.env")
+
+
+class EloEngine:
+    """
+    Classic Elo: expected score from the rating gap, change = K * (actual - expected),
+    rounded to an integer. New players use a larger K for their first
+    `provisional_games` duels so they converge faster.
+    """
+
+    def __init__(self, k_factor: float = 32, provisional_k: float = 40, provisional_games: int = 10,
+                 initial_rating: int = 1200, scale: float = 400):
+        self.k_factor = k_factor
+        self.provisional_k = provisional_k
+        self.provisional_games = provisional_games
+        self.initial_rating = initial_rating
+        self.scale = scale
+
+    def expected_score(self, rating: float, opponent_rating: float) -> float:
+        return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / self.scale))
+
+    def k_for(self, games_played: int) -> float:
+        return self.provisional_k if games_played < self.provisional_games else self.k_factor
+
+    def rate(self, rating_a: float, rating_b: float, score_a: float,
+             games_a: int = 0, games_b: int = 0) -> Tuple[int, int]:
+        """
+        Rating deltas for both players. `score_a` is 1 if A won, 0 if A lost, 0.5 for a draw.
+        """
+        expected_a = self.expected_score(rating_a, rating_b)
+        delta_a = round(self.k_for(games_a) * (score_a - expected_a))
+        delta_b = round(self.k_for(games_b) * ((1 - score_a) - (1 - expected_a)))
+        return delta_a, delta_b
+
+
+elo_engine = EloEngine(
+    k_factor=float(os.getenv("ELO_K_FACTOR", "32")),
+    provisional_k=float(os.getenv("ELO_PROVISIONAL_K", "40")),
+    provisional_games=int(os.getenv("ELO_PROVISIONAL_GAMES", "10")),
+    initial_rating=int(os.getenv("ELO_INITIAL_RATING", "1200")),
+)
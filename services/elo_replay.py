@@ -0,0 +1,184 @@
+"""
+Recompute every rating from the finished duels, in the order they were finished.
+
+Elo is sequential per player, so duels are grouped into rounds in which each
+player appears at most once (keeping each player's own order); every round is
+then rated in one vectorized NumPy step. Hundreds of thousands of duels replay
+in seconds, which makes it cheap to try another K or rebuild after a bug.
+
+Usage:
+    python -m services.elo_replay                 # dry run: summary and biggest rating changes
+    python -m services.elo_replay --k 24 --check  # compare with the deltas stored on the duels
+    python -m services.elo_replay --apply         # write ratings, win/loss counters and duel deltas
+"""
+import argparse
+import time
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.database import Database
+
+from services.elo import EloEngine, elo_engine
+
+try:
+    import numpy as np
+except ImportError as e:  # outil hors ligne : numpy n'est pas une dépendance de l'API
+    raise ImportError("services.elo_replay needs numpy: pip install -r requirements-tools.txt") from e
+
+HISTORY_PROJECTION = {"player1_id": 1, "player2_id": 1, "winner_id": 1, "elo_delta": 1}
+
+
+def load_history(db: Database, batch_size: int = 5000) -> Dict[str, Any]:
+    duel_ids, p1, p2, scores, stored = [], [], [], [], []
+    index: Dict[str, int] = {}
+
+    cursor = db.duels.find(
+        {"status": "finished", "player2_id": {"$ne": None}}, HISTORY_PROJECTION
+    ).sort([("finished_at", ASCENDING), ("_id", ASCENDING)]).batch_size(batch_size)
+
+    for duel in cursor:
+        a = index.setdefault(duel["player1_id"], len(index))
+        b = index.setdefault(duel["player2_id"], len(index))
+        winner = duel.get("winner_id")
+        duel_ids.append(duel["_id"])
+        p1.append(a)
+        p2.append(b)
+        scores.append(1.0 if winner == duel["player1_id"] else 0.0 if winner == duel["player2_id"] else 0.5)
+        delta = duel.get("elo_delta") or {}
+        stored.append((delta.get("player1", np.nan), delta.get("player2", np.nan)))
+
+    return {
+        "duel_ids": duel_ids,
+        "players": list(index),
+        "p1": np.asarray(p1, dtype=np.int64),
+        "p2": np.asarray(p2, dtype=np.int64),
+        "scores": np.asarray(scores, dtype=np.float64),
+        "stored": np.asarray(stored, dtype=np.float64).reshape(-1, 2),
+    }
+
+
+def schedule_rounds(p1: np.ndarray, p2: np.ndarray, n_players: int) -> np.ndarray:
+    """Round of each duel: one after the latest round of either player."""
+    last = np.full(n_players, -1, dtype=np.int64)
+    rounds = np.empty(len(p1), dtype=np.int64)
+    for i, (a, b) in enumerate(zip(p1.tolist(), p2.tolist())):
+        r = max(last[a], last[b]) + 1
+        rounds[i] = r
+        last[a] = last[b] = r
+    return rounds
+
+
+def replay(history: Dict[str, Any], engine: EloEngine) -> Dict[str, np.ndarray]:
+    p1, p2, scores = history["p1"], history["p2"], history["scores"]
+    n_players = len(history["players"])
+
+    ratings = np.full(n_players, float(engine.initial_rating))
+    games = np.zeros(n_players, dtype=np.int64)
+    wins = np.zeros(n_players, dtype=np.int64)
+    losses = np.zeros(n_players, dtype=np.int64)
+    deltas = np.zeros((len(p1), 2))
+
+    if len(p1):
+        rounds = schedule_rounds(p1, p2, n_players)
+        order = np.argsort(rounds, kind="stable")
+        bounds = np.flatnonzero(np.diff(rounds[order])) + 1
+
+        for idx in np.split(order, bounds):
+            a, b, s = p1[idx], p2[idx], scores[idx]
+            expected_a = 1.0 / (1.0 + 10 ** ((ratings[b] - ratings[a]) / engine.scale))
+            k_a = np.where(games[a] < engine.provisional_games, engine.provisional_k, engine.k_factor)
+            k_b = np.where(games[b] < engine.provisional_games, engine.provisional_k, engine.k_factor)
+            # np.rint arrondit au pair le plus proche, comme round() dans EloEngine.rate
+            delta_a = np.rint(k_a * (s - expected_a))
+            delta_b = np.rint(k_b * ((1 - s) - (1 - expected_a)))
+
+            # Un joueur n'apparaît qu'une fois par round : l'indexation avancée ne perd rien
+            ratings[a] += delta_a
+            ratings[b] += delta_b
+            games[a] += 1
+            games[b] += 1
+            wins[a] += s == 1.0
+            wins[b] += s == 0.0
+            losses[a] += s == 0.0
+            losses[b] += s == 1.0
+            deltas[idx, 0] = delta_a
+            deltas[idx, 1] = delta_b
+
+    return {"ratings": ratings, "games": games, "wins": wins, "losses": losses, "deltas": deltas}
+
+
+def apply_replay(db: Database, history: Dict[str, Any], result: Dict[str, np.ndarray], batch_size: int = 1000):
+    def flush(collection, ops: List[UpdateOne]):
+        if ops:
+            collection.bulk_write(ops, ordered=False)
+            ops.clear()
+
+    ops: List[UpdateOne] = []
+    for i, clerk_id in enumerate(history["players"]):
+        ops.append(UpdateOne({"clerk_id": clerk_id}, {"$set": {
+            "elo": int(result["ratings"][i]),
+            "total_duels": int(result["games"][i]),
+            "wins": int(result["wins"][i]),
+            "losses": int(result["losses"][i]),
+        }}))
+        if len(ops) >= batch_size:
+            flush(db.users, ops)
+    flush(db.users, ops)
+
+    for duel_id, (d1, d2) in zip(history["duel_ids"], result["deltas"].tolist()):
+        ops.append(UpdateOne({"_id": duel_id}, {"$set": {"elo_delta": {"player1": int(d1), "player2": int(d2)}}}))
+        if len(ops) >= batch_size:
+            flush(db.duels, ops)
+    flush(db.duels, ops)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=float, default=elo_engine.k_factor)
+    parser.add_argument("--provisional-k", type=float, default=elo_engine.provisional_k)
+    parser.add_argument("--provisional-games", type=int, default=elo_engine.provisional_games)
+    parser.add_argument("--initial", type=int, default=elo_engine.initial_rating)
+    parser.add_argument("--check", action="store_true", help="compare with the deltas stored on each duel")
+    parser.add_argument("--apply", action="store_true", help="write the replayed ratings back to MongoDB")
+    parser.add_argument("--top", type=int, default=10, help="biggest rating changes to print")
+    args = parser.parse_args()
+
+    from config.db import get_db
+
+    db = get_db()
+    engine = EloEngine(k_factor=args.k, provisional_k=args.provisional_k,
+                       provisional_games=args.provisional_games, initial_rating=args.initial)
+
+    start = time.perf_counter()
+    history = load_history(db)
+    loaded = time.perf_counter()
+    result = replay(history, engine)
+    replayed = time.perf_counter()
+    print(f"{len(history['duel_ids'])} duels, {len(history['players'])} players: "
+          f"loaded in {loaded - start:.2f}s, replayed in {replayed - loaded:.2f}s")
+
+    current = {u["clerk_id"]: u.get("elo", args.initial)
+               for u in db.users.find({"clerk_id": {"$in": history["players"]}}, {"clerk_id": 1, "elo": 1})}
+    changes = sorted(
+        ((int(result["ratings"][i]) - current.get(clerk_id, args.initial), clerk_id, int(result["ratings"][i]))
+         for i, clerk_id in enumerate(history["players"])),
+        key=lambda c: -abs(c[0])
+    )
+    for change, clerk_id, rating in changes[:args.top]:
+        print(f"  {clerk_id}: {current.get(clerk_id, args.initial)} -> {rating} ({change:+d})")
+
+    if args.check:
+        stored = history["stored"]
+        known = ~np.isnan(stored).any(axis=1)
+        mismatches = int((stored[known] != result["deltas"][known]).any(axis=1).sum())
+        print(f"check: {int(known.sum())} duels with stored deltas, {mismatches} differ from the replay")
+
+    if args.apply:
+        apply_replay(db, history, result)
+        print("Applied. Running workers pick the new ratings up at their next leaderboard reload.")
+    elif not args.check:
+        print("Dry run, nothing written (use --apply).")
+
+
+if __name__ == "__main__":
+    main()
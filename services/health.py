@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from config.db import async_pool_stats, check_mongodb_connection, get_db, pool_stats
+from config.indexes import check_unique_indexes
+from services.clerk_jwt import CLERK_API_URL
+
+load_dotenv("key.env")
+
+Probe = Callable[[], Tuple[bool, str]]
+
+
+def check_clerk_reachable(api_url: str = CLERK_API_URL, timeout: float = 3.0) -> Tuple[bool, str]:
+    """Any HTTP answer counts: only DNS, TLS or network failures make Clerk unreachable."""
+    try:
+        response = httpx.head(api_url, timeout=timeout)
+        return True, f"Clerk API answered {response.status_code}"
+    except httpx.HTTPError as e:
+        return False, f"Clerk API unreachable: {e}"
+
+
+class HealthProber:
+    """
+    Runs the dependency checks in a background thread and keeps the last result
+    of each, so health endpoints only read memory. Mongo is pinged through the
+    shared client (a pooled connection, never a new client).
+
+    - live: the process answers
+    - ready: the last Mongo and unique-index probes (plus Clerk when
+      HEALTH_READY_REQUIRES_CLERK) succeeded and are not older than
+      `stale_factor` probe intervals
+    """
+
+    def __init__(self, probes: Dict[str, Tuple[Probe, float]], required=("mongodb",), stale_factor: float = 3):
+        self.probes = probes
+        self.required = tuple(required)
+        self.stale_factor = stale_factor
+        self.started_at = time.time()
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._next_run = {name: 0.0 for name in probes}
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def ensure_started(self) -> None:
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                # Après un fork, le thread du parent n'existe pas dans l'enfant
+                if self._pid != os.getpid():
+                    self._results = {}
+                    self._next_run = {name: 0.0 for name in self.probes}
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_probe(self, name: str) -> Dict[str, Any]:
+        probe, interval = self.probes[name]
+        started = time.perf_counter()
+        try:
+            ok, message = probe()
+        except Exception as e:
+            ok, message = False, f"Unexpected error: {e}"
+        now = datetime.now(timezone.utc)
+        previous = self._results.get(name, {})
+        result = {
+            "ok": ok,
+            "message": message,
+            "checked_at": now,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "last_ok_at": now if ok else previous.get("last_ok_at"),
+        }
+        self._results[name] = result
+        self._next_run[name] = time.monotonic() + interval
+        return result
+
+    def _run(self):
+        while not self._stop.is_set():
+            for name in self.probes:
+                if time.monotonic() >= self._next_run[name]:
+                    self.run_probe(name)
+            wait = min(self._next_run.values()) - time.monotonic()
+            self._stop.wait(max(wait, 0.1))
+
+    def _is_fresh(self, name: str, result: Optional[Dict[str, Any]]) -> bool:
+        if not result:
+            return False
+        age = (datetime.now(timezone.utc) - result["checked_at"]).total_seconds()
+        return age <= self.stale_factor * self.probes[name][1]
+
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        self.ensure_started()
+        checks = {}
+        ready = True
+        for name in self.probes:
+            result = self._results.get(name)
+            fresh = self._is_fresh(name, result)
+            checks[name] = {**result, "stale": not fresh} if result else {"ok": None, "message": "pending"}
+            if name in self.required and not (fresh and result["ok"]):
+                ready = False
+        return ready, checks
+
+    def liveness(self) -> Dict[str, Any]:
+        self.ensure_started()
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "prober_alive": self._thread is not None and self._thread.is_alive(),
+        }
+
+    @staticmethod
+    def pools() -> Dict[str, Any]:
+        return {"sync": pool_stats.snapshot(), "async": async_pool_stats.snapshot()}
+
+
+health_prober = HealthProber(
+    probes={
+        "mongodb": (check_mongodb_connection, float(os.getenv("HEALTH_PROBE_INTERVAL", "5"))),
+        # Un index unique absent (doublons au build) laisse passer des doublons : pas prêt
+        "indexes": (lambda: check_unique_indexes(get_db()), float(os.getenv("HEALTH_INDEX_PROBE_INTERVAL", "60"))),
+        "clerk": (check_clerk_reachable, float(os.getenv("HEALTH_CLERK_PROBE_INTERVAL", "30"))),
+    },
+    required=("mongodb", "indexes", "clerk")
+    if os.getenv("HEALTH_READY_REQUIRES_CLERK", "false").lower() in ("1", "true", "yes")
+    else ("mongodb", "indexes"),
+)
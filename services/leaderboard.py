@@ -0,0 +1,209 @@
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo.database import Database
+
+load_dotenv("key.env")
+
+LEADERBOARD_FIELDS = {
+    "_id": 0,
+    "clerk_id": 1,
+    "first_name": 1,
+    "last_name": 1,
+    "promotion": 1,
+    "mention": 1,
+    "elo": 1,
+    "wins": 1,
+    "losses": 1,
+    "total_duels": 1
+}
+
+
+# Un bucket par point d'ELO ; au-delà des bornes, les joueurs partagent le bucket
+# extrême et restent triés à l'intérieur (exact, seulement plus lent)
+ELO_BUCKET_MIN = 0
+ELO_BUCKET_MAX = 4000
+
+
+class BucketCounts:
+    """Fenwick tree of bucket sizes: update, prefix count and k-th item in O(log buckets)."""
+
+    def __init__(self, counts: List[int]):
+        self.size = len(counts)
+        tree = [0] + counts
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top_step = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def add(self, bucket: int, delta: int) -> None:
+        i = bucket + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, bucket: int) -> int:
+        """Number of items in the buckets before `bucket`."""
+        total, i = 0, bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, k: int) -> Tuple[int, int]:
+        """(bucket, position in it) of the k-th item, counting from 0."""
+        pos, step = 0, self._top_step
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self._tree[nxt] <= k:
+                pos = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return pos, k
+
+
+class RankedLeaderboard:
+    """
+    Users bucketed by ELO (highest first), each bucket sorted by (-elo, clerk_id),
+    with a Fenwick tree of bucket sizes. Rank lookups, ELO updates and finding
+    the start of a page are O(log buckets) plus a bisection among the players
+    tied in one bucket; a page of N entries costs O(N log buckets).
+    Each worker holds its own copy: it applies its own ELO updates immediately
+    and reloads from MongoDB every `reload_interval` seconds to pick up the
+    other workers' changes.
+    """
+
+    def __init__(self, reload_interval: float = 60):
+        self.reload_interval = reload_interval
+        self._buckets: List[List[tuple]] = [[] for _ in range(ELO_BUCKET_MAX - ELO_BUCKET_MIN + 1)]
+        self._counts = BucketCounts([0] * len(self._buckets))
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(elo) -> int:
+        return ELO_BUCKET_MAX - min(max(math.floor(elo), ELO_BUCKET_MIN), ELO_BUCKET_MAX)
+
+    def load(self, db: Database) -> None:
+        profiles = {}
+        for user in db["users"].find({}, LEADERBOARD_FIELDS):
+            if user.get("clerk_id"):
+                user.setdefault("elo", 1200)
+                profiles[user["clerk_id"]] = user
+        buckets: List[List[tuple]] = [[] for _ in range(ELO_BUCKET_MAX - ELO_BUCKET_MIN + 1)]
+        for clerk_id, p in profiles.items():
+            buckets[self._bucket(p["elo"])].append((-p["elo"], clerk_id))
+        for keys in buckets:
+            keys.sort()
+        counts = BucketCounts([len(keys) for keys in buckets])
+        with self._lock:
+            self._profiles = profiles
+            self._buckets = buckets
+            self._counts = counts
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self, db: Database) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.reload_interval:
+            return
+        # Un seul thread recharge ; les autres servent la version courante entre-temps
+        if not self._reload_lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if self._loaded_at == loaded_at:
+                self.load(db)
+        finally:
+            self._reload_lock.release()
+
+    def _insert(self, clerk_id: str, profile: Dict[str, Any]) -> None:
+        self._profiles[clerk_id] = profile
+        bucket = self._bucket(profile["elo"])
+        insort(self._buckets[bucket], (-profile["elo"], clerk_id))
+        self._counts.add(bucket, 1)
+
+    def _remove(self, clerk_id: str) -> Optional[Dict[str, Any]]:
+        profile = self._profiles.pop(clerk_id, None)
+        if profile is not None:
+            bucket = self._bucket(profile["elo"])
+            keys = self._buckets[bucket]
+            key = (-profile["elo"], clerk_id)
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+                self._counts.add(bucket, -1)
+        return profile
+
+    def upsert(self, user: Dict[str, Any]) -> None:
+        """Insert or replace a user from a users document (other fields are ignored)."""
+        clerk_id = user.get("clerk_id")
+        if not clerk_id:
+            return
+        profile = {k: user[k] for k in LEADERBOARD_FIELDS if k != "_id" and k in user}
+        profile.setdefault("elo", 1200)
+        with self._lock:
+            self._remove(clerk_id)
+            self._insert(clerk_id, profile)
+
+    def apply_inc(self, clerk_id: str, inc: Dict[str, int]) -> None:
+        """Mirror a `$inc` applied to a users document."""
+        with self._lock:
+            profile = self._remove(clerk_id)
+            if profile is None:
+                return
+            for field, delta in inc.items():
+                profile[field] = profile.get(field, 0) + delta
+            self._insert(clerk_id, profile)
+
+    def top(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            end = min(offset + limit, len(self._profiles))
+            entries: List[Dict[str, Any]] = []
+            if offset >= end:
+                return entries
+            bucket, i = self._counts.find(offset)
+            previous = None
+            for position in range(offset, end):
+                if i >= len(self._buckets[bucket]):
+                    # Saut au bucket non vide suivant
+                    bucket, i = self._counts.find(position)
+                neg_elo, clerk_id = self._buckets[bucket][i]
+                i += 1
+                entry = dict(self._profiles[clerk_id])
+                if previous is None:
+                    entry["rank"] = self._rank_for_elo(-neg_elo)
+                elif previous == neg_elo:
+                    entry["rank"] = entries[-1]["rank"]
+                else:
+                    entry["rank"] = position + 1
+                previous = neg_elo
+                entries.append(entry)
+            return entries
+
+    def _rank_for_elo(self, elo) -> int:
+        # Classement "1224" : les ex aequo partagent le même rang
+        bucket = self._bucket(elo)
+        return self._counts.prefix(bucket) + bisect_left(self._buckets[bucket], (-elo, "")) + 1
+
+    def rank_of(self, clerk_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            profile = self._profiles.get(clerk_id)
+            if profile is None:
+                return None
+            entry = dict(profile)
+            entry["rank"] = self._rank_for_elo(profile["elo"])
+            return entry
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+
+leaderboard = RankedLeaderboard(reload_interval=float(os.getenv("LEADERBOARD_RELOAD_SECONDS", "60")))
@@ -0,0 +1,296 @@
+"""
+In-process metrics rendered in the Prometheus text format (GET /metrics).
+
+- http_request_duration_seconds: every route, by endpoint, method and status
+- http_request_phase_seconds: time spent in Clerk auth, MongoDB, JSON
+  serialization and compression within a request
+- mongodb_command_duration_seconds / mongodb_command_documents_total: every
+  driver command, by command and collection (CommandListener)
+
+Metrics are per process: with several workers, each one exposes its own.
+"""
+import contextvars
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo.monitoring import CommandListener
+
+load_dotenv("key.env")
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Jeton optionnel exigé par GET /metrics (Authorization: Bearer ...)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Par jeu de labels : [compte par tranche (non cumulé), somme, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound)) if bound != float("inf") else "+Inf"}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+        self._gauges: List[Tuple[str, str, Tuple[str, ...], Callable[[], Dict[Tuple[str, ...], float]]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                       collect: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        """Gauge read at scrape time from `collect()`: {label values: value}."""
+        self._gauges.append((name, documentation, labelnames, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, labelnames, collect in self._gauges:
+            lines.extend((f"# HELP {name} {documentation}", f"# TYPE {name} gauge"))
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"Metrics: gauge {name} failed: {e}")
+                continue
+            for key, value in sorted(values.items()):
+                lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route.", ("endpoint", "method", "status")))
+http_request_phase = registry.register(Histogram(
+    "http_request_phase_seconds", "Time spent per phase of a request (auth, mongodb, serialization, compression).",
+    ("endpoint", "phase")))
+mongodb_command_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency.", ("command", "collection"), MONGO_BUCKETS))
+mongodb_command_documents = registry.register(Counter(
+    "mongodb_command_documents_total", "Documents returned or written by MongoDB commands.", ("command", "collection")))
+mongodb_command_failures = registry.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands.", ("command", "collection")))
+
+
+# Temps cumulés par phase de la requête en cours (None hors requête : thread write-behind, CLI...)
+_request_phases: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_phases", default=None)
+
+
+def start_request_timing() -> None:
+    _request_phases.set({"_start": time.perf_counter()})
+
+
+def add_phase_time(phase: str, seconds: float) -> None:
+    phases = _request_phases.get()
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+class timed_phase:
+    """`with timed_phase("auth"):` adds the block's duration to the current request."""
+
+    def __init__(self, phase: str):
+        self.phase = phase
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add_phase_time(self.phase, time.perf_counter() - self._start)
+        return False
+
+
+def finish_request_timing(endpoint: Optional[str], method: str, status: int) -> None:
+    phases = _request_phases.get()
+    if phases is None:
+        return
+    _request_phases.set(None)
+    # Route inconnue (404) : un seul label, pour ne pas exploser la cardinalité
+    endpoint = endpoint or "unmatched"
+    http_request_duration.observe(time.perf_counter() - phases.pop("_start"),
+                                  endpoint=endpoint, method=method, status=status)
+    for phase, seconds in phases.items():
+        http_request_phase.observe(seconds, endpoint=endpoint, phase=phase)
+
+
+def _command_collection(command_name: str, command) -> str:
+    if command_name == "getMore":
+        return str(command.get("collection", ""))
+    value = command.get(command_name)
+    return value if isinstance(value, str) else ""
+
+
+def _reply_documents(command_name: str, reply) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") is not None else 0
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class CommandMetricsListener(CommandListener):
+    """
+    Latency and document counts of every MongoDB command, by command and
+    collection. Each duration is also added to the current request's
+    `mongodb` phase.
+    """
+
+    IGNORED = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions"}
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, object], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in self.IGNORED:
+            return
+        with self._lock:
+            self._pending[(event.request_id, event.connection_id)] = _command_collection(event.command_name, event.command)
+
+    def _finish(self, event) -> Optional[str]:
+        with self._lock:
+            return self._pending.pop((event.request_id, event.connection_id), None)
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        if collection is None:
+            return
+        seconds = event.duration_micros / 1e6
+        mongodb_command_duration.observe(seconds, command=event.command_name, collection=collection)
+        mongodb_command_documents.inc(_reply_documents(event.command_name, event.reply),
+                                      command=event.command_name, collection=collection)
+        add_phase_time("mongodb", seconds)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        if collection is None:
+            return
+        seconds = event.duration_micros / 1e6
+        mongodb_command_duration.observe(seconds, command=event.command_name, collection=collection)
+        mongodb_command_failures.inc(command=event.command_name, collection=collection)
+        add_phase_time("mongodb", seconds)
+
+
+command_metrics = CommandMetricsListener()
+
+
+def _record_response(response):
+    from flask import request
+
+    finish_request_timing(request.endpoint, request.method, response.status_code)
+    return response
+
+
+async def _record_response_async(response):
+    from quart import request
+
+    finish_request_timing(request.endpoint, request.method, response.status_code)
+    return response
+
+
+def init_app(app):
+    """
+    Register before init_compression(): after_request hooks run in reverse
+    order, so the timing then includes compression.
+    """
+    if METRICS_ENABLED:
+        app.before_request(start_request_timing)
+        app.after_request(_record_response)
+
+
+async def _start_request_async():
+    # Coroutine : Quart exécuterait une fonction sync dans un thread, avec une copie du contexte
+    start_request_timing()
+
+
+def init_async_app(app):
+    if METRICS_ENABLED:
+        app.before_request(_start_request_async)
+        app.after_request(_record_response_async)
@@ -0,0 +1,45 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is not one we issued."""
+
+
+def parse_fields(raw: Optional[str], allowed: Iterable[str], default: Iterable[str]) -> Dict[str, int]:
+    """
+    Turn a `fields=a,b,c` query parameter into a projection, restricted to
+    `allowed`. Unknown names are ignored; nothing valid falls back to `default`.
+    """
+    allowed = set(allowed)
+    requested = [f.strip() for f in (raw or "").split(",") if f.strip() in allowed]
+    return {field: 1 for field in (requested or default)}
+
+
+def keyset_page(collection: Collection, query: Dict[str, Any], projection: Dict[str, int],
+                limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of `query` in _id order, starting after `cursor`.
+    Returns (documents, next_cursor); next_cursor is None on the last page.
+    Unlike skip/offset, the cost of a page does not grow with its position and
+    inserts between two calls never shift or repeat documents.
+    """
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    if cursor:
+        if not ObjectId.is_valid(cursor):
+            raise InvalidCursorError("Invalid cursor")
+        query = {**query, "_id": {"$gt": ObjectId(cursor)}}
+
+    # Un document de plus pour savoir s'il existe une page suivante
+    docs = list(collection.find(query, projection).sort("_id", ASCENDING).limit(limit + 1))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    next_cursor = str(docs[-1]["_id"]) if has_more else None
+    return docs, next_cursor
@@ -0,0 +1,208 @@
+"""
+Bulk import of question banks (CSV or JSONL), streamed and inserted in batches.
+
+CSV columns: text, options, correct_answer, points, category (and optionally id).
+`options` is either "a|b|c" or a JSON list. JSONL: one QuestionModel object per line.
+
+Usage:
+    python -m services.question_import questions.csv
+    python -m services.question_import questions.jsonl --batch-size 1000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+
+from services.validation import validate_questions
+
+load_dotenv("key.env")
+
+IMPORT_BATCH_SIZE = int(os.getenv("QUESTION_IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ERRORS = int(os.getenv("QUESTION_IMPORT_MAX_ERRORS", "1000"))
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# (numéro de ligne, données brutes) ; une ligne illisible arrive avec une erreur à la place des données
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".csv") or (content_type or "").startswith("text/csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or (content_type or "") in ("application/x-ndjson", "application/jsonl"):
+        return "jsonl"
+    return None
+
+
+def _parse_options(value: str) -> List[str]:
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [option.strip() for option in value.split("|") if option.strip()]
+
+
+def iter_csv_rows(stream: TextIO) -> Iterator[Row]:
+    reader = csv.DictReader(stream)
+    for row in reader:
+        # La ligne 1 est l'en-tête
+        line = reader.line_num
+        if None in row:
+            yield line, None, "too many columns"
+            continue
+        data: Dict[str, Any] = {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip() != ""}
+        try:
+            if "options" in data:
+                data["options"] = _parse_options(data["options"])
+        except ValueError as e:
+            yield line, None, f"options: {e}"
+            continue
+        yield line, data, None
+
+
+def iter_jsonl_rows(stream: TextIO) -> Iterator[Row]:
+    for line, raw in enumerate(stream, start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError as e:
+            yield line, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield line, None, "expected a JSON object"
+            continue
+        yield line, data, None
+
+
+def iter_rows(stream: TextIO, fmt: str) -> Iterator[Row]:
+    if fmt == "csv":
+        return iter_csv_rows(stream)
+    if fmt == "jsonl":
+        return iter_jsonl_rows(stream)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _row_errors(e: ValidationError) -> Dict[int, str]:
+    """Batch validation errors grouped by row index, locations relative to the row."""
+    messages: Dict[int, List[str]] = {}
+    for err in e.errors(include_url=False):
+        index, *loc = err["loc"]
+        messages.setdefault(index, []).append(f"{'.'.join(str(p) for p in loc) or 'row'}: {err['msg']}")
+    return {index: "; ".join(msgs) for index, msgs in messages.items()}
+
+
+class QuestionImporter:
+    """
+    Validates rows against QuestionModel, a whole batch per call, and inserts
+    them with unordered insert_many. Bad rows are reported and skipped; the
+    import goes on.
+    """
+
+    def __init__(self, db: Database, batch_size: int = IMPORT_BATCH_SIZE, max_errors: int = IMPORT_MAX_ERRORS):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def _error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": line, "error": message})
+
+    def _validate(self, pending: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any]]]:
+        try:
+            questions = validate_questions([data for _, data in pending])
+        except ValidationError as e:
+            # Lot invalide : on écarte les lignes fautives et on revalide le reste, en un appel
+            bad = _row_errors(e)
+            for index, message in sorted(bad.items()):
+                self._error(pending[index][0], message)
+            pending = [row for index, row in enumerate(pending) if index not in bad]
+            questions = validate_questions([data for _, data in pending]) if pending else []
+        return [(line, question.model_dump()) for (line, _), question in zip(pending, questions)]
+
+    def _flush(self, pending: List[Tuple[int, Dict[str, Any]]]):
+        batch = self._validate(pending) if pending else []
+        if not batch:
+            return
+        try:
+            result = self.db.questions.insert_many([doc for _, doc in batch], ordered=False)
+            self.inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            self.inserted += e.details.get("nInserted", len(batch) - len(write_errors))
+            for err in write_errors:
+                self._error(batch[err["index"]][0], err.get("errmsg", "write failed"))
+
+    def import_rows(self, rows: Iterable[Row]) -> Dict[str, Any]:
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+        for line, data, error in rows:
+            if error:
+                self._error(line, error)
+                continue
+            pending.append((line, data))
+            if len(pending) >= self.batch_size:
+                self._flush(pending)
+                pending = []
+        self._flush(pending)
+
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda err: err["row"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+    def import_stream(self, stream: TextIO, fmt: str) -> Dict[str, Any]:
+        return self.import_rows(iter_rows(stream, fmt))
+
+
+def import_questions(db: Database, binary_stream, fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """Import from a binary stream (upload or file); utf-8-sig strips the BOM Excel adds to CSV exports."""
+    text_stream = io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+    try:
+        return QuestionImporter(db, batch_size=batch_size).import_stream(text_stream, fmt)
+    finally:
+        # Ne pas fermer le flux sous-jacent (géré par Flask ou l'appelant)
+        text_stream.detach()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("cannot guess the format from the file name, pass --format")
+
+    from config.db import get_db
+
+    start = time.perf_counter()
+    with open(args.path, "rb") as f:
+        summary = import_questions(get_db(), f, fmt, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+
+    for error in summary["errors"]:
+        print(f"row {error['row']}: {error['error']}", file=sys.stderr)
+    print(f"Inserted {summary['inserted']} questions, {summary['failed']} rejected, in {elapsed:.2f}s")
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
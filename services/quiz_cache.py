@@ -0,0 +1,106 @@
+import hashlib
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from config.json_provider import dumps_bytes
+from services.cache import TTLCache
+
+load_dotenv("key.env")
+
+QUIZ_CACHE_SIZE = int(os.getenv("QUIZ_CACHE_SIZE", "512"))
+# Filet de sécurité si un quiz est modifié directement en base sans invalidate_quiz()
+QUIZ_CACHE_TTL = float(os.getenv("QUIZ_CACHE_TTL", "600"))
+
+# Corrigé compilé par quiz : question_id -> (bonne réponse normalisée, points)
+answer_key_cache = TTLCache(maxsize=QUIZ_CACHE_SIZE, ttl=QUIZ_CACHE_TTL)
+# Document brut du quiz (avec les réponses), partagé par /quiz/page et /duel/<id>/debug
+quiz_doc_cache = TTLCache(maxsize=QUIZ_CACHE_SIZE, ttl=QUIZ_CACHE_TTL)
+# Réponse /quiz/<id> prête à envoyer : (corps JSON en bytes, ETag fort)
+quiz_payload_cache = TTLCache(maxsize=QUIZ_CACHE_SIZE, ttl=QUIZ_CACHE_TTL)
+# Id canonique (ObjectId en str) de chaque id sous lequel un quiz a été demandé
+quiz_id_cache = TTLCache(maxsize=QUIZ_CACHE_SIZE * 2, ttl=QUIZ_CACHE_TTL)
+
+AnswerKey = Dict[str, Tuple[str, int]]
+
+DEFAULT_POINTS = 10
+
+
+def question_points(question: Dict[str, Any]) -> int:
+    """`points` of a question, or DEFAULT_POINTS when missing, null or not a number."""
+    try:
+        return int(question.get('points', DEFAULT_POINTS))
+    except (TypeError, ValueError):
+        return DEFAULT_POINTS
+
+
+def compile_answer_key(quiz: Dict[str, Any]) -> AnswerKey:
+    """
+    Question ids follow calculate_quiz_score: the stored `id` when present,
+    otherwise the question's index. The first question wins on duplicate ids.
+    """
+    answer_key: AnswerKey = {}
+    for idx, q in enumerate(quiz.get('questions', [])):
+        q_id = str(q.get('id')) if q.get('id') is not None else str(idx)
+        if q_id not in answer_key:
+            answer_key[q_id] = (str(q.get('correct_answer')), question_points(q))
+    return answer_key
+
+
+def sanitize_quiz(quiz: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of a quiz safe to send to players: no `_id`, no correct answers, and
+    each question's id replaced by its index (what calculate_quiz_score expects).
+    """
+    sanitized = {k: v for k, v in quiz.items() if k != '_id'}
+    questions = []
+    for idx, q in enumerate(quiz.get('questions', [])):
+        q = {k: v for k, v in q.items() if k not in ('correct_answer', '_id')}
+        q['id'] = str(idx)
+        questions.append(q)
+    if 'questions' in quiz:
+        sanitized['questions'] = questions
+    return sanitized
+
+
+def render_quiz_payload(quiz: Dict[str, Any]) -> Tuple[bytes, str]:
+    body = dumps_bytes({"success": True, "quiz": sanitize_quiz(quiz)})
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    return body, etag
+
+
+def quiz_cache_keys(quiz: Dict[str, Any], quiz_id: Optional[str] = None) -> set:
+    """All the ids a quiz can be requested by (ObjectId string and custom `id`)."""
+    keys = {str(quiz['_id'])} if quiz.get('_id') is not None else set()
+    if quiz.get('id') is not None:
+        keys.add(str(quiz['id']))
+    if quiz_id is not None:
+        keys.add(str(quiz_id))
+    return keys
+
+
+def remember_quiz_ids(quiz: Dict[str, Any], quiz_id: Optional[str] = None) -> None:
+    if quiz.get('_id') is None:
+        return
+    for key in quiz_cache_keys(quiz, quiz_id):
+        quiz_id_cache.set(key, str(quiz['_id']))
+
+
+def invalidate_quiz(*quiz_ids: Optional[str]) -> None:
+    """
+    Drop every cached artefact of a quiz. Call it with both the ObjectId string
+    and the custom `id` whenever a quiz document is modified or deleted.
+    """
+    keys = [str(quiz_id) for quiz_id in quiz_ids if quiz_id is not None]
+    answer_key_cache.delete(*keys)
+    quiz_doc_cache.delete(*keys)
+    quiz_payload_cache.delete(*keys)
+    quiz_id_cache.delete(*keys)
+
+
+def clear_quiz_caches() -> None:
+    answer_key_cache.clear()
+    quiz_doc_cache.clear()
+    quiz_payload_cache.clear()
+    quiz_id_cache.clear()
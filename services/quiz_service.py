@@ -1,98 +1,234 @@
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Optional, Tuple
+from dotenv import load_dotenv
 from models.quiz_model import UserAnswerModel, QuizResult, QuestionModel, QuizModel
 from pymongo.database import Database
 from bson import ObjectId
 from pydantic import ValidationError
+from pymongo import InsertOne
+from services.pagination import DEFAULT_PAGE_SIZE, keyset_page, parse_fields
+from services.quiz_cache import (
+    AnswerKey, answer_key_cache, quiz_doc_cache, quiz_payload_cache,
+    compile_answer_key, invalidate_quiz, quiz_cache_keys, remember_quiz_ids, render_quiz_payload, sanitize_quiz,
+)
+from services.quiz_stats import record_quiz_stats
+from services.write_behind import write_behind
+
+load_dotenv("key.env")
+
+class QuestionLookupError(ValueError):
+    """Raised when some requested question ids are malformed or do not exist."""
+
+    def __init__(self, invalid_ids: List[str], missing_ids: List[str]):
+        self.invalid_ids = invalid_ids
+        self.missing_ids = missing_ids
+        super().__init__(f"{len(invalid_ids)} invalid and {len(missing_ids)} unknown question ids")
+
+
+# Champs exposés par les listings paginés ; correct_answer seulement sur demande explicite
+# et pour les comptes autorisés (include_answers)
+QUIZ_LIST_FIELDS = ("id", "title", "category", "difficulty")
+QUESTION_LIST_FIELDS = ("id", "text", "options", "points", "category")
+QUESTION_ANSWER_FIELDS = QUESTION_LIST_FIELDS + ("correct_answer",)
+# Comptes autorisés à lire correct_answer dans les listings (enseignants, auteurs de quiz)
+ANSWER_KEY_ALLOWED_CLERK_IDS = {c.strip() for c in os.getenv("ANSWER_KEY_CLERK_IDS", "").split(",") if c.strip()}
+
+
+ANSWER_KEY_PROJECTION = {
+    "id": 1,
+    "questions.id": 1,
+    "questions.correct_answer": 1,
+    "questions.points": 1
+}
+
+
+def result_document(result: QuizResult) -> Dict[str, Any]:
+    """
+    Document inserted in `results`. The _id is generated here, so the id is
+    known even when the insert is deferred (write-behind).
+    """
+    result_dict = result.model_dump(exclude={'id'})
+    result_dict['_id'] = ObjectId()
+    return result_dict
+
+
+def finish_session_update(session_id: str, score: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    (filter, update) that marks a solo session finished. Written synchronously,
+    never behind the request: check_solo_session must see it right away.
+    """
+    return {"_id": ObjectId(session_id)}, {"$set": {"status": "finished", "score": score}}
+
+
+def solo_session_view(session_check: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], int]]:
+    """(body, status code) of /quiz/soloquiz/<id> when the user already has a session, else None."""
+    if session_check['status'] == 'finished':
+        return {
+            "success": False,
+            "status": "finished",
+            "error": "Vous avez déjà complété ce quiz."
+        }, 409
+    if session_check['status'] == 'in_progress':
+        return {
+            "success": True,
+            "status": "in_progress",
+            "session_id": session_check['session_id'],
+            "message": "Session en cours récupérée."
+        }, 200
+    return None
+
+
+def new_solo_session_view(session_id: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "status": "new",
+        "session_id": session_id,
+        "message": "Session solo créée."
+    }
+
+
+def solo_submission_view(result: QuizResult, result_id: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "score": result.score,
+        "details": [a.model_dump() if hasattr(a, 'model_dump') else a for a in result.answers],
+        "result_id": result_id
+    }
+
+
+def score_answers(answer_key: AnswerKey, quiz_id: str, user_answers: List[UserAnswerModel]) -> QuizResult:
+    total_score = 0
+    detailed_answers = []
+
+    for user_ans in user_answers:
+        expected = answer_key.get(str(user_ans.question_id))
+
+        if expected:
+            correct_answer, points = expected
+            is_correct = (str(user_ans.selected_option) == correct_answer)
+            if is_correct:
+                total_score += points
+            # Réponse déjà validée : on la complète au lieu d'en revalider une copie,
+            # et QuizResult accepte les instances sans les revalider
+            user_ans.is_correct = is_correct
+            detailed_answers.append(user_ans)
+
+    return QuizResult(
+        clerk_id="",
+        quiz_id=quiz_id,
+        score=total_score,
+        answers=detailed_answers
+    )
+
 
 class QuizService:
     def __init__(self, db: Database):
         self.db = db
     
-    def calculate_quiz_score(self, quiz_id: str, user_answers: List[UserAnswerModel]) -> QuizResult:
-        from bson import ObjectId
-
-        original_quiz = None
-        try:
-            original_quiz = self.db.quizzes.find_one({"_id": ObjectId(quiz_id)})
-        except Exception:
-            pass
+    def _find_quiz(self, quiz_id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look a quiz up by ObjectId first, then by its custom string `id` field.
+        """
+        quiz = None
+        if ObjectId.is_valid(quiz_id):
+            quiz = self.db.quizzes.find_one({"_id": ObjectId(quiz_id)}, projection)
+        if not quiz:
+            quiz = self.db.quizzes.find_one({"id": quiz_id}, projection)
+        return quiz
 
-        if not original_quiz:
-            original_quiz = self.db.quizzes.find_one({"id": quiz_id})
+    def get_answer_key(self, quiz_id: str) -> AnswerKey:
+        answer_key = answer_key_cache.get(quiz_id)
+        if answer_key is not None:
+            return answer_key
 
-        if not original_quiz:
+        quiz = quiz_doc_cache.get(quiz_id) or self._find_quiz(quiz_id, ANSWER_KEY_PROJECTION)
+        if not quiz:
             raise ValueError("Quiz not found")
 
-        total_score = 0
-        detailed_answers = []
-        questions = original_quiz.get('questions', [])
-
-        for user_ans in user_answers:
-            question = None
-            for idx, q in enumerate(questions):
-                q_id = str(q.get('id')) if q.get('id') is not None else str(idx)
-                if q_id == str(user_ans.question_id):
-                    question = q
-                    break
-
-            if question:
-                is_correct = (str(user_ans.selected_option) == str(question.get('correct_answer')))
-                if is_correct:
-                    total_score += int(question.get('points', 10))
-                detailed_answers.append({
-                    "question_id": str(user_ans.question_id),
-                    "selected_option": user_ans.selected_option,
-                    "is_correct": is_correct
-                })
-
-        return QuizResult(
-            clerk_id="",
-            quiz_id=quiz_id,
-            score=total_score,
-            answers=detailed_answers
-        )
+        answer_key = compile_answer_key(quiz)
+        for key in quiz_cache_keys(quiz, quiz_id):
+            answer_key_cache.set(key, answer_key)
+        remember_quiz_ids(quiz, quiz_id)
+        return answer_key
+
+    def calculate_quiz_score(self, quiz_id: str, user_answers: List[UserAnswerModel]) -> QuizResult:
+        return score_answers(self.get_answer_key(quiz_id), quiz_id, user_answers)
     
     def save_quiz_result(self, result: QuizResult) -> str:
-
-        result_dict = result.model_dump(exclude={'id'})
-        insert_result = self.db.results.insert_one(result_dict)
-        return str(insert_result.inserted_id)
+        result_dict = result_document(result)
+        write_behind.submit(self.db.results, InsertOne(result_dict))
+        record_quiz_stats(self.db, result, "solo")
+        return str(result_dict['_id'])
     
-    def get_quiz_by_id(self, quiz_id: str) -> Dict[str, Any]:
-        from bson import ObjectId
+    def get_quiz_document(self, quiz_id: str) -> Dict[str, Any]:
+        """
+        Raw quiz document (correct answers included), served from the quiz cache.
+        The returned dict is shared: callers must copy it before mutating.
+        """
+        quiz = quiz_doc_cache.get(quiz_id)
+        if quiz is not None:
+            return quiz
 
-        quiz_data = None
-        try:
-            quiz_data = self.db.quizzes.find_one({"_id": ObjectId(quiz_id)}, {"_id": 0})
-        except Exception:
-            pass
+        quiz = self._find_quiz(quiz_id)
+        if not quiz:
+            raise ValueError("Quiz not found")
 
-        if not quiz_data:
-            quiz_data = self.db.quizzes.find_one({"id": quiz_id}, {"_id": 0})
+        for key in quiz_cache_keys(quiz, quiz_id):
+            quiz_doc_cache.set(key, quiz)
+        remember_quiz_ids(quiz, quiz_id)
+        return quiz
 
-        if not quiz_data:
-            raise ValueError("Quiz not found")
-        
+    def get_quiz_payload(self, quiz_id: str) -> Tuple[bytes, str]:
+        """
+        Pre-rendered `{"success": true, "quiz": ...}` body without correct answers,
+        and its strong ETag.
+        """
+        payload = quiz_payload_cache.get(quiz_id)
+        if payload is not None:
+            return payload
+
+        quiz = self.get_quiz_document(quiz_id)
+        payload = render_quiz_payload(quiz)
+        for key in quiz_cache_keys(quiz, quiz_id):
+            quiz_payload_cache.set(key, payload)
+        return payload
+
+    def get_quiz_by_id(self, quiz_id: str) -> Dict[str, Any]:
         # Remove correct answers and ensure each question has a stable string id (its index)
-        for idx, q in enumerate(quiz_data.get('questions', [])):
-            if 'correct_answer' in q:
-                del q['correct_answer']
-            # Always use index as id for consistent matching with calculate_quiz_score
-            if '_id' in q:
-                q.pop('_id')
-            q['id'] = str(idx)
-        
-        return quiz_data
+        return sanitize_quiz(self.get_quiz_document(quiz_id))
     
     def get_all_quizzes(self) -> List[Dict[str, Any]]:
         """
         Get all quizzes with all metadata (excluding the full questions array for performance).
         """
-        quizzes = list(self.db.quizzes.find({}, {"questions": 0}))
-        for q in quizzes:
-            q['_id'] = str(q['_id'])
-        return quizzes
+        return list(self.db.quizzes.find({}, {"questions": 0}))
     
+    def list_quizzes(self, category: Optional[str] = None, difficulty: Optional[str] = None,
+                     fields: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                     cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Keyset-paginated quiz listing. Returns (quizzes, next_cursor).
+        """
+        query = {}
+        if category:
+            query["category"] = category
+        if difficulty:
+            query["difficulty"] = difficulty
+        projection = parse_fields(fields, QUIZ_LIST_FIELDS, QUIZ_LIST_FIELDS)
+        return keyset_page(self.db.quizzes, query, projection, limit, cursor)
+
+    def list_questions(self, category: Optional[str] = None, fields: Optional[str] = None,
+                       limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                       include_answers: bool = False) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Keyset-paginated question bank. Returns (questions, next_cursor).
+        `correct_answer` can only be requested when include_answers is True.
+        """
+        query = {"category": category} if category else {}
+        allowed = QUESTION_ANSWER_FIELDS if include_answers else QUESTION_LIST_FIELDS
+        projection = parse_fields(fields, allowed, QUESTION_LIST_FIELDS)
+        return keyset_page(self.db.questions, query, projection, limit, cursor)
+
     def create_question(self, question_data: Dict[str, Any]) -> str:
 
         try:
@@ -113,16 +249,33 @@ class QuizService:
             quiz_dict = {k: v for k, v in quiz_data.items() if k != 'id' or v is not None}
 
             result = self.db.quizzes.insert_one(quiz_dict)
+            # Un quiz recréé avec le même `id` personnalisé ne doit pas hériter de l'ancien cache
+            invalidate_quiz(quiz_dict.get('id'))
             return str(result.inserted_id)
 
         except Exception as e:
             raise ValueError(f"Quiz creation failed: {str(e)}")
     
-    def get_all_questions(self) -> List[Dict[str, Any]]:
+    def get_questions_by_ids(self, question_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Resolve question ids with a single $in query, in the requested order
+        (duplicates included). Invalid or unknown ids are all reported at once
+        through QuestionLookupError.
+        """
+        invalid_ids = [qid for qid in question_ids if not ObjectId.is_valid(qid)]
+        object_ids = [ObjectId(qid) for qid in dict.fromkeys(question_ids) if ObjectId.is_valid(qid)]
+
+        found = {}
+        if object_ids:
+            for question in self.db.questions.find({"_id": {"$in": object_ids}}):
+                found[question.pop("_id")] = question
+
+        missing_ids = [str(oid) for oid in object_ids if oid not in found]
+        if invalid_ids or missing_ids:
+            raise QuestionLookupError(invalid_ids, missing_ids)
+
+        return [dict(found[ObjectId(qid)]) for qid in question_ids]
 
-        questions = list(self.db.questions.find({}, {"_id": 0}))
-        return questions
-    
     def get_question_by_id(self, question_id: str) -> Dict[str, Any]:
 
         from bson import ObjectId
@@ -131,6 +284,9 @@ class QuizService:
             raise ValueError("Question not found")
         return question
 
+    def finish_solo_session(self, session_id: str, score: int) -> None:
+        self.db.solo_sessions.update_one(*finish_session_update(session_id, score))
+
     def check_solo_session(self, quiz_id: str, clerk_id: str) -> dict:
         """
         Returns the user's session state for a given quiz:
@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import InsertOne
+
+from models.quiz_model import QuizResult, SoloGameSessionModel, UserAnswerModel
+from services.quiz_cache import (
+    AnswerKey, answer_key_cache, quiz_doc_cache, quiz_payload_cache,
+    compile_answer_key, quiz_cache_keys, remember_quiz_ids, render_quiz_payload,
+)
+from services.quiz_service import ANSWER_KEY_PROJECTION, finish_session_update, result_document, score_answers
+from services.quiz_stats import record_quiz_stats_async
+from services.write_behind import write_behind
+
+
+class AsyncQuizService:
+    """
+    QuizService for the ASGI mode, on an AsyncMongoClient database.
+    Only the gameplay paths served by routes/quiz_async.py are implemented;
+    caches, scoring and write-behind are shared with the sync service.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def _find_quiz(self, quiz_id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        quiz = None
+        if ObjectId.is_valid(quiz_id):
+            quiz = await self.db.quizzes.find_one({"_id": ObjectId(quiz_id)}, projection)
+        if not quiz:
+            quiz = await self.db.quizzes.find_one({"id": quiz_id}, projection)
+        return quiz
+
+    async def get_answer_key(self, quiz_id: str) -> AnswerKey:
+        answer_key = answer_key_cache.get(quiz_id)
+        if answer_key is not None:
+            return answer_key
+
+        quiz = quiz_doc_cache.get(quiz_id) or await self._find_quiz(quiz_id, ANSWER_KEY_PROJECTION)
+        if not quiz:
+            raise ValueError("Quiz not found")
+
+        answer_key = compile_answer_key(quiz)
+        for key in quiz_cache_keys(quiz, quiz_id):
+            answer_key_cache.set(key, answer_key)
+        remember_quiz_ids(quiz, quiz_id)
+        return answer_key
+
+    async def calculate_quiz_score(self, quiz_id: str, user_answers: List[UserAnswerModel]) -> QuizResult:
+        return score_answers(await self.get_answer_key(quiz_id), quiz_id, user_answers)
+
+    async def save_quiz_result(self, result: QuizResult) -> str:
+        result_dict = result_document(result)
+        await write_behind.submit_async(self.db.results, InsertOne(result_dict))
+        await record_quiz_stats_async(self.db, result, "solo")
+        return str(result_dict['_id'])
+
+    async def finish_solo_session(self, session_id: str, score: int) -> None:
+        await self.db.solo_sessions.update_one(*finish_session_update(session_id, score))
+
+    async def get_quiz_document(self, quiz_id: str) -> Dict[str, Any]:
+        quiz = quiz_doc_cache.get(quiz_id)
+        if quiz is not None:
+            return quiz
+
+        quiz = await self._find_quiz(quiz_id)
+        if not quiz:
+            raise ValueError("Quiz not found")
+
+        for key in quiz_cache_keys(quiz, quiz_id):
+            quiz_doc_cache.set(key, quiz)
+        remember_quiz_ids(quiz, quiz_id)
+        return quiz
+
+    async def get_quiz_payload(self, quiz_id: str) -> Tuple[bytes, str]:
+        payload = quiz_payload_cache.get(quiz_id)
+        if payload is not None:
+            return payload
+
+        quiz = await self.get_quiz_document(quiz_id)
+        payload = render_quiz_payload(quiz)
+        for key in quiz_cache_keys(quiz, quiz_id):
+            quiz_payload_cache.set(key, payload)
+        return payload
+
+    async def get_all_quizzes(self) -> List[Dict[str, Any]]:
+        return await self.db.quizzes.find({}, {"questions": 0}).to_list(None)
+
+    async def check_solo_session(self, quiz_id: str, clerk_id: str) -> dict:
+        finished = await self.db.solo_sessions.find_one(
+            {"quiz_id": quiz_id, "clerk_id": clerk_id, "status": "finished"}
+        )
+        if finished:
+            return {"status": "finished", "session_id": None}
+
+        in_progress = await self.db.solo_sessions.find_one(
+            {"quiz_id": quiz_id, "clerk_id": clerk_id, "status": "in_progress"}
+        )
+        if in_progress:
+            return {"status": "in_progress", "session_id": str(in_progress['_id'])}
+
+        return {"status": "none", "session_id": None}
+
+    async def create_solo_session(self, quiz_id: str, clerk_id: str) -> str:
+        session = SoloGameSessionModel(quiz_id=quiz_id, clerk_id=clerk_id)
+        session_dict = session.model_dump(exclude={'id'})
+        result = await self.db.solo_sessions.insert_one(session_dict)
+        return str(result.inserted_id)
@@ -0,0 +1,147 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+from models.quiz_model import QuizResult
+from services.quiz_cache import quiz_id_cache, remember_quiz_ids
+from services.write_behind import write_behind
+
+load_dotenv("key.env")
+
+# Largeur des tranches de l'histogramme des scores (0-9, 10-19, ...)
+QUIZ_STATS_BUCKET_WIDTH = int(os.getenv("QUIZ_STATS_BUCKET_WIDTH", "10"))
+
+
+def _safe_field(name: str) -> bool:
+    # Les ids servent de noms de champs Mongo : pas de '.', ni de '$' en tête
+    return bool(name) and "." not in name and not name.startswith("$")
+
+
+def stats_update(result: QuizResult, mode: str) -> Dict[str, Any]:
+    """
+    $inc/$set update folding one scored attempt into its quiz_stats document.
+    Only questions found in the answer key are counted, once per attempt.
+    """
+    bucket = (result.score // QUIZ_STATS_BUCKET_WIDTH) * QUIZ_STATS_BUCKET_WIDTH
+    inc: Dict[str, int] = {
+        "attempts": 1,
+        "score_sum": result.score,
+        f"score_histogram.{bucket}": 1,
+        f"modes.{mode}": 1,
+    }
+
+    seen = set()
+    for answer in result.answers:
+        question_id = str(answer.question_id)
+        if question_id in seen or not _safe_field(question_id):
+            continue
+        seen.add(question_id)
+        inc[f"questions.{question_id}.attempts"] = 1
+        if answer.is_correct:
+            inc[f"questions.{question_id}.correct"] = 1
+
+    return {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}}
+
+
+def _quiz_id_queries(quiz_id: str):
+    # Même ordre que QuizService._find_quiz : ObjectId d'abord, puis l'id personnalisé
+    if ObjectId.is_valid(quiz_id):
+        yield {"_id": ObjectId(quiz_id)}
+    yield {"id": quiz_id}
+
+
+def _canonical_id(quiz: Optional[Dict[str, Any]], quiz_id: str) -> str:
+    if not quiz:
+        return quiz_id
+    remember_quiz_ids(quiz, quiz_id)
+    return str(quiz['_id'])
+
+
+def canonical_quiz_id(db: Database, quiz_id: str) -> str:
+    """
+    Stats document id of a quiz: its ObjectId string, whichever id (ObjectId or
+    custom `id`) it was played or requested by. Usually a cache hit, since
+    scoring the submission has just loaded the quiz.
+    """
+    quiz_id = str(quiz_id)
+    canonical = quiz_id_cache.get(quiz_id)
+    if canonical is not None:
+        return canonical
+    quiz = None
+    for query in _quiz_id_queries(quiz_id):
+        quiz = db.quizzes.find_one(query, {"_id": 1, "id": 1})
+        if quiz:
+            break
+    return _canonical_id(quiz, quiz_id)
+
+
+async def canonical_quiz_id_async(db, quiz_id: str) -> str:
+    quiz_id = str(quiz_id)
+    canonical = quiz_id_cache.get(quiz_id)
+    if canonical is not None:
+        return canonical
+    quiz = None
+    for query in _quiz_id_queries(quiz_id):
+        quiz = await db.quizzes.find_one(query, {"_id": 1, "id": 1})
+        if quiz:
+            break
+    return _canonical_id(quiz, quiz_id)
+
+
+def stats_op(stats_id: str, result: QuizResult, mode: str) -> UpdateOne:
+    return UpdateOne({"_id": stats_id}, stats_update(result, mode), upsert=True)
+
+
+def record_quiz_stats(db: Database, result: QuizResult, mode: str = "solo") -> None:
+    """
+    Best effort: a failed stats update must never fail the submission itself.
+    """
+    try:
+        write_behind.submit(db.quiz_stats, stats_op(canonical_quiz_id(db, result.quiz_id), result, mode))
+    except Exception as e:
+        print(f"Failed to update stats for quiz {result.quiz_id}: {e}")
+
+
+async def record_quiz_stats_async(db, result: QuizResult, mode: str = "solo") -> None:
+    try:
+        stats_id = await canonical_quiz_id_async(db, result.quiz_id)
+        await write_behind.submit_async(db.quiz_stats, stats_op(stats_id, result, mode))
+    except Exception as e:
+        print(f"Failed to update stats for quiz {result.quiz_id}: {e}")
+
+
+def stats_view(doc: Optional[Dict[str, Any]], quiz_id: str) -> Dict[str, Any]:
+    """Counters plus derived rates, as served by GET /quiz/<id>/stats."""
+    doc = doc or {}
+    attempts = doc.get("attempts", 0)
+    questions = {}
+    for question_id, counters in (doc.get("questions") or {}).items():
+        q_attempts = counters.get("attempts", 0)
+        q_correct = counters.get("correct", 0)
+        questions[question_id] = {
+            "attempts": q_attempts,
+            "correct": q_correct,
+            "correct_rate": round(q_correct / q_attempts, 4) if q_attempts else None,
+        }
+
+    return {
+        "quiz_id": quiz_id,
+        "attempts": attempts,
+        "average_score": round(doc.get("score_sum", 0) / attempts, 2) if attempts else None,
+        "score_histogram": {
+            int(bucket): count for bucket, count in sorted((doc.get("score_histogram") or {}).items(), key=lambda kv: int(kv[0]))
+        },
+        "bucket_width": QUIZ_STATS_BUCKET_WIDTH,
+        "modes": doc.get("modes", {}),
+        "questions": questions,
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+def get_quiz_stats(db: Database, quiz_id: str) -> Dict[str, Any]:
+    return stats_view(db.quiz_stats.find_one({"_id": canonical_quiz_id(db, quiz_id)}), quiz_id)
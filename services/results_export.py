@@ -0,0 +1,143 @@
+"""
+Streaming export of quiz results (NDJSON or CSV) for analytics.
+
+Results are read through a server-side cursor in batches and written row by row,
+so memory stays flat whatever the size of the export. The date range applies to
+the result's creation time, taken from its ObjectId.
+
+Usage:
+    python -m services.results_export --format csv --since 2026-01-01 -o results.csv
+    python -m services.results_export --quiz-id <id> > results.ndjson
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo.database import Database
+
+load_dotenv("key.env")
+
+EXPORT_BATCH_SIZE = int(os.getenv("RESULTS_EXPORT_BATCH_SIZE", "1000"))
+# Comptes autorisés à exporter les résultats de tout le monde ; les autres n'exportent que les leurs
+EXPORT_ALLOWED_CLERK_IDS = {c.strip() for c in os.getenv("RESULTS_EXPORT_CLERK_IDS", "").split(",") if c.strip()}
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+CSV_COLUMNS = ("result_id", "created_at", "clerk_id", "quiz_id", "score", "answered", "correct")
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """ISO date or datetime; naive values are taken as UTC. Raises ValueError."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def results_query(quiz_id: Optional[str] = None, clerk_id: Optional[str] = None,
+                  since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if quiz_id:
+        query["quiz_id"] = quiz_id
+    if clerk_id:
+        query["clerk_id"] = clerk_id
+    id_range = {}
+    if since:
+        id_range["$gte"] = ObjectId.from_datetime(since)
+    if until:
+        id_range["$lt"] = ObjectId.from_datetime(until)
+    if id_range:
+        query["_id"] = id_range
+    return query
+
+
+def iter_results(db: Database, query: Dict[str, Any], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    # Pas de tri : un sort() non couvert par un index bloquerait le serveur sur tout le résultat
+    cursor = db.results.find(query).batch_size(batch_size)
+    try:
+        for doc in cursor:
+            yield doc
+    finally:
+        cursor.close()
+
+
+def _export_record(doc: Dict[str, Any]) -> Dict[str, Any]:
+    record = {k: v for k, v in doc.items() if k != "_id"}
+    record["result_id"] = str(doc["_id"])
+    record["created_at"] = doc["_id"].generation_time.isoformat()
+    return record
+
+
+def to_ndjson(docs: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for doc in docs:
+        yield json.dumps(_export_record(doc), separators=(",", ":"), default=str) + "\n"
+
+
+def to_csv(docs: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for doc in docs:
+        answers = doc.get("answers") or []
+        writer.writerow((
+            str(doc["_id"]),
+            doc["_id"].generation_time.isoformat(),
+            doc.get("clerk_id", ""),
+            doc.get("quiz_id", ""),
+            doc.get("score", 0),
+            len(answers),
+            sum(1 for a in answers if a.get("is_correct")),
+        ))
+        yield flush()
+
+
+def export_results(db: Database, fmt: str, query: Dict[str, Any], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    if fmt == "ndjson":
+        return to_ndjson(iter_results(db, query, batch_size))
+    if fmt == "csv":
+        return to_csv(iter_results(db, query, batch_size))
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--quiz-id")
+    parser.add_argument("--clerk-id")
+    parser.add_argument("--since", type=parse_date, help="ISO date, inclusive")
+    parser.add_argument("--until", type=parse_date, help="ISO date, exclusive")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    parser.add_argument("-o", "--output", help="defaults to stdout")
+    args = parser.parse_args()
+
+    from config.db import get_db
+
+    query = results_query(args.quiz_id, args.clerk_id, args.since, args.until)
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for chunk in export_results(get_db(), args.format, query, args.batch_size):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+from pymongo.database import Database
+
+from services.cache import TTLCache
+
+load_dotenv("key.env")
+
+# Profils utilisateurs indexés par clerk_id. Le TTL borne la durée pendant
+# laquelle un autre worker peut servir un profil périmé.
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+)
+
+
+def get_user(db: Database, clerk_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the user document for clerk_id, from the cache when possible.
+    Callers get their own shallow copy so they cannot corrupt the cached entry.
+    """
+    user = user_cache.get(clerk_id)
+    if user is None:
+        user = db["users"].find_one({"clerk_id": clerk_id})
+        if user is None:
+            return None
+        user_cache.set(clerk_id, user)
+    return dict(user)
+
+
+async def get_user_async(db, clerk_id: str) -> Optional[Dict[str, Any]]:
+    """get_user() for the async (AsyncMongoClient) database."""
+    user = user_cache.get(clerk_id)
+    if user is None:
+        user = await db["users"].find_one({"clerk_id": clerk_id})
+        if user is None:
+            return None
+        user_cache.set(clerk_id, user)
+    return dict(user)
+
+
+def cache_user(user: Dict[str, Any]) -> None:
+    user_cache.set(user["clerk_id"], dict(user))
+
+
+def invalidate_user(*clerk_ids: Optional[str]) -> None:
+    user_cache.delete(*[clerk_id for clerk_id in clerk_ids if clerk_id])
+
+
+def display_name(user: Dict[str, Any]) -> str:
+    return f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
+
+
+def _names_from_cache(clerk_ids: Iterable[Optional[str]]):
+    names: Dict[str, str] = {}
+    missing = []
+    for clerk_id in set(filter(None, clerk_ids)):
+        user = user_cache.get(clerk_id)
+        if user is not None:
+            names[clerk_id] = display_name(user)
+        else:
+            missing.append(clerk_id)
+    return names, missing
+
+
+NAME_PROJECTION = {"_id": 0, "clerk_id": 1, "first_name": 1, "last_name": 1}
+
+
+def get_display_names(db: Database, clerk_ids: Iterable[Optional[str]]) -> Dict[str, str]:
+    """
+    Display names for several users: cached profiles first, then a single
+    projected `$in` query for the rest. Unknown users map to their clerk_id.
+    """
+    names, missing = _names_from_cache(clerk_ids)
+
+    if missing:
+        for user in db["users"].find({"clerk_id": {"$in": missing}}, NAME_PROJECTION):
+            names[user["clerk_id"]] = display_name(user)
+
+    for clerk_id in missing:
+        names.setdefault(clerk_id, clerk_id)
+    return names
+
+
+async def get_display_names_async(db, clerk_ids: Iterable[Optional[str]]) -> Dict[str, str]:
+    names, missing = _names_from_cache(clerk_ids)
+
+    if missing:
+        async for user in db["users"].find({"clerk_id": {"$in": missing}}, NAME_PROJECTION):
+            names[user["clerk_id"]] = display_name(user)
+
+    for clerk_id in missing:
+        names.setdefault(clerk_id, clerk_id)
+    return names
@@ -0,0 +1,52 @@
+from typing import Any, Dict, List
+
+from pydantic import TypeAdapter, ValidationError
+
+from models.quiz_model import QuestionModel, QuizModel, UserAnswerModel
+
+# Adapters construits une fois à l'import : les schémas de validation ne sont pas
+# recompilés à chaque requête, et une liste entière se valide en un seul appel
+ANSWER_LIST_ADAPTER = TypeAdapter(List[UserAnswerModel])
+QUESTION_LIST_ADAPTER = TypeAdapter(List[QuestionModel])
+QUIZ_ADAPTER = TypeAdapter(QuizModel)
+
+
+class PayloadError(ValueError):
+    """Raised when a payload has the wrong top-level shape (e.g. not a list)."""
+
+
+def validate_answers(payload: Any) -> List[UserAnswerModel]:
+    """
+    Validate a whole `answers` array in one call. Error locations are
+    (index, field), e.g. ('3', 'selected_option').
+    """
+    if payload is None:
+        return []
+    if not isinstance(payload, list):
+        raise PayloadError("answers must be a list")
+    return ANSWER_LIST_ADAPTER.validate_python(payload)
+
+
+def validate_questions(payload: List[Dict[str, Any]]) -> List[QuestionModel]:
+    return QUESTION_LIST_ADAPTER.validate_python(payload)
+
+
+def validate_quiz(payload: Any) -> QuizModel:
+    """Validate a quiz body (title, category, questions...) before it is inserted."""
+    if not isinstance(payload, dict):
+        raise PayloadError("quiz must be an object")
+    return QUIZ_ADAPTER.validate_python(payload)
+
+
+def validation_error_details(e: ValidationError) -> List[Dict[str, Any]]:
+    """JSON-safe version of e.errors() for 400 responses."""
+    return [
+        {"loc": [str(p) for p in err["loc"]], "msg": err["msg"], "type": err["type"]}
+        for err in e.errors(include_url=False, include_context=False, include_input=False)
+    ]
+
+
+def validation_error_body(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, ValidationError):
+        return {"success": False, "error": "Validation failed", "details": validation_error_details(e)}
+    return {"success": False, "error": "Validation failed", "details": [{"loc": [], "msg": str(e), "type": "payload"}]}
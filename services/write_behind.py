@@ -0,0 +1,186 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Tuple, Union
+
+from dotenv import load_dotenv
+from pymongo import InsertOne, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+load_dotenv("key.env")
+
+WriteOp = Union[InsertOne, UpdateOne]
+
+
+class WriteBehindQueue:
+    """
+    Bounded in-process queue of writes, flushed by a background thread as one
+    unordered bulk_write per collection.
+
+    - batches: up to `batch_size` ops, or whatever arrived within `flush_interval`
+    - backpressure: submit() waits up to `enqueue_timeout` for room in the queue,
+      then falls back to writing synchronously in the caller's thread
+    - shutdown: close() (registered with atexit) drains the queue before exit
+    - disabled (or after close), every submit() is a plain synchronous write
+    """
+
+    def __init__(self, enabled: bool = False, maxsize: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.05, enqueue_timeout: float = 0.5):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue[Tuple[Collection, WriteOp]]" = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self.stats = {"queued": 0, "sync_fallback": 0, "batches": 0, "written": 0, "errors": 0}
+
+    def _ensure_started(self) -> bool:
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return True
+        with self._lock:
+            if self._closed:
+                return False
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                # Après un fork, le thread du parent n'existe pas dans l'enfant
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+        return True
+
+    def _count(self, name: str, n: int = 1):
+        # Les requêtes et le thread de flush incrémentent les mêmes compteurs
+        with self._lock:
+            self.stats[name] += n
+
+    @staticmethod
+    def _write_now(collection: Collection, op: WriteOp):
+        collection.bulk_write([op])
+
+    def submit(self, collection: Collection, op: WriteOp) -> bool:
+        """
+        Queue a write. Returns True if it was deferred, False if it was written
+        synchronously (pipeline disabled, closed or saturated).
+        """
+        if self.enabled and self._ensure_started():
+            try:
+                self._queue.put((collection, op), timeout=self.enqueue_timeout)
+                self._count("queued")
+                return True
+            except queue.Full:
+                self._count("sync_fallback")
+        self._write_now(collection, op)
+        return False
+
+    async def submit_async(self, collection, op: WriteOp) -> bool:
+        """
+        submit() for the ASGI mode, `collection` being an AsyncMongoClient
+        collection. Queued ops are flushed by the same thread through the sync
+        client; an op that cannot be queued right away is written with the async
+        client, so the event loop never waits on the queue or on a sync write.
+        """
+        if self.enabled and self._ensure_started():
+            from config.db import mongodb_connection
+
+            sync_collection = mongodb_connection()[collection.database.name][collection.name]
+            try:
+                self._queue.put_nowait((sync_collection, op))
+                self._count("queued")
+                return True
+            except queue.Full:
+                self._count("sync_fallback")
+        await collection.bulk_write([op])
+        return False
+
+    def _drain(self, first) -> List[Tuple[Collection, WriteOp]]:
+        items = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                items.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _flush_items(self, items: List[Tuple[Collection, WriteOp]]):
+        groups: Dict[str, Tuple[Collection, List[WriteOp]]] = {}
+        for collection, op in items:
+            groups.setdefault(collection.full_name, (collection, []))[1].append(op)
+
+        for name, (collection, ops) in groups.items():
+            try:
+                result = collection.bulk_write(ops, ordered=False)
+                self._count("written", result.inserted_count + result.modified_count + result.upserted_count)
+            except BulkWriteError as e:
+                failed = len(e.details.get("writeErrors", []))
+                self._count("written", len(ops) - failed)
+                self._count("errors", failed)
+                print(f"Write-behind: {failed} of {len(ops)} writes to {name} failed: {e.details.get('writeErrors', [])[:3]}")
+            except Exception as e:
+                self._count("errors", len(ops))
+                print(f"Write-behind: batch of {len(ops)} writes to {name} failed: {e}")
+            self._count("batches")
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._queue.task_done()
+                return
+            items = self._drain(first)
+            # Le signal d'arrêt peut arriver au milieu d'un lot
+            stop = None in items
+            items = [item for item in items if item is not None]
+            try:
+                self._flush_items(items)
+            finally:
+                for _ in range(len(items) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every queued write has been sent."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout: float = 10.0):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        # Ce qui reste (thread mort ou timeout) est écrit ici, en synchrone
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftovers.append(item)
+        if leftovers:
+            self._flush_items(leftovers)
+
+    def __len__(self):
+        return self._queue.qsize()
+
+
+write_behind = WriteBehindQueue(
+    enabled=os.getenv("WRITE_BEHIND_ENABLED", "false").lower() in ("1", "true", "yes"),
+    maxsize=int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_MS", "50")) / 1000,
+    enqueue_timeout=float(os.getenv("WRITE_BEHIND_ENQUEUE_TIMEOUT_MS", "500")) / 1000,
+)
@@ -0,0 +1,59 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Les modules sont importés depuis la racine du dépôt (config, services, routes...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The Flask app on a mongomock database, with Clerk session tokens signed locally (see `clerk`)."""
+    import mongomock
+
+    os.environ["MONGODB_DB_NAME"] = "test_db"
+    os.environ.setdefault("CLERK_SECRET_KEY", "sk_test_suite")
+
+    import config.db as db_config
+    from tests.helpers import patch_mongomock_bulk_write
+
+    patch_mongomock_bulk_write(mongomock)
+    db_config._client = mongomock.MongoClient()
+    db_config._client_pid = os.getpid()
+
+    from app import app as flask_app
+    return flask_app
+
+
+@pytest.fixture(scope="session")
+def clerk(app):
+    from tests.helpers import StubClerk
+
+    return StubClerk()
+
+
+@pytest.fixture
+def db(app):
+    from config.db import get_db
+
+    return get_db()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(db):
+    """Profile stored beforehand, otherwise the middleware would fetch it from Clerk."""
+    def make(prefix="user", **fields):
+        clerk_id = f"{prefix}_{uuid.uuid4().hex[:8]}"
+        db.users.insert_one({
+            "clerk_id": clerk_id, "first_name": prefix, "last_name": "Test", "email": f"{clerk_id}@test.local",
+            "elo": 1200, "total_duels": 0, "wins": 0, "losses": 0, **fields,
+        })
+        return clerk_id
+    return make
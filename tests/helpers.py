@@ -0,0 +1,60 @@
+"""
+Test doubles shared by the test suite and benchmarks/load_suite.py: a Clerk
+that signs session JWTs locally, and the mongomock bulk_write patch.
+"""
+import json
+import time
+
+FRONTEND_URL = "http://localhost:5173"
+
+
+def patch_mongomock_bulk_write(mongomock):
+    """mongomock's bulk_write does not accept the write models of recent pymongo versions."""
+    from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
+    class BulkResult:
+        def __init__(self):
+            self.inserted_count = self.modified_count = self.upserted_count = 0
+
+    def bulk_write(collection, requests, ordered=True, **kwargs):
+        result = BulkResult()
+        for op in requests:
+            if isinstance(op, InsertOne):
+                collection.insert_one(op._doc)
+                result.inserted_count += 1
+            elif isinstance(op, (UpdateOne, UpdateMany, ReplaceOne)):
+                method = {UpdateOne: collection.update_one, UpdateMany: collection.update_many,
+                          ReplaceOne: collection.replace_one}[type(op)]
+                res = method(op._filter, op._doc, upsert=op._upsert)
+                result.modified_count += res.modified_count
+                result.upserted_count += 1 if res.upserted_id is not None else 0
+            elif isinstance(op, DeleteOne):
+                collection.delete_one(op._filter)
+            else:
+                raise NotImplementedError(type(op).__name__)
+        return result
+
+    mongomock.collection.Collection.bulk_write = bulk_write
+
+
+class StubClerk:
+    """Signs session JWTs with a local RSA key and preloads its JWKS in the app's verifier."""
+
+    def __init__(self, azp: str = FRONTEND_URL):
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from jwt.algorithms import RSAAlgorithm
+
+        import middleware.clerk_auth as clerk_auth
+
+        self.azp = azp
+        self._key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(self._key.public_key()))
+        jwk.update(kid="stub-clerk", alg="RS256", use="sig")
+        clerk_auth.jwt_verifier.jwks_cache.load_jwks({"keys": [jwk]})
+
+    def token(self, clerk_id, ttl=3600):
+        import jwt
+
+        now = int(time.time())
+        return jwt.encode({"sub": clerk_id, "azp": self.azp, "iat": now, "nbf": now, "exp": now + ttl},
+                          self._key, algorithm="RS256", headers={"kid": "stub-clerk"})
@@ -0,0 +1,160 @@
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from services.clerk_jwt import ClerkJWTVerifier, JWKSCache, SessionTokenError
+
+AZP = "http://localhost:5173"
+
+
+def _jwk(private_key, kid):
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return jwk
+
+
+@pytest.fixture
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class FakeJWKSEndpoint:
+    def __init__(self, *jwks):
+        self.keys = list(jwks)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"keys": list(self.keys)}
+
+
+def _token(private_key, kid="kid-1", **overrides):
+    now = int(time.time())
+    claims = {"sub": "user_123", "iat": now, "nbf": now, "exp": now + 60, "azp": AZP}
+    claims.update(overrides)
+    claims = {k: v for k, v in claims.items() if v is not None}
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def _age(cache, seconds):
+    cache._fetched_at -= seconds
+    cache._attempted_at -= seconds
+
+
+def _verifier(endpoint, **cache_kwargs):
+    return ClerkJWTVerifier(JWKSCache(endpoint, **cache_kwargs), authorized_parties=[AZP], leeway=0)
+
+
+def test_valid_token(private_key):
+    endpoint = FakeJWKSEndpoint(_jwk(private_key, "kid-1"))
+    verifier = _verifier(endpoint)
+
+    assert verifier.verify(_token(private_key))["sub"] == "user_123"
+    assert verifier.verify(_token(private_key))["sub"] == "user_123"
+    assert endpoint.calls == 1
+
+
+def test_expired_token(private_key):
+    verifier = _verifier(FakeJWKSEndpoint(_jwk(private_key, "kid-1")))
+    now = int(time.time())
+
+    with pytest.raises(SessionTokenError, match="token-expired"):
+        verifier.verify(_token(private_key, iat=now - 120, nbf=now - 120, exp=now - 60))
+
+
+def test_wrong_kid(private_key):
+    verifier = _verifier(FakeJWKSEndpoint(_jwk(private_key, "kid-1")))
+
+    with pytest.raises(SessionTokenError, match="jwk-kid-mismatch"):
+        verifier.verify(_token(private_key, kid="kid-2"))
+
+
+def test_signature_from_another_key(private_key):
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    verifier = _verifier(FakeJWKSEndpoint(_jwk(private_key, "kid-1")))
+
+    with pytest.raises(SessionTokenError, match="token-invalid-signature"):
+        verifier.verify(_token(other_key, kid="kid-1"))
+
+
+def test_bad_azp(private_key):
+    verifier = _verifier(FakeJWKSEndpoint(_jwk(private_key, "kid-1")))
+
+    with pytest.raises(SessionTokenError, match="token-invalid-authorized-parties"):
+        verifier.verify(_token(private_key, azp="https://evil.example"))
+
+
+def test_missing_azp_is_accepted(private_key):
+    # Même sémantique que Clerk : azp n'est vérifié que s'il est présent
+    verifier = _verifier(FakeJWKSEndpoint(_jwk(private_key, "kid-1")))
+
+    assert verifier.verify(_token(private_key, azp=None))["sub"] == "user_123"
+
+
+def test_unknown_kid_refresh_is_rate_limited(private_key):
+    rotated_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    endpoint = FakeJWKSEndpoint(_jwk(private_key, "kid-1"))
+    cache = JWKSCache(endpoint, ttl=3600, min_refresh_interval=30)
+    verifier = ClerkJWTVerifier(cache, authorized_parties=[AZP], leeway=0)
+
+    verifier.verify(_token(private_key))
+    assert endpoint.calls == 1
+
+    # Rotation côté Clerk, mais le dernier fetch est trop récent : pas de nouvel appel
+    endpoint.keys.append(_jwk(rotated_key, "kid-2"))
+    for _ in range(5):
+        with pytest.raises(SessionTokenError, match="jwk-kid-mismatch"):
+            verifier.verify(_token(rotated_key, kid="kid-2"))
+    assert endpoint.calls == 1
+    assert not cache.needs_refresh("kid-1")
+    assert not cache.needs_refresh("kid-2")
+
+    # Une fois l'intervalle minimal écoulé, le kid inconnu déclenche un seul rafraîchissement
+    _age(cache, 30)
+    assert cache.needs_refresh("kid-2")
+    assert verifier.verify(_token(rotated_key, kid="kid-2"))["sub"] == "user_123"
+    assert verifier.verify(_token(rotated_key, kid="kid-2"))["sub"] == "user_123"
+    assert endpoint.calls == 2
+
+
+def test_failed_refresh_backs_off_and_serves_previous_keys(private_key):
+    endpoint = FakeJWKSEndpoint(_jwk(private_key, "kid-1"))
+    cache = JWKSCache(endpoint, ttl=3600, min_refresh_interval=30)
+    verifier = ClerkJWTVerifier(cache, leeway=0)
+    verifier.verify(_token(private_key))
+
+    calls = []
+
+    def unreachable():
+        calls.append(time.monotonic())
+        raise ConnectionError("Clerk down")
+
+    cache.fetch_jwks = unreachable
+    _age(cache, 3600)
+
+    # Une seule tentative pendant l'intervalle, les clés expirées restent servies
+    for _ in range(5):
+        assert verifier.verify(_token(private_key))["sub"] == "user_123"
+    assert len(calls) == 1
+    assert not cache.needs_refresh("kid-1")
+
+    # L'intervalle écoulé, on retente une fois
+    cache._attempted_at -= 30
+    assert verifier.verify(_token(private_key))["sub"] == "user_123"
+    assert len(calls) == 2
+
+
+def test_no_fetch_path_never_calls_the_endpoint(private_key):
+    endpoint = FakeJWKSEndpoint(_jwk(private_key, "kid-1"))
+    verifier = _verifier(endpoint)
+
+    with pytest.raises(SessionTokenError, match="jwks-unavailable"):
+        verifier.verify(_token(private_key), allow_fetch=False)
+    assert endpoint.calls == 0
+
+    verifier.jwks_cache.load_jwks(endpoint())
+    assert verifier.verify(_token(private_key), allow_fetch=False)["sub"] == "user_123"
+    assert endpoint.calls == 1
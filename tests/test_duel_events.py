@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from services.duel_events import RedisBroker, broker, duel_channel, publish_duel_event, publish_duel_event_async
+from services.duel_service import DuelService
+
+
+@pytest.fixture
+def duel_id(db, make_user):
+    duel_id, _ = DuelService(db).create_room("quiz", make_user("host"))
+    return duel_id
+
+
+def _open_stream(client, clerk, make_user, duel_id):
+    return client.get(f"/duel/{duel_id}/events", buffered=False,
+                      headers={"Authorization": f"Bearer {clerk.token(make_user('viewer'))}"})
+
+
+def _events(body: str):
+    events = []
+    for block in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if line.startswith(("event", "data")))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_snapshot_then_published_events(client, clerk, make_user, duel_id):
+    response = _open_stream(client, clerk, make_user, duel_id)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert broker.subscriber_count(duel_channel(duel_id)) == 1
+
+    publish_duel_event(duel_id, "joined", {"player2_id": "p2"})
+    publish_duel_event(duel_id, "finished", {"winner_id": "p2"})
+    events = _events(response.get_data(as_text=True))
+    response.close()
+
+    assert [name for name, _ in events] == ["snapshot", "joined", "finished"]
+    assert events[0][1]["duel"]["status"] == "waiting"
+    assert events[2][1]["winner_id"] == "p2"
+    assert broker.subscriber_count(duel_channel(duel_id)) == 0
+
+
+def test_unread_stream_is_closed_with_the_response(client, clerk, make_user, duel_id):
+    response = _open_stream(client, clerk, make_user, duel_id)
+    assert broker.subscriber_count(duel_channel(duel_id)) == 1
+
+    response.close()
+    assert broker.subscriber_count(duel_channel(duel_id)) == 0
+
+
+def test_wsgi_stream_ends_so_the_client_reconnects(client, clerk, make_user, duel_id, monkeypatch):
+    import routes.duel as duel_routes
+
+    monkeypatch.setattr(duel_routes, "SSE_MAX_DURATION_SECONDS", 0.05)
+    monkeypatch.setattr(duel_routes, "SSE_HEARTBEAT_SECONDS", 0.01)
+    response = _open_stream(client, clerk, make_user, duel_id)
+    body = response.get_data(as_text=True)
+    response.close()
+
+    assert body.startswith("retry: ")
+    assert [name for name, _ in _events(body)] == ["snapshot"]
+    assert broker.subscriber_count(duel_channel(duel_id)) == 0
+
+
+def test_subscription_closed_on_errors(client, clerk, make_user, duel_id, monkeypatch):
+    missing = "0" * 24
+    assert _open_stream(client, clerk, make_user, missing).status_code == 404
+    assert broker.subscriber_count(duel_channel(missing)) == 0
+
+    def broken(self, duel, names=None):
+        raise RuntimeError("names unavailable")
+
+    monkeypatch.setattr(DuelService, "describe", broken)
+    assert _open_stream(client, clerk, make_user, duel_id).status_code == 500
+    assert broker.subscriber_count(duel_channel(duel_id)) == 0
+
+
+def test_async_publish_reaches_async_subscribers():
+    async def scenario():
+        subscription = broker.subscribe_async(duel_channel("async-duel"))
+        try:
+            await publish_duel_event_async("async-duel", "joined", {"player2_id": "p2"})
+            return await subscription.get_async(timeout=1)
+        finally:
+            subscription.close()
+
+    assert asyncio.run(scenario()) == {"type": "joined", "duel_id": "async-duel", "player2_id": "p2"}
+
+
+def test_redis_publish_runs_off_the_event_loop():
+    published = []
+
+    class FakeRedis:
+        def publish(self, channel, payload):
+            published.append((threading.get_ident(), channel))
+
+    # Sans serveur Redis : seul le client de publication est utilisé
+    redis_broker = RedisBroker.__new__(RedisBroker)
+    redis_broker.prefix = "duel-events:"
+    redis_broker.redis = FakeRedis()
+
+    async def scenario():
+        await redis_broker.publish_async("duel:x", {"type": "joined"})
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert published[0][1] == "duel-events:duel:x"
+    assert published[0][0] != loop_thread
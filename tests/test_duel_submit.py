@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.duel_service import DuelService
+
+
+@pytest.fixture
+def duel(db, make_user):
+    quiz_id = str(db.quizzes.insert_one({
+        "title": "Duel",
+        "questions": [{"text": f"Q{i}", "options": ["a", "b"], "correct_answer": "a", "points": 10}
+                      for i in range(2)],
+    }).inserted_id)
+    player1, player2 = make_user("p1"), make_user("p2")
+    service = DuelService(db)
+    duel_id, room_code = service.create_room(quiz_id, player1)
+    service.join_room(room_code, player2)
+    return duel_id, player1, player2
+
+
+def _submit(client, clerk, duel_id, clerk_id, selected):
+    answers = [{"question_id": str(i), "selected_option": option, "is_correct": False} for i, option in enumerate(selected)]
+    return client.post(f"/duel/{duel_id}/submit", json={"answers": answers},
+                       headers={"Authorization": f"Bearer {clerk.token(clerk_id)}"})
+
+
+def test_double_submit_returns_409(client, clerk, db, duel):
+    duel_id, player1, _ = duel
+
+    first = _submit(client, clerk, duel_id, player1, ["a", "a"])
+    assert first.status_code == 200
+    assert first.get_json()["score"] == 20
+
+    again = _submit(client, clerk, duel_id, player1, ["b", "b"])
+    assert again.status_code == 409
+    stored = DuelService(db).find_duel(duel_id)
+    assert stored["player1_score"] == 20
+    assert stored["status"] == "in_battle"
+
+
+def test_second_submit_finalizes_once(client, clerk, db, duel):
+    duel_id, player1, player2 = duel
+
+    assert _submit(client, clerk, duel_id, player1, ["a", "a"]).get_json()["both_done"] is False
+    body = _submit(client, clerk, duel_id, player2, ["a", "b"]).get_json()
+    assert body["both_done"] is True
+    assert body["winner_id"] == player1
+
+    stored = DuelService(db).find_duel(duel_id)
+    assert stored["status"] == "finished"
+    assert stored["winner_id"] == player1
+    winner, loser = db.users.find_one({"clerk_id": player1}), db.users.find_one({"clerk_id": player2})
+    assert (winner["wins"], winner["total_duels"]) == (1, 1)
+    assert (loser["losses"], loser["total_duels"]) == (1, 1)
+    assert winner["elo"] - 1200 == stored["elo_delta"]["player1"] > 0
+    assert stored["elo_applied"] is True
+
+    # Un second finaliseur (l'autre requête, qui a lu le duel avant la clôture) ne change plus rien
+    assert _submit(client, clerk, duel_id, player2, ["a", "a"]).status_code == 409
+    stale = {**stored, "status": "in_battle"}
+    finalized, winner_id, _, _ = DuelService(db).finalize(stale)
+    assert (finalized, winner_id) == (False, player1)
+    assert db.users.find_one({"clerk_id": player1})["total_duels"] == 1
+
+
+def test_exactly_one_finalizer(db, duel):
+    duel_id, player1, player2 = duel
+    service = DuelService(db)
+    oid = service.find_duel(duel_id)["_id"]
+    service.record_score(oid, True, player1, 10)
+    both_done = service.record_score(oid, False, player2, 20)
+
+    # Les deux requêtes ont vu both_done et tentent chacune de clôturer le duel
+    outcomes = [service.finalize(dict(both_done)) for _ in range(2)]
+
+    assert [finalized for finalized, *_ in outcomes] == [True, False]
+    assert {winner_id for _, winner_id, *_ in outcomes} == {player2}
+    assert db.users.find_one({"clerk_id": player2})["wins"] == 1
+    assert db.users.find_one({"clerk_id": player1})["total_duels"] == 1
+
+
+def test_interrupted_finalization_is_recovered_once(db, duel, monkeypatch):
+    duel_id, player1, player2 = duel
+    service = DuelService(db)
+    oid = service.find_duel(duel_id)["_id"]
+    service.record_score(oid, True, player1, 20)
+    both_done = service.record_score(oid, False, player2, 10)
+
+    # Le finaliseur meurt entre la clôture du duel et le $inc des joueurs
+    def crash(*args, **kwargs):
+        raise RuntimeError("worker killed")
+    monkeypatch.setattr(service, "apply_ratings", crash)
+    with pytest.raises(RuntimeError):
+        service.finalize(dict(both_done))
+    monkeypatch.undo()
+
+    stored = service.find_duel(duel_id)
+    assert (stored["status"], stored["elo_applied"]) == ("finished", False)
+    assert db.users.find_one({"clerk_id": player1})["total_duels"] == 0
+
+    # Un finaliseur récent est peut-être encore en vie : on attend le délai de grâce
+    assert service.apply_pending_ratings() == 0
+    db.duels.update_one({"_id": oid}, {"$set": {"finished_at": datetime.utcnow() - timedelta(minutes=5)}})
+
+    # Reprise : les deltas stockés sont appliqués une seule fois, même relancée
+    assert service.apply_pending_ratings() == 1
+    assert service.apply_pending_ratings() == 0
+    service.apply_ratings(stored, {"elo": 99, "total_duels": 1}, {"elo": -99, "total_duels": 1})
+
+    winner = db.users.find_one({"clerk_id": player1})
+    assert (winner["wins"], winner["total_duels"]) == (1, 1)
+    assert winner["elo"] - 1200 == stored["elo_delta"]["player1"] > 0
+    assert db.users.find_one({"clerk_id": player2})["losses"] == 1
+    assert service.find_duel(duel_id)["elo_applied"] is True
+
+
+def test_outsider_cannot_submit(client, clerk, duel, make_user):
+    duel_id, _, _ = duel
+
+    assert _submit(client, clerk, duel_id, make_user("outsider"), ["a", "a"]).status_code == 403
@@ -0,0 +1,43 @@
+import random
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+pytest.importorskip("numpy")
+
+from services.elo import EloEngine
+from services.elo_replay import load_history, replay
+
+
+def test_replay_matches_sequential_ratings():
+    db = mongomock.MongoClient().db
+    engine = EloEngine(k_factor=32, provisional_k=40, provisional_games=3, initial_rating=1200)
+    rng = random.Random(7)
+    players = [f"p{i}" for i in range(12)]
+    start = datetime(2026, 1, 1)
+
+    ratings = {p: 1200 for p in players}
+    games = {p: 0 for p in players}
+    expected_deltas = []
+    duels = []
+    for i in range(400):
+        a, b = rng.sample(players, 2)
+        winner = rng.choice([a, b, None])
+        score = 1.0 if winner == a else 0.0 if winner == b else 0.5
+        delta_a, delta_b = engine.rate(ratings[a], ratings[b], score, games[a], games[b])
+        ratings[a] += delta_a
+        ratings[b] += delta_b
+        games[a] += 1
+        games[b] += 1
+        expected_deltas.append([delta_a, delta_b])
+        duels.append({"status": "finished", "player1_id": a, "player2_id": b, "winner_id": winner,
+                      "finished_at": start + timedelta(seconds=i)})
+    db.duels.insert_many(duels)
+
+    history = load_history(db)
+    result = replay(history, engine)
+
+    assert result["deltas"].astype(int).tolist() == expected_deltas
+    replayed = {p: int(result["ratings"][i]) for i, p in enumerate(history["players"])}
+    assert replayed == ratings
@@ -0,0 +1,77 @@
+import mongomock
+import pytest
+
+from config import indexes
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def test_bootstrap_skips_migrations_by_default(db, monkeypatch):
+    db.users.insert_many([{"clerk_id": "a"}, {"clerk_id": "a"}])
+    monkeypatch.setattr(indexes, "ensure_indexes", lambda database: {})
+
+    indexes.bootstrap(db, migrate=False)
+
+    assert db.users.count_documents({}) == 2
+    assert db.schema_migrations.count_documents({}) == 0
+
+
+def test_migration_claimed_elsewhere_is_skipped(db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(indexes, "MIGRATIONS", [("0001_test", lambda database: calls.append(1))])
+    db.schema_migrations.insert_one({"_id": "0001_test", "state": "running"})
+
+    assert indexes.run_migrations(db) == []
+    assert calls == []
+
+
+def test_migration_runs_once(db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(indexes, "MIGRATIONS", [("0001_test", lambda database: calls.append(1))])
+
+    assert indexes.run_migrations(db) == ["0001_test"]
+    assert indexes.run_migrations(db) == []
+    assert calls == [1]
+    assert db.schema_migrations.find_one({"_id": "0001_test"})["state"] == "applied"
+
+
+def test_failed_migration_releases_claim_and_indexes_still_run(db, monkeypatch):
+    def broken(database):
+        raise RuntimeError("boom")
+
+    ensured = []
+    monkeypatch.setattr(indexes, "MIGRATIONS", [("0001_test", broken)])
+    monkeypatch.setattr(indexes, "ensure_indexes", lambda database: ensured.append(database))
+
+    indexes.bootstrap(db, migrate=True)
+
+    assert ensured == [db]
+    assert db.schema_migrations.count_documents({}) == 0
+
+
+def test_duplicate_waiting_rooms_are_cancelled(db):
+    from models.quiz_model import DuelStatus
+
+    older, newer = [db.duels.insert_one({"room_code": "ABC123", "status": "waiting"}).inserted_id for _ in range(2)]
+
+    indexes._unique_waiting_room_codes(db)
+
+    assert db.duels.find_one({"_id": older})["status"] == DuelStatus.CANCELLED.value
+    assert db.duels.find_one({"_id": newer})["status"] == DuelStatus.WAITING.value
+
+
+def test_missing_unique_index_fails_the_check(db):
+    db.users.insert_many([{"clerk_id": "a"}, {"clerk_id": "a"}])
+    indexes.ensure_indexes(db)
+
+    # Le build de clerk_id_unique a échoué sur les doublons
+    assert "users.clerk_id_unique" in indexes.missing_unique_indexes(db)
+    ok, message = indexes.check_unique_indexes(db)
+    assert not ok and "users.clerk_id_unique" in message
+
+    db.users.delete_one({"clerk_id": "a"})
+    indexes.ensure_indexes(db)
+    assert indexes.check_unique_indexes(db)[0]
@@ -0,0 +1,68 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import config.json_provider as json_provider
+from models.quiz_model import DuelStatus
+
+
+def _document():
+    return {
+        "_id": ObjectId(),
+        "status": DuelStatus.FINISHED,
+        "created_at": datetime(2026, 10, 18, 9, 5, 3, 123000),
+        "finished_at": datetime(2026, 3, 1, 23, 59, 59, tzinfo=timezone(timedelta(hours=2))),
+        "day": date(2026, 2, 28),
+        "zeta": 1,
+        "alpha": {"b": [1, 2], "a": None},
+    }
+
+
+def _flask_view(doc):
+    # Ce que les handlers envoyaient à Flask avant le provider : _id déjà converti
+    return {**doc, "_id": str(doc["_id"]), "status": doc["status"].value}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def provider(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_provider, "orjson", None)
+    elif json_provider.orjson is None:
+        pytest.skip("orjson is not installed")
+    app = Flask(__name__)
+    return app, json_provider.MongoJSONProvider(app)
+
+
+def test_same_wire_format_as_flask(provider):
+    app, mongo_provider = provider
+    doc = _document()
+    with app.app_context():
+        expected = DefaultJSONProvider(app).response(_flask_view(doc)).get_data()
+        body = mongo_provider.response(doc).get_data()
+
+    assert json.loads(body) == json.loads(expected)
+    # Mêmes clés dans le même ordre (triées)
+    assert list(json.loads(body)) == list(json.loads(expected))
+    assert json.loads(body)["finished_at"] == "Sun, 01 Mar 2026 21:59:59 GMT"
+
+
+def test_dumps_bytes_matches_the_provider(provider):
+    app, mongo_provider = provider
+    doc = _document()
+
+    assert json.loads(json_provider.dumps_bytes(doc)) == json.loads(mongo_provider.dumps(doc))
+
+
+def test_http_datetime_matches_werkzeug():
+    from werkzeug.http import http_date
+
+    moment = datetime(2024, 2, 29, 0, 0, 7)
+    for offset in range(0, 24 * 400, 37):
+        value = moment + timedelta(hours=offset)
+        assert json_provider._http_datetime(value) == http_date(value)
+        aware = value.replace(tzinfo=timezone(timedelta(hours=-5)))
+        assert json_provider._http_datetime(aware) == http_date(aware)
@@ -0,0 +1,49 @@
+import random
+
+import mongomock
+
+from services.leaderboard import ELO_BUCKET_MAX, RankedLeaderboard
+
+
+def _expected(profiles):
+    """Ranks computed by sorting everything: ties share the rank of the first of them."""
+    ordered = sorted(profiles.items(), key=lambda item: (-item[1], item[0]))
+    ranks, previous = {}, None
+    for position, (clerk_id, elo) in enumerate(ordered, start=1):
+        if elo != previous:
+            rank, previous = position, elo
+        ranks[clerk_id] = rank
+    return [(clerk_id, ranks[clerk_id]) for clerk_id, _ in ordered]
+
+
+def test_ranks_and_pages_match_a_full_sort():
+    rng = random.Random(7)
+    # Hors bornes et flottants compris : ils partagent les buckets extrêmes
+    elos = [1200, 1210, 1190, -15, 0, ELO_BUCKET_MAX + 300, 1200.5, 1500]
+    db = mongomock.MongoClient()["leaderboard_test"]
+    db.users.insert_many([{"clerk_id": f"u{i}", "elo": rng.choice(elos)} for i in range(300)])
+    profiles = {u["clerk_id"]: u["elo"] for u in db.users.find()}
+
+    board = RankedLeaderboard()
+    board.load(db)
+    for _ in range(500):
+        clerk_id = f"u{rng.randrange(320)}"
+        if clerk_id in profiles and rng.random() < 0.7:
+            delta = rng.choice([-40, -12, 0, 7, 16, 900])
+            board.apply_inc(clerk_id, {"elo": delta})
+            profiles[clerk_id] += delta
+        else:
+            elo = rng.choice(elos)
+            board.upsert({"clerk_id": clerk_id, "elo": elo})
+            profiles[clerk_id] = elo
+
+    expected = _expected(profiles)
+    assert len(board) == len(expected)
+    assert [(e["clerk_id"], e["rank"]) for e in board.top(limit=len(expected))] == expected
+    for offset in (0, 1, 45, 150, len(expected) - 3):
+        page = board.top(limit=20, offset=offset)
+        assert [(e["clerk_id"], e["rank"]) for e in page] == expected[offset:offset + 20]
+    assert board.top(limit=10, offset=len(expected)) == []
+    for clerk_id, rank in expected[::17]:
+        assert board.rank_of(clerk_id)["rank"] == rank
+    assert board.rank_of("nobody") is None
@@ -0,0 +1,23 @@
+from services.quiz_cache import DEFAULT_POINTS, compile_answer_key
+
+
+def test_compile_answer_key_ids_and_points():
+    quiz = {"questions": [
+        {"id": "a", "correct_answer": "x", "points": 5},
+        {"correct_answer": 2},
+        {"id": "a", "correct_answer": "y", "points": 1},
+    ]}
+
+    assert compile_answer_key(quiz) == {"a": ("x", 5), "1": ("2", DEFAULT_POINTS)}
+
+
+def test_invalid_points_fall_back_to_default():
+    quiz = {"questions": [
+        {"correct_answer": "x", "points": None},
+        {"correct_answer": "x", "points": "abc"},
+        {"correct_answer": "x", "points": "7"},
+        {"correct_answer": "x", "points": [3]},
+    ]}
+
+    points = [p for _, p in compile_answer_key(quiz).values()]
+    assert points == [DEFAULT_POINTS, DEFAULT_POINTS, 7, DEFAULT_POINTS]
@@ -0,0 +1,56 @@
+import uuid
+
+import routes.quiz
+
+
+def _list_questions(client, clerk, clerk_id, **params):
+    response = client.get("/quiz/questions", query_string=params,
+                          headers={"Authorization": f"Bearer {clerk.token(clerk_id)}"})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_questions_are_paginated_by_id(client, clerk, db, make_user):
+    category = uuid.uuid4().hex
+    db.questions.insert_many([{"text": f"Q{i}", "category": category, "correct_answer": "a"} for i in range(5)])
+    user = make_user("student")
+
+    first = _list_questions(client, clerk, user, category=category, limit=3)
+    second = _list_questions(client, clerk, user, category=category, limit=3, cursor=first["next_cursor"])
+
+    texts = [q["text"] for q in first["questions"] + second["questions"]]
+    assert texts == [f"Q{i}" for i in range(5)]
+    assert second["next_cursor"] is None
+
+
+def test_correct_answer_only_for_allowed_accounts(client, clerk, db, make_user, monkeypatch):
+    category = uuid.uuid4().hex
+    db.questions.insert_one({"text": "Q", "category": category, "correct_answer": "a"})
+    student, teacher = make_user("student"), make_user("teacher")
+    monkeypatch.setattr(routes.quiz, "ANSWER_KEY_ALLOWED_CLERK_IDS", {teacher})
+
+    hidden = _list_questions(client, clerk, student, category=category, fields="text,correct_answer")["questions"]
+    shown = _list_questions(client, clerk, teacher, category=category, fields="text,correct_answer")["questions"]
+
+    assert all("correct_answer" not in q for q in hidden)
+    assert all(q["correct_answer"] == "a" for q in shown)
+
+
+def test_get_all_questions_is_a_gated_page(client, clerk, db, make_user, monkeypatch):
+    category = uuid.uuid4().hex
+    db.questions.insert_many([{"text": f"Q{i}", "category": category, "correct_answer": "a"} for i in range(3)])
+    student, teacher = make_user("student"), make_user("teacher")
+    monkeypatch.setattr(routes.quiz, "ANSWER_KEY_ALLOWED_CLERK_IDS", {teacher})
+
+    def get_all(clerk_id):
+        response = client.get("/quiz/get-all-questions",
+                              query_string={"category": category, "limit": 2, "fields": "text,correct_answer"},
+                              headers={"Authorization": f"Bearer {clerk.token(clerk_id)}"})
+        assert response.status_code == 200
+        return response.get_json()
+
+    hidden, shown = get_all(student), get_all(teacher)
+    assert (hidden["count"], len(hidden["questions"])) == (2, 2)
+    assert hidden["next_cursor"] is not None
+    assert all("correct_answer" not in q for q in hidden["questions"])
+    assert all(q["correct_answer"] == "a" for q in shown["questions"])
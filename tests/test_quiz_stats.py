@@ -0,0 +1,34 @@
+import uuid
+
+from models.quiz_model import UserAnswerModel
+from services.quiz_cache import clear_quiz_caches
+from services.quiz_service import QuizService
+from services.quiz_stats import get_quiz_stats, record_quiz_stats
+
+
+def _play(db, quiz_id, selected):
+    answers = [UserAnswerModel(question_id=str(i), selected_option=option, is_correct=False)
+               for i, option in enumerate(selected)]
+    result = QuizService(db).calculate_quiz_score(quiz_id, answers)
+    record_quiz_stats(db, result, "solo")
+
+
+def test_stats_shared_between_object_id_and_custom_id(db):
+    custom_id = f"quiz-{uuid.uuid4().hex[:8]}"
+    object_id = str(db.quizzes.insert_one({
+        "id": custom_id,
+        "questions": [{"correct_answer": "a", "points": 10}, {"correct_answer": "b", "points": 10}],
+    }).inserted_id)
+
+    _play(db, custom_id, ["a", "b"])
+    _play(db, object_id, ["a", "a"])
+    clear_quiz_caches()
+    _play(db, custom_id, ["b", "b"])
+
+    for quiz_id in (custom_id, object_id):
+        stats = get_quiz_stats(db, quiz_id)
+        assert stats["quiz_id"] == quiz_id
+        assert stats["attempts"] == 3
+        assert stats["score_histogram"] == {10: 2, 20: 1}
+        assert stats["questions"]["0"] == {"attempts": 3, "correct": 2, "correct_rate": 0.6667}
+    assert db.quiz_stats.count_documents({"_id": custom_id}) == 0
@@ -0,0 +1,46 @@
+from bson import ObjectId
+
+
+def _create_quiz(client, clerk, clerk_id, body):
+    return client.post("/quiz/create-quiz", json=body,
+                       headers={"Authorization": f"Bearer {clerk.token(clerk_id)}"})
+
+
+def _question(**overrides):
+    return {"text": "Q", "options": ["a", "b"], "correct_answer": "a", "category": "algo", **overrides}
+
+
+def test_invalid_quiz_is_rejected_before_insert(client, clerk, db, make_user):
+    before = db.quizzes.count_documents({})
+    response = _create_quiz(client, clerk, make_user("author"), {
+        "title": "Broken",
+        "questions": [_question(), _question(points="many", unexpected=True)],
+    })
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["error"] == "Validation failed"
+    locations = {tuple(detail["loc"]) for detail in body["details"]}
+    assert ("category",) in locations
+    assert ("questions", "1", "points") in locations
+    assert ("questions", "1", "unexpected") in locations
+    assert db.quizzes.count_documents({}) == before
+
+
+def test_valid_quiz_is_stored_as_validated(client, clerk, db, make_user):
+    response = _create_quiz(client, clerk, make_user("author"), {
+        "title": "Algo", "category": "algo", "questions": [_question(points="5")],
+    })
+
+    assert response.status_code == 201
+    stored = db.quizzes.find_one({"_id": ObjectId(response.get_json()["quiz_id"])})
+    assert stored["difficulty"] == "medium"
+    assert stored["questions"][0]["points"] == 5
+    assert "id" not in stored
+
+
+def test_answers_must_be_a_list(client, clerk, make_user):
+    response = _create_quiz(client, clerk, make_user("student"), {"quiz_id": "q", "answers": {"a": 1}})
+
+    assert response.status_code == 400
+    assert response.get_json()["details"][0]["type"] == "payload"
@@ -0,0 +1,81 @@
+import asyncio
+
+from pymongo import InsertOne
+
+import config.db as db_config
+from services.write_behind import WriteBehindQueue
+
+
+class FakeAsyncCollection:
+    """Just what submit_async() uses of an AsyncMongoClient collection."""
+
+    def __init__(self, database_name, name):
+        self.database = type("Database", (), {"name": database_name})()
+        self.name = name
+        self.written = []
+
+    async def bulk_write(self, ops):
+        self.written.extend(ops)
+
+
+def test_submit_async_writes_with_the_async_client_when_disabled():
+    queue = WriteBehindQueue(enabled=False)
+    collection = FakeAsyncCollection("test_db", "results")
+
+    deferred = asyncio.run(queue.submit_async(collection, InsertOne({"score": 1})))
+
+    assert deferred is False
+    assert len(collection.written) == 1
+
+
+def test_submit_async_queues_on_the_sync_client(app):
+    queue = WriteBehindQueue(enabled=True, flush_interval=0.01)
+    collection = FakeAsyncCollection("write_behind_test", "results")
+
+    deferred = asyncio.run(queue.submit_async(collection, InsertOne({"score": 2})))
+    queue.close()
+
+    assert deferred is True
+    assert collection.written == []
+    assert db_config.mongodb_connection()["write_behind_test"].results.find_one({"score": 2})
+
+
+def test_submit_async_falls_back_when_the_queue_is_full(app):
+    queue = WriteBehindQueue(enabled=True, maxsize=1)
+    queue._ensure_started = lambda: True
+    queue._queue.put_nowait(("busy", None))
+    collection = FakeAsyncCollection("write_behind_test", "results")
+
+    deferred = asyncio.run(queue.submit_async(collection, InsertOne({"score": 3})))
+
+    assert deferred is False
+    assert len(collection.written) == 1
+    assert queue.stats["sync_fallback"] == 1
+
+
+def test_finished_session_is_visible_before_the_queue_flushes(app, db, monkeypatch):
+    import services.quiz_service as quiz_service_module
+    from services.quiz_service import QuizService
+
+    queue = WriteBehindQueue(enabled=True, flush_interval=60)
+    monkeypatch.setattr(quiz_service_module, "write_behind", queue)
+    session_id = db.solo_sessions.insert_one({"quiz_id": "wb", "clerk_id": "wb_user", "status": "in_progress"}).inserted_id
+
+    QuizService(db).finish_solo_session(str(session_id), 7)
+
+    assert QuizService(db).check_solo_session("wb", "wb_user")["status"] == "finished"
+    assert len(queue) == 0
+    queue.close()
+
+
+def test_stats_counters_are_exact_under_concurrent_submits(app):
+    from concurrent.futures import ThreadPoolExecutor
+
+    queue = WriteBehindQueue(enabled=True, flush_interval=0.01)
+    collection = db_config.mongodb_connection()["write_behind_test"].counters
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda i: queue.submit(collection, InsertOne({"i": i})), range(2000)))
+    queue.close()
+
+    assert queue.stats["queued"] == 2000
+    assert queue.stats["written"] == 2000